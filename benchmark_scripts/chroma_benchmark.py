@@ -215,11 +215,11 @@ class ChromaBenchmark:
             # Generate all embeddings upfront
             embeddings = self.generate_embeddings(num_documents, embedding_dimension)
             
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             # Insert in batches
             for batch_idx in range(0, num_documents, batch_size):
-                batch_start = time.time()
+                batch_start = time.perf_counter()
                 
                 end_idx = min(batch_idx + batch_size, num_documents)
                 batch_embeddings = embeddings[batch_idx:end_idx]
@@ -236,7 +236,7 @@ class ChromaBenchmark:
                     ids=batch_ids
                 )
                 
-                batch_time = time.time() - batch_start
+                batch_time = time.perf_counter() - batch_start
                 results['batches'].append({
                     'batch_index': batch_idx // batch_size,
                     'size': len(batch_embeddings),
@@ -248,7 +248,7 @@ class ChromaBenchmark:
                           f"{len(batch_embeddings)} docs in {batch_time:.2f}s "
                           f"({len(batch_embeddings) / batch_time:.2f} docs/s)")
             
-            total_time = time.time() - start_time
+            total_time = time.perf_counter() - start_time
             results['total_time'] = total_time
             results['documents_per_second'] = num_documents / total_time
             results['success'] = True
@@ -293,19 +293,19 @@ class ChromaBenchmark:
             # Generate query embeddings
             query_embeddings = self.generate_embeddings(num_queries, embedding_dimension)
             
-            start_time = time.time()
+            start_time = time.perf_counter()
             latencies = []
             
             # Perform queries
             for i, query_embedding in enumerate(query_embeddings):
-                query_start = time.time()
+                query_start = time.perf_counter()
                 
                 query_results = self.collection.query(
                     query_embeddings=[query_embedding],
                     n_results=top_k
                 )
                 
-                query_time = time.time() - query_start
+                query_time = time.perf_counter() - query_start
                 latencies.append(query_time)
                 
                 results['queries'].append({
@@ -317,7 +317,7 @@ class ChromaBenchmark:
                 if (i + 1) % 10 == 0:
                     logger.info(f"Completed {i + 1}/{num_queries} queries")
             
-            total_time = time.time() - start_time
+            total_time = time.perf_counter() - start_time
             results['total_time'] = total_time
             results['queries_per_second'] = num_queries / total_time
             results['avg_latency'] = sum(latencies) / len(latencies)
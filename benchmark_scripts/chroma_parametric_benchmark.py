@@ -97,7 +97,7 @@ class ParametricBenchmarkSuite:
                           f"dim={embedding_dim}, batch={batch_size}")
                     print("-" * 60)
                     
-                    run_start = time.time()
+                    run_start = time.perf_counter()
                     
                     try:
                         # Connect to service (retry for this benchmark instance)
@@ -115,7 +115,7 @@ class ParametricBenchmarkSuite:
                             top_k=top_k
                         )
                         
-                        run_duration = time.time() - run_start
+                        run_duration = time.perf_counter() - run_start
                         
                         # Extract key metrics
                         summary = run_results.get('summary', {})
@@ -263,7 +263,7 @@ def main():
     suite = ParametricBenchmarkSuite(args.endpoint)
     
     # Run the full sweep
-    overall_start = time.time()
+    overall_start = time.perf_counter()
     results = suite.run_sweep(
         num_documents_list=num_documents_list,
         embedding_dimensions=embedding_dimensions,
@@ -273,7 +273,7 @@ def main():
         collection_prefix=args.collection_prefix,
         wait_for_service=args.wait_for_service
     )
-    overall_duration = time.time() - overall_start
+    overall_duration = time.perf_counter() - overall_start
     
     # Add total duration
     results['metadata']['total_duration_seconds'] = round(overall_duration, 2)
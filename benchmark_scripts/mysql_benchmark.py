@@ -99,11 +99,11 @@ class MySQLBenchmark:
         cursor = connection.cursor()
 
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
             transaction_times = []
 
             for i in range(self.transactions_per_client):
-                tx_start = time.time()
+                tx_start = time.perf_counter()
 
                 # Perform a mix of operations
                 # 1. Insert new record
@@ -126,10 +126,10 @@ class MySQLBenchmark:
                 )
 
                 connection.commit()
-                tx_end = time.time()
+                tx_end = time.perf_counter()
                 transaction_times.append(tx_end - tx_start)
 
-            end_time = time.time()
+            end_time = time.perf_counter()
             total_time = end_time - start_time
 
             # Record results
@@ -159,7 +159,7 @@ class MySQLBenchmark:
     def run_benchmark(self) -> Dict[str, Any]:
         """Run the complete benchmark with multiple clients"""
         logger.info(f"Starting benchmark with {self.num_connections} clients")
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         # Create and start client threads
         threads = []
@@ -172,7 +172,7 @@ class MySQLBenchmark:
         for thread in threads:
             thread.join()
 
-        end_time = time.time()
+        end_time = time.perf_counter()
         total_time = end_time - start_time
 
         # Calculate aggregate statistics
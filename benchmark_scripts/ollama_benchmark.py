@@ -79,7 +79,7 @@ class OllamaBenchmark:
             }
         }
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             response = requests.post(
@@ -88,7 +88,7 @@ class OllamaBenchmark:
                 timeout=120  # 2 minutes timeout
             )
             
-            end_time = time.time()
+            end_time = time.perf_counter()
             
             if response.status_code == 200:
                 result = response.json()
@@ -109,7 +109,7 @@ class OllamaBenchmark:
                 }
                 
         except Exception as e:
-            end_time = time.time()
+            end_time = time.perf_counter()
             return {
                 "success": False,
                 "error": str(e),
@@ -128,7 +128,7 @@ class OllamaBenchmark:
         prompts = [base_prompt * (prompt_length // len(base_prompt.split())) for _ in range(num_requests)]
         
         results = []
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Run requests with thread pool for concurrency
         with ThreadPoolExecutor(max_workers=concurrent_requests) as executor:
@@ -158,7 +158,7 @@ class OllamaBenchmark:
                         "latency": 0
                     })
         
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         # Calculate statistics
         successful_results = [r for r in results if r['success']]
@@ -136,7 +136,7 @@ class OllamaParametricBenchmarkSuite:
                           f"concurrent={concurrent}, prompt={prompt_len}, max_tokens={max_tokens}")
                     print("-" * 60)
                     
-                    run_start = time.time()
+                    run_start = time.perf_counter()
                     
                     try:
                         # Run the benchmark for this parameter combination
@@ -147,7 +147,7 @@ class OllamaParametricBenchmarkSuite:
                             max_tokens=max_tokens
                         )
                         
-                        run_duration = time.time() - run_start
+                        run_duration = time.perf_counter() - run_start
                         
                         # Extract key metrics
                         stats = run_results.get('results', {})
@@ -287,14 +287,14 @@ def main():
         print("Failed to load model. Continuing anyway...")
     
     # Run the full sweep
-    overall_start = time.time()
+    overall_start = time.perf_counter()
     results = suite.run_sweep(
         concurrent_requests_list=concurrent_requests,
         prompt_lengths=prompt_lengths,
         max_tokens_list=max_tokens_list,
         operations_per_test=args.operations
     )
-    overall_duration = time.time() - overall_start
+    overall_duration = time.perf_counter() - overall_start
     
     # Add total duration
     results['metadata']['total_duration_seconds'] = round(overall_duration, 2)
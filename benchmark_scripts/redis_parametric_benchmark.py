@@ -95,7 +95,7 @@ class ParametricBenchmarkSuite:
                           f"data_size={data_size}B, pipeline={pipeline}")
                     print("-" * 60)
                     
-                    run_start = time.time()
+                    run_start = time.perf_counter()
                     
                     try:
                         # Run the benchmark for this parameter combination
@@ -108,7 +108,7 @@ class ParametricBenchmarkSuite:
                             native_runner=self.native_runner
                         )
                         
-                        run_duration = time.time() - run_start
+                        run_duration = time.perf_counter() - run_start
                         
                         # Extract key metrics
                         test_results = {}
@@ -218,7 +218,7 @@ def main():
     suite = ParametricBenchmarkSuite(args.endpoint, args.native_runner, args.password)
     
     # Run the full sweep
-    overall_start = time.time()
+    overall_start = time.perf_counter()
     results = suite.run_sweep(
         client_counts=client_counts,
         data_sizes=data_sizes,
@@ -226,7 +226,7 @@ def main():
         operations_per_test=args.operations,
         tests=tests
     )
-    overall_duration = time.time() - overall_start
+    overall_duration = time.perf_counter() - overall_start
     
     # Add total duration
     results['metadata']['total_duration_seconds'] = round(overall_duration, 2)
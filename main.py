@@ -5,1447 +5,1951 @@ Manages containerized services on HPC clusters via SLURM
 """
 
 import os
+import functools
+import io
 import sys
+import json
+import time
+import atexit
+import queue
+import shutil
+import tempfile
+import importlib.metadata
+import importlib.util
 import argparse
 import logging
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
+from time import localtime, strftime
+from urllib.parse import urlsplit
 
-def setup_logging(log_level="INFO"):
-    """Setup logging configuration"""
+try:
+    import ijson  # optional: incremental parsing of large Prometheus responses
+except ImportError:
+    ijson = None
+
+try:
+    import orjson  # optional: faster JSON parsing/serialization
+except ImportError:
+    orjson = None
+
+try:
+    import readline  # noqa: F401 - line editing and history for the interactive menu
+except ImportError:
+    readline = None
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Each process logs to its own rotating file so concurrent CLI calls never
+# share (and rotate) one file; LOG_FILE links to the newest of them
+LOG_FILE = 'orchestrator.log'
+PROCESS_LOG_FILE = 'orchestrator.{pid}.log'
+PROCESS_LOG_GLOB = 'orchestrator.[0-9]*.log'
+PROCESS_LOGS_KEPT = 10
+LOG_MAX_BYTES = 10 * 1024 * 1024  # matches logging.max_size in config.yaml
+LOG_BACKUP_COUNT = 5
+
+# Row layout for SLURM job tables (fields of the get_slurm_status job dicts)
+JOB_ROW_FORMAT = '  {job_id:>8} | {name:>15} | {state:>10} | {time:>8} | {nodes}\n'
+STATUS_SECTIONS = (('services', 'Services'), ('clients', 'Clients'), ('other', 'Other Jobs'))
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Rows of tracked services and clients, filled from the orchestrator's status
+# dicts (which always carry status and job_id)
+TRACKED_ROW_FORMAT = '  {}: {} (Job: {})\n'
+status_and_job = itemgetter('status', 'job_id')
+
+# Interactive menu banner, written in a single call
+MENU_BANNER = (
+    "HPC Orchestrator - Interactive Mode\n"
+    "Available commands:\n"
+    "  0. Refresh listings\n"
+    "  1. List services\n"
+    "  2. List clients\n"
+    "  3. Show status\n"
+    "  4. Stop service\n"
+    "  5. Stop all services\n"
+    "  6. Show running sessions\n"
+    "  7. Debug services\n"
+    "  8. List all services\n"
+    "  9. List monitors\n"
+    "  10. Monitor status\n"
+    "  11. Query metrics\n"
+    "  12. Exit\n"
+)
+MENU_PROMPT = "\nEnter command (0-12): "
+
+# Service statuses counted as active: SLURM states and ServiceStatus values
+ACTIVE_STATES = frozenset({'RUNNING', 'PENDING', 'running', 'pending'})
+
+# Lines joined into each write when printing long listings
+OUTPUT_CHUNK_LINES = 256
+
+# Required modules mapped to the distributions that provide them
+REQUIRED_DISTRIBUTIONS = {'yaml': 'PyYAML', 'paramiko': 'paramiko', 'scp': 'scp'}
+
+# Errors raised for malformed JSON by the available parsers
+JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError) if ijson else (json.JSONDecodeError,)
+
+# Reused by dumps_indented_json when orjson is not installed, instead of
+# json.dumps building a new encoder for every call
+INDENTED_JSON_ENCODER = json.JSONEncoder(indent=2)
+
+# Upper bound on concurrent SSH channels for CLI fan-out queries
+MAX_SSH_WORKERS = 8
+
+# Read size for remote command output that is streamed rather than buffered
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Size up to which a streamed response body is held in memory while it is
+# validated; larger bodies spill to a temporary file
+RESPONSE_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Default ports of the supported service types (see src/services)
+DEFAULT_SERVICE_PORTS = {
+    'prometheus': 9090,
+    'grafana': 3000,
+    'ollama': 11434,
+    'chroma': 8000,
+    'redis': 6379,
+    'mysql': 3306,
+}
+
+# Seconds the interactive menu reuses a service/monitor listing before re-running squeue
+SNAPSHOT_MAX_AGE = 3
+
+# Background listener started by setup_logging
+_log_listener = None
+
+def configure_stdout():
+    """Block-buffer stdout when it is redirected
+    
+    Terminals keep line buffering so output appears immediately. Redirected
+    output (pipes, files on NFS from SLURM job scripts) is coalesced into
+    full buffers even when PYTHONUNBUFFERED is set, and flushed on exit.
+    """
+    if not sys.stdout.isatty():
+        sys.stdout.reconfigure(line_buffering=False, write_through=False)
+
+def process_alive(pid):
+    """Return True if a process with this PID is still running"""
+    if os.name != 'posix':
+        return False  # os.kill would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # running under another user
+    return True
+
+def prune_process_logs(keep=PROCESS_LOGS_KEPT):
+    """Delete all but the newest keep per-process log files and their backups
+    
+    Logs of processes that are still running are kept, and files another
+    CLI process deletes meanwhile are skipped.
+    """
+    logs = []
+    for log_path in Path('.').glob(PROCESS_LOG_GLOB):
+        try:
+            logs.append((log_path.stat().st_mtime, log_path))
+        except FileNotFoundError:
+            continue
+    logs.sort(key=lambda entry: entry[0], reverse=True)
+    for _, log_path in logs[keep:]:
+        pid = log_path.name.split('.')[1]
+        if pid.isdigit() and process_alive(int(pid)):
+            continue
+        for old_file in (log_path, *Path('.').glob(f"{log_path.name}.[0-9]*")):
+            try:
+                old_file.unlink()
+            except OSError:
+                pass
+
+def link_latest_log(log_path):
+    """Point LOG_FILE at log_path, unless LOG_FILE is a regular file from an older version"""
+    if os.path.exists(LOG_FILE) and not os.path.islink(LOG_FILE):
+        return
+    temp_link = f"{LOG_FILE}.{os.getpid()}.tmp"
+    try:
+        os.symlink(log_path, temp_link)
+        os.replace(temp_link, LOG_FILE)
+    except OSError:
+        # No symlink support; the per-process log is still written
+        pass
+
+def setup_logging(log_level=logging.INFO):
+    """Setup logging configuration
+
+    Records are handed to a QueueHandler and written to the console and the
+    rotating log file of this process by a background QueueListener, so
+    logging on the CLI paths never blocks on disk I/O. The log file is only
+    opened once the first record is written to it.
+    """
+    log_path = PROCESS_LOG_FILE.format(pid=os.getpid())
+    prune_process_logs()
+    link_latest_log(log_path)
+    
+    formatter = logging.Formatter(LOG_FORMAT)
+    stream_handler = logging.StreamHandler()
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True
+    )
+    for handler in (stream_handler, file_handler):
+        handler.setFormatter(formatter)
+    
+    global _log_listener
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler)
+    _log_listener.start()
+    atexit.register(shutdown_logging)
+    
+    # The queue side only merges args into the message; the listener's
+    # handlers apply the real format
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    
     logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('orchestrator.log')
-        ]
+        level=log_level,
+        handlers=[queue_handler]
     )
+    return _log_listener
 
-def check_dependencies():
-    """Check if required dependencies are available"""
-    required_modules = ['yaml', 'paramiko', 'scp']
-    missing = []
+def shutdown_logging():
+    """Stop the background log listener after it has written all queued records"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+def write_indented_json(events, out, indent=2):
+    """Write ijson parse events as JSON laid out like json.dumps(indent=2)
     
-    for module in required_modules:
-        try:
-            __import__(module)
-        except ImportError:
-            missing.append(module)
+    Only the current nesting path is held in memory, so arbitrarily large
+    documents are printed without building the object tree.
+    """
+    stack = []  # [container_type, items_written] per open container
+    after_key = False
     
-    return missing
+    def begin_value():
+        nonlocal after_key
+        if stack and not after_key:
+            out.write(',' if stack[-1][1] else '')
+            out.write('\n' + ' ' * (indent * len(stack)))
+            stack[-1][1] += 1
+        after_key = False
+    
+    for _, event, value in events:
+        if event == 'map_key':
+            out.write(',' if stack[-1][1] else '')
+            out.write('\n' + ' ' * (indent * len(stack)) + json.dumps(value) + ': ')
+            stack[-1][1] += 1
+            after_key = True
+        elif event in ('start_map', 'start_array'):
+            begin_value()
+            out.write('{' if event == 'start_map' else '[')
+            stack.append([event, 0])
+        elif event in ('end_map', 'end_array'):
+            _, items_written = stack.pop()
+            if items_written:
+                out.write('\n' + ' ' * (indent * len(stack)))
+            out.write('}' if event == 'end_map' else ']')
+        else:
+            begin_value()
+            out.write(json.dumps(value))
+    out.write('\n')
 
-def main():
-    """Main CLI entry point"""
-    parser = argparse.ArgumentParser(description='HPC AI Benchmarking Orchestrator')
-    parser.add_argument('--config', '-c', type=str, default='config.yaml',
-                       help='Configuration file path')
-    parser.add_argument('--recipe', '-r', type=str,
-                       help='Recipe file to execute')
-    parser.add_argument('--target-service', '-t', type=str,
-                       help='Target service ID for client recipes (use with --recipe)')
-    parser.add_argument('--target-endpoint', '-e', type=str,
-                       help='Direct endpoint for client recipes (e.g., http://node-01:11434)')
-    parser.add_argument('--list-services', action='store_true',
-                       help='List available services')
-    parser.add_argument('--list-clients', action='store_true',
-                       help='List available clients')
-    parser.add_argument('--status', action='store_true',
-                       help='Show system status')
-    parser.add_argument('--slurm-status', action='store_true',
-                       help='Show SLURM job status (all user jobs)')
-    parser.add_argument('--clear-state', action='store_true',
-                       help='Clear all tracked services and clients')
-    parser.add_argument('--stop-service', type=str, metavar='SERVICE_ID',
-                       help='Stop a running service by ID')
-    parser.add_argument('--stop-all-services', action='store_true',
-                       help='Stop all running services')
-    parser.add_argument('--stop-session', type=str, metavar='SESSION_ID',
-                       help='Stop a benchmark session by ID')
-    parser.add_argument('--debug-services', action='store_true',
-                       help='Show detailed debug information about all services')
-    parser.add_argument('--list-all-services', action='store_true',
-                       help='List all services (tracked and SLURM-only)')
-    parser.add_argument('--list-running-services', action='store_true',
-                       help='List only running services with their IDs')
-    parser.add_argument('--list-monitors', action='store_true',
-                       help='List running monitors')
-    parser.add_argument('--monitor-status', type=str, metavar='MONITOR_ID',
-                       help='Check status of a specific monitor')
-    parser.add_argument('--stop-monitor', type=str, metavar='MONITOR_ID',
-                       help='Stop a running monitor')
-    parser.add_argument('--query-metrics', type=str, nargs=2, metavar=('SERVICE_ID', 'QUERY'),
-                       help='Query Prometheus metrics from a service or monitor (e.g., --query-metrics prometheus_4e29faf0 "up")')
-    parser.add_argument('--list-available-metrics', type=str, metavar='SERVICE_ID',
-                       help='List all available metric names from a Prometheus service (e.g., --list-available-metrics prometheus_4e29faf0)')
-    parser.add_argument('--query-service-metrics', type=str, nargs=2, metavar=('SERVICE_ID', 'QUERY'),
-                       help='Query Prometheus metrics from a service (e.g., --query-service-metrics svc123 "up")')
-    parser.add_argument('--monitor-endpoint', type=str, metavar='MONITOR_ID',
-                       help='Get Prometheus endpoint URL for a monitor')
-    parser.add_argument('--service-endpoint', type=str, metavar='SERVICE_ID',
-                       help='Get endpoint URL for a service (including Prometheus)')
-    parser.add_argument('--create-tunnel', type=str, nargs='+', metavar='SERVICE_ID [LOCAL_PORT] [REMOTE_PORT]',
-                       help='Create SSH tunnel to a service (e.g., --create-tunnel prometheus_abc123 9090 9090). If ports not specified, defaults to 9090:9090')
-    parser.add_argument('--start-session', type=str, nargs=3, metavar=('SERVICE_RECIPE', 'CLIENT_RECIPE', 'PROMETHEUS_RECIPE'),
-                       help='Complete automated session: starts service with cAdvisor, starts client benchmark, starts Prometheus monitoring, creates SSH tunnel (e.g., --start-session recipes/services/ollama_with_cadvisor.yaml recipes/clients/ollama_benchmark.yaml recipes/services/prometheus_with_cadvisor.yaml)')
-    parser.add_argument('--start-monitoring', type=str, nargs=2, metavar=('SERVICE_RECIPE', 'PROMETHEUS_RECIPE'),
-                       help='[DEPRECATED: Use --start-session] Automated monitoring setup: starts service with cAdvisor, starts Prometheus, creates SSH tunnel')
-    parser.add_argument('--download-results', nargs='?', const='$HOME/results/*.json', metavar='REMOTE_PATTERN',
-                       help='Download benchmark results from cluster (default: $HOME/results/*.json). Saves to ./results/')
-    parser.add_argument('--verbose', '-v', action='store_true',
-                       help='Enable verbose logging')
-    parser.add_argument('--setup', action='store_true',
-                       help='Run setup and dependency check')
+def loads_json(raw):
+    """Parse a JSON document with orjson when available, else the json module
     
-    args = parser.parse_args()
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers handle
+    malformed input the same way for both parsers.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def dumps_indented_json(obj) -> str:
+    """Serialize an object as JSON indented by two spaces"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return INDENTED_JSON_ENCODER.encode(obj)
+
+def format_series_name(metric: dict) -> str:
+    """Render a Prometheus series' labels in PromQL notation, e.g. up{job="x"}"""
+    labels = ','.join(f'{key}="{value}"' for key, value in metric.items() if key != '__name__')
+    return f"{metric.get('__name__', '')}{{{labels}}}"
+
+def write_query_result(result: dict):
+    """Print a Prometheus query result
     
-    # Setup logging
-    log_level = "DEBUG" if args.verbose else "INFO"
-    setup_logging(log_level)
+    Range (matrix) results are written series by series, one sample per
+    line, instead of being serialized into a single indented document.
+    """
+    data = result.get('data') or {}
+    if data.get('resultType') != 'matrix':
+        print(dumps_indented_json(result))
+        return
     
-    logger = logging.getLogger(__name__)
-    logger.info("Starting HPC Orchestrator")
+    for series in data.get('result', []):
+        sys.stdout.write(format_series_name(series.get('metric', {})) + '\n')
+        write_lines(f"  {timestamp} {value}\n" for timestamp, value in series.get('values', []))
+
+def print_json_response(raw: str):
+    """Print a raw JSON response body (e.g. from curl on the cluster)
     
-    # Check dependencies first
-    missing_deps = check_dependencies()
-    if missing_deps and not args.setup:
-        print(f"❌ Missing required dependencies: {', '.join(missing_deps)}")
-        print("Install with: pip install -r requirements.txt")
-        print("Or run: python main.py --setup")
-        return 1
+    The body is always parsed so invalid responses raise one of JSON_ERRORS,
+    but it is only re-serialized with indentation when stdout is a terminal;
+    redirected output gets the original bytes unchanged. With ijson installed
+    the terminal output is produced incrementally instead of materializing
+    every series as Python objects first.
+    """
+    if sys.stdout.isatty() and ijson is not None:
+        print("\nResult:")
+        events = ijson.parse(io.BytesIO(raw.encode('utf-8')), use_float=True)
+        write_indented_json(events, sys.stdout)
+        return
     
-    # Run setup if requested
-    if args.setup:
-        print("Running setup...")
-        try:
-            import setup
-            return setup.main()
-        except ImportError:
-            print("❌ Setup script not found")
-            return 1
+    result = loads_json(raw)
+    print("\nResult:")
+    if sys.stdout.isatty():
+        print(dumps_indented_json(result))
+    else:
+        sys.stdout.write(raw if raw.endswith('\n') else raw + '\n')
+
+class ResponseReader:
+    """Binary file-like reader over a remote command's stdout
+    
+    Replays the chunk already read to detect an empty response before
+    continuing from the channel, and optionally copies every chunk it hands
+    out to sink so the body can be kept while it is being parsed.
+    """
+    
+    def __init__(self, head: bytes, source, sink=None):
+        self._head = head
+        self._source = source
+        self._sink = sink
+        self.last_byte = b''
+    
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            if 0 <= size < len(self._head):
+                data, self._head = self._head[:size], self._head[size:]
+            else:
+                data, self._head = self._head, b''
+        else:
+            data = self._source.read(size)
+        if data and self._sink is not None:
+            self._sink.write(data)
+            self.last_byte = data[-1:]
+        return data
+
+def print_json_stream(head: bytes, source):
+    """Print a JSON response body while it is still arriving
+    
+    With ijson installed the body is parsed chunk by chunk: terminals get it
+    pretty-printed incrementally, while redirected output gets the original
+    bytes only once the whole body has been validated, so a truncated or
+    invalid response never reaches a pipe. Without ijson the body is read in
+    full and handed to print_json_response.
+    """
+    if ijson is None:
+        print_json_response((head + source.read()).decode('utf-8'))
+        return
+    
+    if sys.stdout.isatty():
+        print("\nResult:")
+        write_indented_json(ijson.parse(ResponseReader(head, source), use_float=True), sys.stdout)
+        return
+    
+    with tempfile.SpooledTemporaryFile(max_size=RESPONSE_SPOOL_SIZE) as spool:
+        reader = ResponseReader(head, source, sink=spool)
+        for _ in ijson.parse(reader, use_float=True):
+            pass
+        
+        print("\nResult:")
+        sys.stdout.flush()
+        spool.seek(0)
+        shutil.copyfileobj(spool, sys.stdout.buffer)
+    if reader.last_byte != b'\n':
+        sys.stdout.buffer.write(b'\n')
+    sys.stdout.buffer.flush()
+
+def run_prometheus_query(ssh_client, curl_cmd: str, query: str) -> int:
+    """Run a curl query on the cluster and print the response as it streams in
+    
+    Returns the CLI exit code.
+    """
+    stdout, stderr = ssh_client.stream_command(curl_cmd, input_data=query)
+    head = stdout.read(STREAM_CHUNK_SIZE)
+    
+    if not head.strip():
+        exit_code = stdout.channel.recv_exit_status()
+        if exit_code != 0:
+            print(f"❌ Query failed with exit code {exit_code}")
+            error = stderr.read().decode('utf-8')
+            if error:
+                print(f"Error: {error}")
+        else:
+            print(f"❌ No response from Prometheus")
+        return 1
     
     try:
-        # Add src directory to path for imports
-        sys.path.insert(0, str(Path(__file__).parent / 'src'))
+        print_json_stream(head, stdout)
+    except JSON_ERRORS as e:
+        print(f"❌ Invalid JSON response: {e}")
+        print(f"Raw response: {head[:500].decode('utf-8', errors='replace')}")
+        return 1
+    
+    exit_code = stdout.channel.recv_exit_status()
+    if exit_code != 0:
+        print(f"❌ Query failed with exit code {exit_code}")
+        error = stderr.read().decode('utf-8')
+        if error:
+            print(f"Error: {error}")
+        return 1
+    return 0
+
+def format_timestamp(timestamp: float) -> str:
+    """Format an epoch timestamp in local time for display"""
+    return strftime(TIMESTAMP_FORMAT, localtime(timestamp))
+
+def write_lines(lines):
+    """Write newline-terminated lines with one write per OUTPUT_CHUNK_LINES lines
+    
+    A line-buffered terminal flushes on every write that contains a newline,
+    so the lines are joined first instead of being printed one by one.
+    """
+    lines = iter(lines)
+    while True:
+        chunk = ''.join(islice(lines, OUTPUT_CHUNK_LINES))
+        if not chunk:
+            break
+        sys.stdout.write(chunk)
+
+def write_job_rows(jobs):
+    """Write one formatted table row per SLURM job"""
+    format_row = JOB_ROW_FORMAT.format_map
+    write_lines(map(format_row, jobs))
+
+class PrometheusServiceIndex:
+    """Prometheus services known to the orchestrator, listed at most once
+    
+    Resolves exact or partial service IDs to hosts for the metric commands
+    without re-listing and re-scanning all services for every lookup.
+    """
+    
+    def __init__(self, servers):
+        self.servers = servers
+        self._services = None
+    
+    @property
+    def services(self) -> list:
+        """Tracked and SLURM-only services whose ID names Prometheus"""
+        if self._services is None:
+            all_services = self.servers.list_all_services()['all_services']
+            self._services = [s for s in all_services
+                              if 'prometheus' in s['service_id'].lower()]
+        return self._services
+    
+    def find(self, partial_id: str):
+        """Return the first Prometheus service whose ID contains partial_id"""
+        for service in self.services:
+            if partial_id in service['service_id']:
+                return service
+        return None
+    
+    def resolve_host(self, service_id: str):
+        """Resolve a service ID, falling back to a partial-ID match
         
-        # Import modules (will fail gracefully if dependencies missing)
-        from orchestrator import BenchmarkOrchestrator
+        Returns (service_id, host); service_id is the full ID of the matched
+        service when the partial match was used, host is None if unresolved.
+        """
+        host = self.servers.get_service_host(service_id)
+        if host:
+            return service_id, host
         
-        # Initialize the orchestrator
-        interface = BenchmarkOrchestrator(config_path=args.config)
+        match = self.find(service_id)
+        if match:
+            service_id = match['service_id']
+            print(f"Found Prometheus service: {service_id}")
+            host = self.servers.get_service_host(service_id)
+        return service_id, host
+
+class ListingSnapshot:
+    """Recent result of a listing call shared between interactive menu actions
+    
+    The listing is fetched again once it is older than max_age seconds or
+    after invalidate(), which is called whenever services are stopped.
+    """
+    
+    def __init__(self, fetch, max_age: float = SNAPSHOT_MAX_AGE):
+        self.fetch = fetch
+        self.max_age = max_age
+        self._listing = None
+        self._fetched_at = 0.0
+    
+    def get(self):
+        """Return the cached listing, refreshing it if it has expired"""
+        if self._listing is None or time.monotonic() - self._fetched_at > self.max_age:
+            self._listing = self.fetch()
+            self._fetched_at = time.monotonic()
+        return self._listing
+    
+    def invalidate(self):
+        """Drop the cached listing"""
+        self._listing = None
+
+class InteractiveMenu:
+    """Service management menu shown when main.py runs without an action"""
+    
+    def __init__(self, interface):
+        self.interface = interface
+        self.services_snapshot = ListingSnapshot(interface.servers.list_all_services)
+        self.monitors_snapshot = ListingSnapshot(interface.monitors.list_running_monitors)
+        self.actions = {
+            '0': self.refresh,
+            '1': self.list_services,
+            '2': self.list_clients,
+            '3': self.show_status,
+            '4': self.stop_service,
+            '5': self.stop_all_services,
+            '6': self.show_sessions,
+            '7': self.debug_services,
+            '8': self.list_all_services,
+            '9': self.list_monitors,
+            '10': self.monitor_status,
+            '11': self.query_metrics,
+        }
+    
+    def run(self):
+        """Prompt for commands until the user exits"""
+        sys.stdout.write(MENU_BANNER)
+        
+        while True:
+            try:
+                choice = input(MENU_PROMPT).strip()
+                if choice == '12':
+                    break
+                action = self.actions.get(choice)
+                if action is None:
+                    print("Invalid choice. Please enter 0-12.")
+                else:
+                    action()
+            except KeyboardInterrupt:
+                print("\nExiting...")
+                break
+    
+    def refresh(self):
+        """Drop the cached listings so the next command queries SLURM again, and pick up edited client recipes"""
+        self.services_snapshot.invalidate()
+        self.monitors_snapshot.invalidate()
+        if self.interface.ssh_client:
+            self.interface.ssh_client.clear_job_cache()
+        self.interface.clients.reload_definitions()
+        print("Listings will be refreshed on the next command")
+    
+    def list_services(self):
+        """List available service types"""
+        services = self.interface.servers.list_available_services()
+        print("Available Services:", services)
+    
+    def list_clients(self):
+        """List available client types"""
+        clients = self.interface.clients.list_available_clients()
+        print("Available Clients:", clients)
+    
+    def show_status(self):
+        """Show tracked services and clients"""
+        status = self.interface.get_system_status()
+        print(f"SSH Connected: {status['ssh_connected']}")
+        print(f"Tracked Services: {status['services']['total_services']}")
+        print(f"Tracked Clients: {status['clients']['total_clients']}")
         
-        if args.list_services:
-            services = interface.servers.list_available_services()
-            print("Available Services:")
-            for service in services:
-                print(f"  - {service}")
+        if status['services']['services']:
+            print("\nRunning Services:")
+            write_lines(TRACKED_ROW_FORMAT.format(service_id, *status_and_job(service_info))
+                        for service_id, service_info in status['services']['services'].items())
+    
+    def stop_service(self):
+        """Stop one service chosen from the listing"""
+        all_services = self.services_snapshot.get()
         
-        elif args.list_clients:
-            clients = interface.clients.list_available_clients()
-            print("Available Clients:")
-            for client in clients:
-                print(f"  - {client}")
+        if not all_services['all_services']:
+            print("No services are currently available")
+            return
         
-        elif args.status:
-            # Use SLURM-based status as default since it's more reliable
-            slurm_status = interface.get_slurm_status()
-            
-            if 'error' in slurm_status:
-                print(f"❌ Error getting SLURM status: {slurm_status['error']}")
-                return 1
-            
-            print("SLURM Job Status:")
-            print(f"  Total Jobs: {slurm_status['total_jobs']}")
-            print(f"  Services: {slurm_status['services']['count']}")
-            print(f"  Clients: {slurm_status['clients']['count']}")
-            print(f"  Other: {slurm_status['other']['count']}")
-            
-            # Show services
-            if slurm_status['services']['jobs']:
-                print("\nServices:")
-                for job in slurm_status['services']['jobs']:
-                    print(f"  {job['job_id']:>8} | {job['name']:>15} | {job['state']:>10} | {job['time']:>8} | {job['nodes']}")
-            
-            # Show clients  
-            if slurm_status['clients']['jobs']:
-                print("\nClients:")
-                for job in slurm_status['clients']['jobs']:
-                    print(f"  {job['job_id']:>8} | {job['name']:>15} | {job['state']:>10} | {job['time']:>8} | {job['nodes']}")
-            
-            # Show other jobs
-            if slurm_status['other']['jobs']:
-                print("\nOther Jobs:")
-                for job in slurm_status['other']['jobs']:
-                    print(f"  {job['job_id']:>8} | {job['name']:>15} | {job['state']:>10} | {job['time']:>8} | {job['nodes']}")
-        
-        elif args.slurm_status:
-            # Alternative detailed SLURM view
-            status = interface.get_system_status()
-            print("Orchestrator Internal Status:")
-            print(f"  SSH Connected: {status['ssh_connected']}")
-            print(f"  Tracked Services: {status['services']['total_services']}")
-            print(f"  Tracked Clients: {status['clients']['total_clients']}")
-            print(f"  Active Sessions: {status['active_sessions']}")
-            
-            # Show detailed status for each service
-            if status['services']['services']:
-                print("\nTracked Services:")
-                for service_id, service_info in status['services']['services'].items():
-                    print(f"  {service_id}: {service_info.get('status', 'unknown')} (Job: {service_info.get('job_id', 'N/A')})")
-            
-            # Show detailed status for each client
-            if status['clients']['clients']:
-                print("\nTracked Clients:")
-                for client_id, client_info in status['clients']['clients'].items():
-                    print(f"  {client_id}: {client_info.get('status', 'unknown')} (Job: {client_info.get('job_id', 'N/A')})")
-        
-        elif args.clear_state:
-            print("Clearing all tracked services and clients...")
-            cleared_services, cleared_clients = interface.clear_all_state()
-            print(f"✅ Cleared {cleared_services} services and {cleared_clients} clients from tracking.")
-            print("Note: This does not cancel actual SLURM jobs, only clears internal tracking.")
-        
-        elif args.stop_service:
-            service_id = args.stop_service
-            print(f"Stopping service: {service_id}")
-            
-            success = interface.stop_service(service_id)
-            if success:
-                print(f"✅ Service {service_id} stopped successfully")
+        print("Available services:")
+        write_lines(f"  {i}. {service['service_id']} - {service['status']} (Job: {service['job_id']}) [{service['type']}]\n"
+                    for i, service in enumerate(all_services['all_services'], 1))
+        
+        try:
+            choice_num = int(input("Enter service number to stop (or 0 to cancel): ").strip())
+            if choice_num == 0:
+                return
+            elif 1 <= choice_num <= len(all_services['all_services']):
+                selected_service = all_services['all_services'][choice_num - 1]
+                service_id = selected_service['service_id']
+                print(f"Stopping service: {service_id}")
+                self.services_snapshot.invalidate()
+                self.monitors_snapshot.invalidate()
+                if self.interface.stop_service(service_id):
+                    print(f"✅ Service {service_id} stopped successfully")
+                else:
+                    print(f"❌ Failed to stop service {service_id}")
             else:
-                print(f"❌ Failed to stop service {service_id}")
-                print("Check if the service ID is valid and the service is running")
-                return 1
+                print("Invalid service number")
+        except ValueError:
+            print("Please enter a valid number")
+    
+    def stop_all_services(self):
+        """Stop all active services after confirmation"""
+        all_services = self.services_snapshot.get()
+        
+        if not all_services['all_services']:
+            print("No services found")
+            return
+        
+        active_services = [s for s in all_services['all_services'] 
+                         if s['status'] in ACTIVE_STATES]
+        
+        if not active_services:
+            print("No active services found")
+            return
+        
+        print(f"Found {len(active_services)} active services:")
+        write_lines(f"  - {service['service_id']} ({service['status']})\n"
+                    for service in active_services)
+        
+        confirm = input(f"Stop {len(active_services)} active services? (y/N): ").strip().lower()
+        if confirm == 'y':
+            self.services_snapshot.invalidate()
+            self.monitors_snapshot.invalidate()
+            results = self.interface.stop_all_services()
         
-        elif args.stop_all_services:
-            print("Stopping all running services...")
-            
-            results = interface.stop_all_services()
-            
             if 'error' in results:
                 print(f"❌ Error: {results['error']}")
-                return 1
-            
-            if results['total_services'] == 0:
-                print("No running services found")
-                return 0
-            
-            print(f"✅ Stopped {results['stopped_services']}/{results['total_services']} services")
-            
-            if results['failed_services'] > 0:
-                print(f"❌ Failed to stop {results['failed_services']} services:")
-                for service_id, result in results['results'].items():
-                    if result != 'stopped':
-                        print(f"  {service_id}: {result}")
-        
-        elif args.stop_session:
-            session_id = args.stop_session
-            print(f"Stopping benchmark session: {session_id}")
-            
-            success = interface.stop_benchmark_session(session_id)
-            if success:
-                print(f"✅ Benchmark session {session_id} stopped successfully")
             else:
-                print(f"❌ Failed to stop benchmark session {session_id}")
-                print("Check if the session ID is valid and the session is active")
-                return 1
+                print(f"✅ Stopped {results['stopped_services']}/{results['total_services']} services")
+                if results['failed_services'] > 0:
+                    print(f"❌ Failed to stop {results['failed_services']} services")
+        else:
+            print("Operation cancelled")
+    
+    def show_sessions(self):
+        """Show benchmark sessions started in this process"""
+        sessions = self.interface._active_sessions
+        if not sessions:
+            print("No active sessions")
+        else:
+            print("Active sessions:")
+            write_lines(f"  {session_id}: {session_info.status} - Services: {len(session_info.services)}, Clients: {len(session_info.clients)}\n"
+                        for session_id, session_info in sessions.items())
+    
+    def debug_services(self):
+        """Show debug information for services"""
+        print("Debug information for services:")
+        debug_info = self.interface.debug_services()
         
-        elif args.debug_services:
-            print("Debug information for all services:")
-            debug_info = interface.debug_services()
-            
-            if 'error' in debug_info:
-                print(f"❌ Error: {debug_info['error']}")
-                return 1
-            
-            print(f"\n📊 Tracked Services ({len(debug_info['tracked_services'])})")
-            for service_id, info in debug_info['tracked_services'].items():
-                print(f"  {service_id}:")
-                print(f"    Job ID: {info['job_id']}")
-                print(f"    Status: {info['status']}")
-                print(f"    Submitted: {info['submitted_at']}")
-            
-            print(f"\n🔧 SLURM Jobs ({len(debug_info['slurm_jobs'])})")
-            for job in debug_info['slurm_jobs']:
-                tracked_mark = "✅" if job['is_tracked'] else "❌"
-                print(f"  {tracked_mark} {job['job_id']} | {job['name']} | {job['state']} | {job['time']}")
-            
-            print(f"\n📋 All Services Summary:")
-            all_services = debug_info['all_services']
-            print(f"  Tracked: {len(all_services['tracked_services'])}")
-            print(f"  SLURM-only: {len(all_services['slurm_services'])}")
-            print(f"  Total: {len(all_services['all_services'])}")
-        
-        elif args.list_all_services:
-            print("All services (tracked and SLURM-only):")
-            all_services = interface.servers.list_all_services()
-            
-            if all_services['tracked_services']:
-                print(f"\n📊 Tracked Services ({len(all_services['tracked_services'])}):")
-                for service in all_services['tracked_services']:
-                    print(f"  {service['service_id']} (Job: {service['job_id']}) - {service['status']}")
-            
-            if all_services['slurm_services']:
-                print(f"\n🔧 SLURM-only Services ({len(all_services['slurm_services'])}):")
-                for service in all_services['slurm_services']:
-                    print(f"  {service['service_id']} (Job: {service['job_id']}) - {service['status']}")
-            
-            if not all_services['all_services']:
-                print("No services found")
+        if 'error' in debug_info:
+            print(f"❌ Error: {debug_info['error']}")
+        else:
+            print(f"\nTracked Services: {len(debug_info['tracked_services'])}")
+            print(f"SLURM Jobs: {len(debug_info['slurm_jobs'])}")
+            print(f"Service Mapping: {len(debug_info['service_mapping'])} entries")
         
-        elif args.list_running_services:
-            print("Currently running services:")
-            all_services = interface.servers.list_all_services()
-            
-            running_services = [s for s in all_services['all_services'] 
-                              if s['status'].upper() in ['RUNNING', 'PENDING']]
-            
-            if not running_services:
-                print("  No running services found")
-                print("\nTo start a service, use:")
-                print("  python main.py --recipe recipes/services/ollama.yaml")
-            else:
-                print(f"\nFound {len(running_services)} running services:")
-                for service in running_services:
-                    type_marker = "📊" if service['type'] == 'tracked' else "🔧"
-                    print(f"  {type_marker} {service['service_id']} (Job: {service['job_id']}) - {service['status']}")
-                
-                print(f"\nTo target a service, use:")
-                print(f"  python main.py --recipe recipes/clients/ollama_benchmark.yaml --target-service <SERVICE_ID>")
+            if debug_info['tracked_services']:
+                print("\nTracked Services:")
+                write_lines(f"  {service_id} -> Job {info['job_id']} ({info['status']})\n"
+                            for service_id, info in debug_info['tracked_services'].items())
+    
+    def list_all_services(self):
+        """List tracked and SLURM-only services"""
+        all_services = self.services_snapshot.get()
         
-        elif args.list_monitors:
-            print("Running monitors/Prometheus services:")
-            
-            # Check monitors module
-            running_monitors = interface.monitors.list_running_monitors()
-            
-            # Check for Prometheus services
-            all_services = interface.servers.list_all_services()
-            prometheus_services = [s for s in all_services['all_services'] 
-                                  if 'prometheus' in s['service_id'].lower() and 
-                                  s['status'].upper() in ['RUNNING', 'PENDING']]
-            
-            if not running_monitors and not prometheus_services:
-                print("  No running monitors found")
-                print("\nTo start a monitor, use:")
-                print("  python main.py --recipe recipes/services/prometheus.yaml --target-service <SERVICE_ID>")
-            else:
-                total_count = len(running_monitors) + len(prometheus_services)
-                print(f"\nFound {total_count} running Prometheus instance(s):")
-                
-                # Show monitors from monitors module
-                if running_monitors:
-                    print("\n  From Monitors Module:")
-                    for monitor_id in running_monitors:
-                        status = interface.monitors.check_monitor_status(monitor_id)
-                        endpoint = interface.monitors.get_monitor_endpoint(monitor_id)
-                        print(f"    📊 {monitor_id}")
-                        print(f"       Status: {status['status']}")
-                        print(f"       Job ID: {status.get('job_id', 'N/A')}")
-                        if endpoint:
-                            print(f"       Endpoint: {endpoint}")
-                
-                # Show Prometheus services
-                if prometheus_services:
-                    print("\n  From Services:")
-                    for service in prometheus_services:
-                        service_id = service['service_id']
-                        host = interface.servers.get_service_host(service_id)
-                        endpoint = f"http://{host}:9090" if host else "Not assigned"
-                        print(f"    📊 {service_id}")
-                        print(f"       Status: {service['status']}")
-                        print(f"       Job ID: {service['job_id']}")
-                        print(f"       Endpoint: {endpoint}")
-                
-                print(f"\nTo query metrics, use:")
-                print(f"  python main.py --query-metrics <SERVICE_ID> \"up\"")
+        print(f"All Services Summary:")
+        print(f"  Tracked: {len(all_services['tracked_services'])}")
+        print(f"  SLURM-only: {len(all_services['slurm_services'])}")
+        print(f"  Total: {len(all_services['all_services'])}")
         
-        elif args.monitor_status:
-            monitor_id = args.monitor_status
-            print(f"Monitor status: {monitor_id}")
-            
-            status = interface.monitors.check_monitor_status(monitor_id)
-            
-            if 'error' in status:
-                print(f"❌ Error: {status['error']}")
-                return 1
-            
-            print(f"  Monitor ID: {status['monitor_id']}")
-            print(f"  Status: {status['status']}")
-            print(f"  Job ID: {status.get('job_id', 'N/A')}")
-            
-            if status.get('nodes'):
-                print(f"  Nodes: {', '.join(status['nodes'])}")
-            
-            if status.get('submitted_at'):
-                from datetime import datetime
-                submit_time = datetime.fromtimestamp(status['submitted_at'])
-                print(f"  Submitted: {submit_time}")
-            
-            # Try to get endpoint
-            endpoint = interface.monitors.get_monitor_endpoint(monitor_id)
-            if endpoint:
-                print(f"  Endpoint: {endpoint}")
-                print(f"  UI: {endpoint}/graph")
-        
-        elif args.stop_monitor:
-            monitor_id = args.stop_monitor
-            print(f"Stopping monitor: {monitor_id}")
-            
-            success = interface.monitors.stop_monitor(monitor_id)
-            if success:
-                print(f"✅ Monitor {monitor_id} stopped successfully")
-            else:
-                print(f"❌ Failed to stop monitor {monitor_id}")
-                return 1
+        if all_services['all_services']:
+            print("\nAll Services:")
+            write_lines(f"  {'📊' if service['type'] == 'tracked' else '🔧'} {service['service_id']} (Job: {service['job_id']}) - {service['status']}\n"
+                        for service in all_services['all_services'])
+    
+    def list_monitors(self):
+        """List running monitors with their endpoints"""
+        running_monitors = self.monitors_snapshot.get()
         
-        elif args.query_metrics:
-            monitor_id, query = args.query_metrics
-            print(f"Querying metrics from monitor/service {monitor_id}")
-            print(f"Query: {query}")
-            
-            # Try to query from monitors module first
-            result = interface.monitors.query_metrics(monitor_id, query)
-            
-            # If not found in monitors, try as a service (Prometheus started via --recipe)
-            if 'error' in result and 'not available' in result['error'].lower():
-                print(f"Not found in monitors, trying as a service...")
-                
-                # Get the host for this service/monitor
-                host = interface.servers.get_service_host(monitor_id)
-                
-                if not host:
-                    # Try searching by partial ID match
-                    all_services = interface.servers.list_all_services()
-                    matching_services = [s for s in all_services['all_services'] 
-                                       if monitor_id in s['service_id'] and 'prometheus' in s['service_id'].lower()]
-                    
-                    if matching_services:
-                        service_id = matching_services[0]['service_id']
-                        print(f"Found Prometheus service: {service_id}")
-                        host = interface.servers.get_service_host(service_id)
-                
-                if host:
-                    # Build Prometheus endpoint and query via SSH
-                    endpoint = f"http://{host}:9090"
-                    print(f"Using endpoint: {endpoint}")
-                    
-                    try:
-                        import json
-                        import urllib.parse
-                        
-                        # Build the curl command to run on the cluster
-                        query_url = f"{endpoint}/api/v1/query"
-                        # URL-encode the query parameter properly
-                        encoded_query = urllib.parse.quote(query)
-                        curl_cmd = f"curl -s '{query_url}?query={encoded_query}'"
-                        
-                        print(f"Executing query via SSH...")
-                        exit_code, stdout, stderr = interface.ssh_client.execute_command(curl_cmd)
-                        
-                        if exit_code != 0:
-                            print(f"❌ Query failed with exit code {exit_code}")
-                            if stderr:
-                                print(f"Error: {stderr}")
-                            return 1
-                        
-                        if not stdout or not stdout.strip():
-                            print(f"❌ No response from Prometheus")
-                            return 1
-                        
-                        # Parse and display the result
-                        try:
-                            result = json.loads(stdout)
-                            print("\nResult:")
-                            print(json.dumps(result, indent=2))
-                        except json.JSONDecodeError as e:
-                            print(f"❌ Invalid JSON response: {e}")
-                            print(f"Raw response: {stdout[:500]}")
-                            return 1
-                    except Exception as e:
-                        print(f"❌ Error querying Prometheus: {e}")
-                        return 1
-                else:
-                    print(f"❌ Could not find Prometheus service with ID containing: {monitor_id}")
-                    print("Available services:")
-                    all_services = interface.servers.list_all_services()
-                    for s in all_services['all_services']:
-                        if 'prometheus' in s['service_id'].lower():
-                            print(f"  {s['service_id']} (Job: {s['job_id']}) - {s['status']}")
-                    return 1
-            elif 'error' in result:
-                print(f"❌ Error: {result['error']}")
-                return 1
+        if not running_monitors:
+            print("No running monitors")
+        else:
+            print(f"Running monitors ({len(running_monitors)}):")
+            statuses = self.interface.monitors.bulk_status(running_monitors)
+            endpoints = self.interface.monitors.bulk_endpoints(running_monitors)
+            for monitor_id in running_monitors:
+                status = statuses[monitor_id]
+                endpoint = endpoints[monitor_id]
+                print(f"  📊 {monitor_id} - {status['status']}")
+                if endpoint:
+                    print(f"     {endpoint}")
+    
+    def monitor_status(self):
+        """Show the status of one monitor"""
+        running_monitors = self.monitors_snapshot.get()
+        
+        if not running_monitors:
+            print("No running monitors")
+            return
+        
+        print("Available monitors:")
+        for i, monitor_id in enumerate(running_monitors, 1):
+            print(f"  {i}. {monitor_id}")
+        
+        try:
+            choice_num = int(input("Enter monitor number (or 0 to cancel): ").strip())
+            if choice_num == 0:
+                return
+            elif 1 <= choice_num <= len(running_monitors):
+                monitor_id = running_monitors[choice_num - 1]
+                status = self.interface.monitors.check_monitor_status(monitor_id)
+        
+                print(f"\nMonitor: {monitor_id}")
+                print(f"  Status: {status['status']}")
+                print(f"  Job ID: {status.get('job_id', 'N/A')}")
+        
+                endpoint = self.interface.monitors.get_monitor_endpoint(monitor_id)
+                if endpoint:
+                    print(f"  Endpoint: {endpoint}")
+                    print(f"  UI: {endpoint}/graph")
             else:
-                # Pretty print the result
-                import json
-                print("\nResult:")
-                print(json.dumps(result, indent=2))
-        
-        elif args.list_available_metrics:
-            service_id = args.list_available_metrics
-            print(f"Listing available metrics from Prometheus service {service_id}")
-            
-            # Get the host for this service
-            host = interface.servers.get_service_host(service_id)
-            
-            if not host:
-                # Try searching by partial ID match
-                all_services = interface.servers.list_all_services()
-                matching_services = [s for s in all_services['all_services'] 
-                                   if service_id in s['service_id'] and 'prometheus' in s['service_id'].lower()]
-                
-                if matching_services:
-                    service_id = matching_services[0]['service_id']
-                    print(f"Found Prometheus service: {service_id}")
-                    host = interface.servers.get_service_host(service_id)
-            
-            if not host:
-                print(f"❌ Could not find Prometheus service with ID containing: {service_id}")
-                return 1
-            
-            # Build Prometheus endpoint
-            endpoint = f"http://{host}:9090"
-            print(f"Using endpoint: {endpoint}")
-            
-            try:
-                import json
-                import urllib.parse
-                
-                # Query Prometheus for all metric names using label_values
-                query = "{__name__=~\".+\"}"
-                query_url = f"{endpoint}/api/v1/series"
-                encoded_query = urllib.parse.quote(query)
-                curl_cmd = f"curl -s '{query_url}?match[]={encoded_query}'"
-                
-                print(f"Fetching metric names...")
-                exit_code, stdout, stderr = interface.ssh_client.execute_command(curl_cmd)
-                
-                if exit_code != 0 or not stdout or not stdout.strip():
-                    print(f"❌ Failed to fetch metrics")
-                    return 1
-                
-                # Parse the result
-                try:
-                    result = json.loads(stdout)
-                    
-                    if result.get('status') != 'success':
-                        print(f"❌ Error: {result.get('error', 'Unknown error')}")
-                        return 1
-                    
-                    # Extract unique metric names
-                    metric_names = set()
-                    for series in result.get('data', []):
-                        if '__name__' in series:
-                            metric_names.add(series['__name__'])
-                    
-                    if not metric_names:
-                        print("\n⚠️  No metrics found!")
-                        print("\nThis could mean:")
-                        print("  1. The target service doesn't expose Prometheus metrics")
-                        print("  2. Prometheus hasn't scraped the target yet (wait a moment)")
-                        print("  3. The target is down (check with: python main.py --query-metrics", service_id, "\"up\")")
-                        return 0
-                    
-                    # Sort and display metrics
-                    sorted_metrics = sorted(metric_names)
-                    
-                    print(f"\n✅ Found {len(sorted_metrics)} available metrics:\n")
-                    
-                    # Group metrics by prefix for better readability
-                    grouped = {}
-                    for metric in sorted_metrics:
-                        prefix = metric.split('_')[0] if '_' in metric else 'other'
-                        if prefix not in grouped:
-                            grouped[prefix] = []
-                        grouped[prefix].append(metric)
-                    
-                    # Display grouped metrics
-                    for prefix in sorted(grouped.keys()):
-                        print(f"  [{prefix}]")
-                        for metric in grouped[prefix]:
-                            print(f"    - {metric}")
-                        print()
-                    
-                    print(f"\n💡 To query a metric, use:")
-                    print(f"  python main.py --query-metrics {service_id} \"<metric_name>\"")
-                    print(f"\nExample:")
-                    if 'up' in metric_names:
-                        print(f"  python main.py --query-metrics {service_id} \"up\"")
+                print("Invalid monitor number")
+        except ValueError:
+            print("Please enter a valid number")
+    
+    def query_metrics(self):
+        """Run a PromQL query against one monitor"""
+        running_monitors = self.monitors_snapshot.get()
+        
+        if not running_monitors:
+            print("No running monitors")
+            return
+        
+        print("Available monitors:")
+        for i, monitor_id in enumerate(running_monitors, 1):
+            print(f"  {i}. {monitor_id}")
+        
+        try:
+            choice_num = int(input("Enter monitor number (or 0 to cancel): ").strip())
+            if choice_num == 0:
+                return
+            elif 1 <= choice_num <= len(running_monitors):
+                monitor_id = running_monitors[choice_num - 1]
+                query = input("Enter PromQL query (e.g., 'up'): ").strip()
+        
+                if query:
+                    result = self.interface.monitors.query_metrics(monitor_id, query)
+        
+                    if 'error' in result:
+                        print(f"❌ Error: {result['error']}")
                     else:
-                        print(f"  python main.py --query-metrics {service_id} \"{sorted_metrics[0]}\"")
-                    
-                except json.JSONDecodeError as e:
-                    print(f"❌ Invalid JSON response: {e}")
-                    print(f"Raw response: {stdout[:500]}")
-                    return 1
-                    
-            except Exception as e:
-                print(f"❌ Error listing metrics: {e}")
-                return 1
+                        print("\nResult:")
+                        write_query_result(result)
+            else:
+                print("Invalid monitor number")
+        except ValueError:
+            print("Please enter a valid number")
+
+def is_installed(module, distribution):
+    """Whether a distribution is installed, or at least its module can be found"""
+    try:
+        importlib.metadata.distribution(distribution)
+        return True
+    except importlib.metadata.PackageNotFoundError:
+        return importlib.util.find_spec(module) is not None
+
+@functools.lru_cache(maxsize=1)
+def check_dependencies():
+    """Check if required dependencies are available
+    
+    Uses installed package metadata (falling back to a module spec lookup)
+    rather than importing the modules, so heavy imports such as paramiko are
+    not paid for by the check itself. The result is computed once per process.
+    """
+    return tuple(module for module, distribution in REQUIRED_DISTRIBUTIONS.items()
+                 if not is_installed(module, distribution))
+
+def cmd_list_services(interface, args):
+    """List available services"""
+    services = interface.servers.list_available_services()
+    print("Available Services:")
+    write_lines(f"  - {service}\n" for service in services)
+
+def cmd_list_clients(interface, args):
+    """List available clients"""
+    clients = interface.clients.list_available_clients()
+    print("Available Clients:")
+    write_lines(f"  - {client}\n" for client in clients)
+
+def cmd_status(interface, args):
+    """Show system status"""
+    # Use SLURM-based status as default since it's more reliable
+    slurm_status = interface.get_slurm_status()
+    
+    if 'error' in slurm_status:
+        print(f"❌ Error getting SLURM status: {slurm_status['error']}")
+        return 1
+    
+    services, clients, other = (slurm_status[key] for key, _ in STATUS_SECTIONS)
+    print("SLURM Job Status:")
+    print(f"  Total Jobs: {slurm_status['total_jobs']}")
+    print(f"  Services: {services['count']}")
+    print(f"  Clients: {clients['count']}")
+    print(f"  Other: {other['count']}")
+    
+    # Every section comes from the single squeue call made by
+    # get_slurm_status, so render them from that one table
+    for (_, title), section in zip(STATUS_SECTIONS, (services, clients, other)):
+        jobs = section['jobs']
+        if jobs:
+            print(f"\n{title}:")
+            write_job_rows(jobs)
+
+def cmd_slurm_status(interface, args):
+    """Show the orchestrator's internal view of tracked jobs"""
+    # Alternative detailed SLURM view
+    status = interface.get_system_status()
+    print("Orchestrator Internal Status:")
+    print(f"  SSH Connected: {status['ssh_connected']}")
+    print(f"  Tracked Services: {status['services']['total_services']}")
+    print(f"  Tracked Clients: {status['clients']['total_clients']}")
+    print(f"  Active Sessions: {status['active_sessions']}")
+    
+    # Show detailed status for each service
+    if status['services']['services']:
+        print("\nTracked Services:")
+        write_lines(TRACKED_ROW_FORMAT.format(service_id, *status_and_job(service_info))
+                    for service_id, service_info in status['services']['services'].items())
+    
+    # Show detailed status for each client
+    if status['clients']['clients']:
+        print("\nTracked Clients:")
+        write_lines(TRACKED_ROW_FORMAT.format(client_id, *status_and_job(client_info))
+                    for client_id, client_info in status['clients']['clients'].items())
+
+def cmd_clear_state(interface, args):
+    """Clear all tracked services and clients"""
+    print("Clearing all tracked services and clients...")
+    cleared_services, cleared_clients = interface.clear_all_state()
+    print(f"✅ Cleared {cleared_services} services and {cleared_clients} clients from tracking.")
+    print("Note: This does not cancel actual SLURM jobs, only clears internal tracking.")
+
+def cmd_stop_service(interface, args):
+    """Stop a running service by ID"""
+    service_id = args.stop_service
+    print(f"Stopping service: {service_id}")
+    
+    success = interface.stop_service(service_id)
+    if success:
+        print(f"✅ Service {service_id} stopped successfully")
+    else:
+        print(f"❌ Failed to stop service {service_id}")
+        print("Check if the service ID is valid and the service is running")
+        return 1
+
+def cmd_stop_all_services(interface, args):
+    """Stop all running services"""
+    print("Stopping all running services...")
+    
+    results = interface.stop_all_services()
+    
+    if 'error' in results:
+        print(f"❌ Error: {results['error']}")
+        return 1
+    
+    if results['total_services'] == 0:
+        print("No running services found")
+        return 0
+    
+    print(f"✅ Stopped {results['stopped_services']}/{results['total_services']} services")
+    
+    if results['failed_services'] > 0:
+        print(f"❌ Failed to stop {results['failed_services']} services:")
+        for service_id, result in results['results'].items():
+            if result != 'stopped':
+                print(f"  {service_id}: {result}")
+
+def cmd_stop_session(interface, args):
+    """Stop a benchmark session by ID"""
+    session_id = args.stop_session
+    print(f"Stopping benchmark session: {session_id}")
+    
+    success = interface.stop_benchmark_session(session_id)
+    if success:
+        print(f"✅ Benchmark session {session_id} stopped successfully")
+    else:
+        print(f"❌ Failed to stop benchmark session {session_id}")
+        print("Check if the session ID is valid and the session is active")
+        return 1
+
+def cmd_debug_services(interface, args):
+    """Show detailed debug information about all services"""
+    print("Debug information for all services:")
+    debug_info = interface.debug_services()
+    
+    if 'error' in debug_info:
+        print(f"❌ Error: {debug_info['error']}")
+        return 1
+    
+    print(f"\n📊 Tracked Services ({len(debug_info['tracked_services'])})")
+    write_lines(f"  {service_id}:\n"
+                f"    Job ID: {info['job_id']}\n"
+                f"    Status: {info['status']}\n"
+                f"    Submitted: {info['submitted_at']}\n"
+                for service_id, info in debug_info['tracked_services'].items())
+    
+    print(f"\n🔧 SLURM Jobs ({len(debug_info['slurm_jobs'])})")
+    write_lines(f"  {'✅' if job['is_tracked'] else '❌'} {job['job_id']} | {job['name']} | {job['state']} | {job['time']}\n"
+                for job in debug_info['slurm_jobs'])
+    
+    print(f"\n📋 All Services Summary:")
+    all_services = debug_info['all_services']
+    print(f"  Tracked: {len(all_services['tracked_services'])}")
+    print(f"  SLURM-only: {len(all_services['slurm_services'])}")
+    print(f"  Total: {len(all_services['all_services'])}")
+
+def cmd_list_all_services(interface, args):
+    """List all services (tracked and SLURM-only)"""
+    print("All services (tracked and SLURM-only):")
+    all_services = interface.servers.list_all_services()
+    
+    if all_services['tracked_services']:
+        print(f"\n📊 Tracked Services ({len(all_services['tracked_services'])}):")
+        write_lines(f"  {service['service_id']} (Job: {service['job_id']}) - {service['status']}\n"
+                    for service in all_services['tracked_services'])
+    
+    if all_services['slurm_services']:
+        print(f"\n🔧 SLURM-only Services ({len(all_services['slurm_services'])}):")
+        write_lines(f"  {service['service_id']} (Job: {service['job_id']}) - {service['status']}\n"
+                    for service in all_services['slurm_services'])
+    
+    if not all_services['all_services']:
+        print("No services found")
+
+def cmd_list_running_services(interface, args):
+    """List only running services with their IDs"""
+    print("Currently running services:")
+    all_services = interface.servers.list_all_services()
+    
+    running_services = [s for s in all_services['all_services'] 
+                      if s['status'] in ACTIVE_STATES]
+    
+    if not running_services:
+        print("  No running services found")
+        print("\nTo start a service, use:")
+        print("  python main.py --recipe recipes/services/ollama.yaml")
+    else:
+        print(f"\nFound {len(running_services)} running services:")
+        write_lines(f"  {'📊' if service['type'] == 'tracked' else '🔧'} {service['service_id']} (Job: {service['job_id']}) - {service['status']}\n"
+                    for service in running_services)
         
-        elif args.query_service_metrics:
-            service_id, query = args.query_service_metrics
-            print(f"Querying metrics from service {service_id}")
-            print(f"Query: {query}")
-            
-            # Get service host
-            host = interface.servers.get_service_host(service_id)
-            
-            if not host:
-                print(f"❌ Could not find host for service {service_id}")
-                print("Make sure the service is running and has been assigned to a node.")
-                return 1
-            
-            # Build Prometheus endpoint (assuming port 9090 for Prometheus)
+        print(f"\nTo target a service, use:")
+        print(f"  python main.py --recipe recipes/clients/ollama_benchmark.yaml --target-service <SERVICE_ID>")
+
+def cmd_list_monitors(interface, args):
+    """List running monitors"""
+    print("Running monitors/Prometheus services:")
+    
+    with ThreadPoolExecutor(max_workers=MAX_SSH_WORKERS) as executor:
+        # Check monitors module and SLURM services concurrently
+        monitors_future = executor.submit(interface.monitors.list_running_monitors)
+        services_future = executor.submit(interface.servers.list_all_services)
+        running_monitors = monitors_future.result()
+        all_services = services_future.result()
+        
+        # Check for Prometheus services
+        prometheus_services = [s for s in all_services['all_services'] 
+                              if 'prometheus' in s['service_id'].lower() and 
+                              s['status'] in ACTIVE_STATES]
+        
+        # One squeue for all monitors; the endpoints reuse the nodes it recorded
+        monitor_statuses = interface.monitors.bulk_status(running_monitors)
+        monitor_endpoints = interface.monitors.bulk_endpoints(running_monitors)
+        # Hosts of running services were recorded by list_all_services,
+        # so only services without a node in that listing reach SLURM
+        service_hosts = list(executor.map(interface.servers.get_service_host,
+                                          [s['service_id'] for s in prometheus_services]))
+    
+    if not running_monitors and not prometheus_services:
+        print("  No running monitors found")
+        print("\nTo start a monitor, use:")
+        print("  python main.py --recipe recipes/services/prometheus.yaml --target-service <SERVICE_ID>")
+    else:
+        total_count = len(running_monitors) + len(prometheus_services)
+        print(f"\nFound {total_count} running Prometheus instance(s):")
+        
+        # Show monitors from monitors module
+        if running_monitors:
+            print("\n  From Monitors Module:")
+            for monitor_id in running_monitors:
+                status = monitor_statuses[monitor_id]
+                endpoint = monitor_endpoints[monitor_id]
+                print(f"    📊 {monitor_id}")
+                print(f"       Status: {status['status']}")
+                print(f"       Job ID: {status.get('job_id', 'N/A')}")
+                if endpoint:
+                    print(f"       Endpoint: {endpoint}")
+        
+        # Show Prometheus services
+        if prometheus_services:
+            print("\n  From Services:")
+            for service, host in zip(prometheus_services, service_hosts):
+                service_id = service['service_id']
+                endpoint = f"http://{host}:9090" if host else "Not assigned"
+                print(f"    📊 {service_id}")
+                print(f"       Status: {service['status']}")
+                print(f"       Job ID: {service['job_id']}")
+                print(f"       Endpoint: {endpoint}")
+        
+        print(f"\nTo query metrics, use:")
+        print(f"  python main.py --query-metrics <SERVICE_ID> \"up\"")
+
+def cmd_monitor_status(interface, args):
+    """Check status of a specific monitor"""
+    monitor_id = args.monitor_status
+    print(f"Monitor status: {monitor_id}")
+    
+    status = interface.monitors.check_monitor_status(monitor_id)
+    
+    if 'error' in status:
+        print(f"❌ Error: {status['error']}")
+        return 1
+    
+    print(f"  Monitor ID: {status['monitor_id']}")
+    print(f"  Status: {status['status']}")
+    print(f"  Job ID: {status.get('job_id', 'N/A')}")
+    
+    if status.get('nodes'):
+        print(f"  Nodes: {', '.join(status['nodes'])}")
+    
+    if status.get('submitted_at'):
+        print(f"  Submitted: {format_timestamp(status['submitted_at'])}")
+    
+    # Try to get endpoint
+    endpoint = interface.monitors.get_monitor_endpoint(monitor_id)
+    if endpoint:
+        print(f"  Endpoint: {endpoint}")
+        print(f"  UI: {endpoint}/graph")
+
+def cmd_stop_monitor(interface, args):
+    """Stop a running monitor"""
+    monitor_id = args.stop_monitor
+    print(f"Stopping monitor: {monitor_id}")
+    
+    success = interface.monitors.stop_monitor(monitor_id)
+    if success:
+        print(f"✅ Monitor {monitor_id} stopped successfully")
+    else:
+        print(f"❌ Failed to stop monitor {monitor_id}")
+        return 1
+
+def cmd_query_metrics(interface, args):
+    """Query Prometheus metrics from a service or monitor"""
+    monitor_id, query = args.query_metrics
+    print(f"Querying metrics from monitor/service {monitor_id}")
+    print(f"Query: {query}")
+    
+    # Try to query from monitors module first
+    result = interface.monitors.query_metrics(monitor_id, query)
+    
+    # If not found in monitors, try as a service (Prometheus started via --recipe)
+    if 'error' in result and 'not available' in result['error'].lower():
+        print(f"Not found in monitors, trying as a service...")
+        
+        # Get the host for this service/monitor (exact or partial ID)
+        prometheus_index = PrometheusServiceIndex(interface.servers)
+        _, host = prometheus_index.resolve_host(monitor_id)
+        
+        if host:
+            # Build Prometheus endpoint and query via SSH
             endpoint = f"http://{host}:9090"
             print(f"Using endpoint: {endpoint}")
             
-            # Query Prometheus via SSH (since we can't reach internal cluster hostnames from local machine)
             try:
-                import json
-                import urllib.parse
-                
-                # Build the curl command to run on the cluster
+                # Build the curl command to run on the cluster; the query
+                # is fed on stdin and URL-encoded by curl itself
                 query_url = f"{endpoint}/api/v1/query"
-                # URL-encode the query parameter properly
-                encoded_query = urllib.parse.quote(query)
-                curl_cmd = f"curl -s '{query_url}?query={encoded_query}'"
+                curl_cmd = f"curl -s --data-urlencode query@- '{query_url}'"
                 
                 print(f"Executing query via SSH...")
-                exit_code, stdout, stderr = interface.ssh_client.execute_command(curl_cmd)
-                
-                if exit_code != 0:
-                    print(f"❌ Query failed with exit code {exit_code}")
-                    if stderr:
-                        print(f"Error: {stderr}")
-                    return 1
-                
-                if not stdout or not stdout.strip():
-                    print(f"❌ No response from Prometheus")
-                    return 1
-                
-                # Parse and display the result
-                try:
-                    result = json.loads(stdout)
-                    print("\nResult:")
-                    print(json.dumps(result, indent=2))
-                except json.JSONDecodeError as e:
-                    print(f"❌ Invalid JSON response: {e}")
-                    print(f"Raw response: {stdout[:500]}")
+                if run_prometheus_query(interface.ssh_client, curl_cmd, query) != 0:
                     return 1
-                
             except Exception as e:
                 print(f"❌ Error querying Prometheus: {e}")
                 return 1
+        else:
+            print(f"❌ Could not find Prometheus service with ID containing: {monitor_id}")
+            print("Available services:")
+            for s in prometheus_index.services:
+                print(f"  {s['service_id']} (Job: {s['job_id']}) - {s['status']}")
+            return 1
+    elif 'error' in result:
+        print(f"❌ Error: {result['error']}")
+        return 1
+    else:
+        # Pretty print the result
+        print("\nResult:")
+        print(dumps_indented_json(result))
+
+def cmd_list_available_metrics(interface, args):
+    """List all available metric names from a Prometheus service"""
+    service_id = args.list_available_metrics
+    print(f"Listing available metrics from Prometheus service {service_id}")
+    
+    # Get the host for this service (exact or partial ID)
+    service_id, host = PrometheusServiceIndex(interface.servers).resolve_host(service_id)
+    
+    if not host:
+        print(f"❌ Could not find Prometheus service with ID containing: {service_id}")
+        return 1
+    
+    # Build Prometheus endpoint
+    endpoint = f"http://{host}:9090"
+    print(f"Using endpoint: {endpoint}")
+    
+    try:
+        # Query Prometheus for all metric names using label_values
+        query = "{__name__=~\".+\"}"
+        query_url = f"{endpoint}/api/v1/series"
+        curl_cmd = f"curl -s --data-urlencode 'match[]@-' '{query_url}'"
+        
+        print(f"Fetching metric names...")
+        exit_code, stdout, stderr = interface.ssh_client.execute_command(curl_cmd, input_data=query)
+        
+        if exit_code != 0 or not stdout or not stdout.strip():
+            print(f"❌ Failed to fetch metrics")
+            return 1
         
-        elif args.monitor_endpoint:
-            monitor_id = args.monitor_endpoint
+        # Parse the result
+        try:
+            result = loads_json(stdout)
+            
+            if result.get('status') != 'success':
+                print(f"❌ Error: {result.get('error', 'Unknown error')}")
+                return 1
             
-            endpoint = interface.monitors.get_monitor_endpoint(monitor_id)
+            # Extract unique metric names
+            metric_names = set()
+            for series in result.get('data', []):
+                if '__name__' in series:
+                    metric_names.add(series['__name__'])
+            
+            if not metric_names:
+                print("\n⚠️  No metrics found!")
+                print("\nThis could mean:")
+                print("  1. The target service doesn't expose Prometheus metrics")
+                print("  2. Prometheus hasn't scraped the target yet (wait a moment)")
+                print("  3. The target is down (check with: python main.py --query-metrics", service_id, "\"up\")")
+                return 0
             
-            if endpoint:
-                print(f"Prometheus endpoint for {monitor_id}:")
-                print(f"  API: {endpoint}")
-                print(f"  UI: {endpoint}/graph")
-                print(f"  Targets: {endpoint}/targets")
+            # Sort and display metrics
+            sorted_metrics = sorted(metric_names)
+            
+            print(f"\n✅ Found {len(sorted_metrics)} available metrics:\n")
+            
+            # Group metrics by prefix for better readability
+            grouped = {}
+            for metric in sorted_metrics:
+                prefix = metric.split('_')[0] if '_' in metric else 'other'
+                if prefix not in grouped:
+                    grouped[prefix] = []
+                grouped[prefix].append(metric)
+            
+            # Display grouped metrics
+            for prefix in sorted(grouped.keys()):
+                print(f"  [{prefix}]")
+                for metric in grouped[prefix]:
+                    print(f"    - {metric}")
+                print()
+            
+            print(f"\n💡 To query a metric, use:")
+            print(f"  python main.py --query-metrics {service_id} \"<metric_name>\"")
+            print(f"\nExample:")
+            if 'up' in metric_names:
+                print(f"  python main.py --query-metrics {service_id} \"up\"")
             else:
-                print(f"❌ Could not get endpoint for monitor {monitor_id}")
-                print("The monitor may not be running or not yet assigned to a node.")
-                return 1
+                print(f"  python main.py --query-metrics {service_id} \"{sorted_metrics[0]}\"")
+            
+        except json.JSONDecodeError as e:
+            print(f"❌ Invalid JSON response: {e}")
+            print(f"Raw response: {stdout[:500]}")
+            return 1
+            
+    except Exception as e:
+        print(f"❌ Error listing metrics: {e}")
+        return 1
+
+def cmd_query_service_metrics(interface, args):
+    """Query Prometheus metrics from a service"""
+    service_id, query = args.query_service_metrics
+    print(f"Querying metrics from service {service_id}")
+    print(f"Query: {query}")
+    
+    # Get service host
+    host = interface.servers.get_service_host(service_id)
+    
+    if not host:
+        print(f"❌ Could not find host for service {service_id}")
+        print("Make sure the service is running and has been assigned to a node.")
+        return 1
+    
+    # Build Prometheus endpoint (assuming port 9090 for Prometheus)
+    endpoint = f"http://{host}:9090"
+    print(f"Using endpoint: {endpoint}")
+    
+    # Query Prometheus via SSH (since we can't reach internal cluster hostnames from local machine)
+    try:
+        # Build the curl command to run on the cluster; the query
+        # is fed on stdin and URL-encoded by curl itself
+        query_url = f"{endpoint}/api/v1/query"
+        curl_cmd = f"curl -s --data-urlencode query@- '{query_url}'"
+        
+        print(f"Executing query via SSH...")
+        if run_prometheus_query(interface.ssh_client, curl_cmd, query) != 0:
+            return 1
+        
+    except Exception as e:
+        print(f"❌ Error querying Prometheus: {e}")
+        return 1
+
+def cmd_monitor_endpoint(interface, args):
+    """Get Prometheus endpoint URL for a monitor"""
+    monitor_id = args.monitor_endpoint
+    
+    endpoint = interface.monitors.get_monitor_endpoint(monitor_id)
+    
+    if endpoint:
+        print(f"Prometheus endpoint for {monitor_id}:")
+        print(f"  API: {endpoint}")
+        print(f"  UI: {endpoint}/graph")
+        print(f"  Targets: {endpoint}/targets")
+    else:
+        print(f"❌ Could not get endpoint for monitor {monitor_id}")
+        print("The monitor may not be running or not yet assigned to a node.")
+        return 1
+
+def cmd_service_endpoint(interface, args):
+    """Get endpoint URL for a service"""
+    service_id = args.service_endpoint
+    
+    host = interface.servers.get_service_host(service_id)
+    
+    if not host:
+        print(f"❌ Could not get host for service {service_id}")
+        print("The service may not be running or not yet assigned to a node.")
+        return 1
+    
+    service_type = interface.servers.get_service_type(service_id)
+    port = DEFAULT_SERVICE_PORTS.get(service_type)
+    if service_type == 'prometheus':
+        endpoint = f"http://{host}:{port}"
+        print(f"Prometheus endpoint for service {service_id}:")
+        print(f"  Host: {host}")
+        print(f"  API: {endpoint}")
+        print(f"  UI: {endpoint}/graph")
+        print(f"  Targets: {endpoint}/targets")
+        print(f"\nQuery metrics with:")
+        print(f"  python main.py --query-service-metrics {service_id} \"up\"")
+    elif port:
+        print(f"Service endpoint for {service_id}:")
+        print(f"  Host: {host}")
+        print(f"  Endpoint: http://{host}:{port}")
+    else:
+        print(f"Service endpoint for {service_id}:")
+        print(f"  Host: {host}")
+        print(f"\n(Port detection not implemented for this service type)")
+
+def cmd_create_tunnel(interface, args):
+    """Create SSH tunnel to a service"""
+    # Parse arguments: SERVICE_ID [LOCAL_PORT] [REMOTE_PORT]
+    tunnel_args = args.create_tunnel
+    
+    if len(tunnel_args) < 1:
+        print("❌ Error: SERVICE_ID is required")
+        print("Usage: --create-tunnel SERVICE_ID [LOCAL_PORT] [REMOTE_PORT]")
+        return 1
+    
+    service_id = tunnel_args[0]
+    local_port = int(tunnel_args[1]) if len(tunnel_args) > 1 else 9090
+    remote_port = int(tunnel_args[2]) if len(tunnel_args) > 2 else 9090
+    
+    print(f"Creating SSH tunnel for service: {service_id}")
+    print(f"  Local port: {local_port}")
+    print(f"  Remote port: {remote_port}")
+    
+    success = interface.create_ssh_tunnel(service_id, local_port, remote_port)
+    
+    if not success:
+        print(f"❌ Failed to create SSH tunnel for service {service_id}")
+        return 1
+    
+    print(f"\nℹ️  After running the SSH command above, you can access the service at:")
+    print(f"  http://localhost:{local_port}")
+    
+    return 0
+
+def cmd_start_session(interface, args):
+    """Start a service, client benchmark, Prometheus monitoring and SSH tunnel in one session"""
+    service_recipe_path, client_recipe_path, prometheus_recipe_path = args.start_session
+    
+    print("=" * 70)
+    print("AUTOMATED BENCHMARKING SESSION")
+    print("=" * 70)
+    print(f"Service recipe:    {service_recipe_path}")
+    print(f"Client recipe:     {client_recipe_path}")
+    print(f"Prometheus recipe: {prometheus_recipe_path}")
+    print("=" * 70)
+    
+    # Validate recipe files exist
+    if not os.path.exists(service_recipe_path):
+        print(f"❌ Service recipe not found: {service_recipe_path}")
+        return 1
+    
+    if not os.path.exists(client_recipe_path):
+        print(f"❌ Client recipe not found: {client_recipe_path}")
+        return 1
+    
+    if not os.path.exists(prometheus_recipe_path):
+        print(f"❌ Prometheus recipe not found: {prometheus_recipe_path}")
+        return 1
+    
+    try:
+        # Step 1: Start the service with cAdvisor
+        print("\n[1/5] Starting service with cAdvisor...")
+        service_recipe = interface.load_recipe(service_recipe_path)
+        
+        # Verify cAdvisor is enabled
+        if 'service' in service_recipe:
+            if not service_recipe['service'].get('enable_cadvisor', False):
+                print("⚠️  Warning: cAdvisor not enabled in service recipe")
+                print("   Consider adding 'enable_cadvisor: true' to the service section")
         
-        elif args.service_endpoint:
-            service_id = args.service_endpoint
+        service_session_id = interface.start_benchmark_session(service_recipe)
+        print(f"✅ Service started: {service_session_id}")
+        
+        # Step 2: Wait for service to be assigned to a node
+        print("\n[2/5] Waiting for service to be assigned to a node...")
+        service_id = None
+        service_host = None
+        
+        for attempt in range(18):  # Try for up to 90 seconds
+            sys.stdout.flush()  # show progress while waiting
+            time.sleep(5)
             
-            host = interface.servers.get_service_host(service_id)
+            # Get all running services
+            all_services = interface.servers.list_all_services()
             
-            if not host:
-                print(f"❌ Could not get host for service {service_id}")
-                print("The service may not be running or not yet assigned to a node.")
-                return 1
+            running_services = [s for s in all_services['all_services'] 
+                              if s['status'] in ACTIVE_STATES 
+                              and not (s.get('job_name') and 'prometheus' in s['job_name'].lower())]
+            
+            if running_services:
+                latest_service = running_services[-1]
+                temp_service_id = latest_service['service_id']
+                host = interface.servers.get_service_host(temp_service_id)
+                if host:
+                    service_id = temp_service_id
+                    service_host = host
+                    print(f"   ✅ Service ready: {service_id} on {host}")
+                    break
+                else:
+                    print(f"   Attempt {attempt + 1}/18: Service found but waiting for node assignment...")
+            else:
+                print(f"   Attempt {attempt + 1}/18: Waiting for service...")
+        
+        if not service_id or not service_host:
+            print("❌ Failed to detect service ID/host after 90 seconds")
+            print("   Service may still be starting. Check status with: python main.py --status")
+            return 1
+        
+        # Step 3: Configure Prometheus with the detected service and start it
+        print(f"\n[3/5] Configuring Prometheus to monitor {service_id} on {service_host}...")
+        
+        # Load Prometheus recipe
+        prometheus_recipe = interface.load_recipe(prometheus_recipe_path)
+        
+        # Update monitoring targets with the detected service ID and host
+        service_name = service_recipe.get('service', {}).get('name', 'service')
+        if 'service' in prometheus_recipe:
+            prometheus_recipe['service']['monitoring_targets'] = [{
+                'service_id': service_id,
+                'host': service_host,
+                'job_name': f"{service_name}-cadvisor",
+                'port': 8080
+            }]
+            print(f"✅ Prometheus configured to monitor {service_id} at {service_host}:8080")
+        else:
+            print("⚠️  Warning: Invalid Prometheus recipe format")
+        
+        # Now start Prometheus with the correct configuration
+        print("   Starting Prometheus with configured targets...")
+        prometheus_session_id = interface.start_benchmark_session(prometheus_recipe)
+        print(f"✅ Prometheus started: {prometheus_session_id}")
+        
+        # Step 4: Wait for Prometheus to be ready
+        print("\n[4/5] Waiting for Prometheus to be assigned to a node...")
+        prometheus_id = None
+        prometheus_host = None
+        
+        for attempt in range(12):  # Try for up to 60 seconds
+            sys.stdout.flush()  # show progress while waiting
+            time.sleep(5)
+            
+            all_services = interface.servers.list_all_services()
+            prometheus_services = [s for s in all_services['all_services'] 
+                                 if s.get('job_name') and 'prometheus' in s['job_name'].lower() 
+                                 and s['status'] in ACTIVE_STATES]
             
-            # For Prometheus services, assume port 9090
-            # For other services, you might need different logic
-            service_name = service_id
-            if 'prometheus' in service_name.lower():
-                port = 9090
-                endpoint = f"http://{host}:{port}"
-                print(f"Prometheus endpoint for service {service_id}:")
-                print(f"  Host: {host}")
-                print(f"  API: {endpoint}")
-                print(f"  UI: {endpoint}/graph")
-                print(f"  Targets: {endpoint}/targets")
-                print(f"\nQuery metrics with:")
-                print(f"  python main.py --query-service-metrics {service_id} \"up\"")
+            if prometheus_services:
+                latest_prometheus = prometheus_services[-1]
+                temp_prometheus_id = latest_prometheus['service_id']
+                host = interface.servers.get_service_host(temp_prometheus_id)
+                if host:
+                    prometheus_id = temp_prometheus_id
+                    prometheus_host = host
+                    print(f"   ✅ Prometheus ready: {prometheus_id} on {host}")
+                    break
+                else:
+                    print(f"   Attempt {attempt + 1}/12: Prometheus waiting for node assignment...")
+            else:
+                print(f"   Attempt {attempt + 1}/12: Waiting for Prometheus...")
+        
+        if not prometheus_id or not prometheus_host:
+            print("⚠️  Warning: Prometheus not ready after 60 seconds")
+            if prometheus_id:
+                print(f"   Prometheus detected ({prometheus_id}) but still waiting for node assignment")
             else:
-                print(f"Service endpoint for {service_id}:")
-                print(f"  Host: {host}")
-                print(f"\n(Port detection not implemented for non-Prometheus services)")
+                print("   Prometheus job not found in SLURM queue")
+            print("   Continuing anyway, but monitoring may not be available immediately")
+            print("   Check status with: python main.py --status")
+        
+        # Step 5: Start the client benchmark targeting the service
+        print(f"\n[5/5] Starting client benchmark targeting {service_id}...")
+        
+        # Load client recipe
+        client_recipe = interface.load_recipe(client_recipe_path)
+        
+        # Determine service port from service recipe (common ports)
+        service_name = service_recipe.get('service', {}).get('name', 'service')
+        service_port = DEFAULT_SERVICE_PORTS.get(service_name.lower())
+        
+        if service_port is None:
+            # Try to get from ports section
+            ports = service_recipe.get('service', {}).get('ports', [])
+            if ports:
+                service_port = ports[0]
+            else:
+                service_port = 8000  # Default fallback
+        
+        service_endpoint = f"http://{service_host}:{service_port}"
+        print(f"   Service endpoint: {service_endpoint}")
+        
+        # Start client with target service
+        client_id = interface.clients.start_client(client_recipe, service_id, service_host)
+        print(f"✅ Client started: {client_id}")
+        
+        # Create SSH tunnel to Prometheus
+        if prometheus_id and prometheus_host:
+            print(f"\nCreating SSH tunnel to Prometheus...")
+            success = interface.create_ssh_tunnel(prometheus_id, 9090, 9090)
+            
+            if not success:
+                print(f"⚠️  Warning: Failed to create SSH tunnel, but session is complete")
+        else:
+            print(f"\n⚠️  Skipping SSH tunnel creation (Prometheus not ready)")
+        
+        # Final summary
+        print("\n" + "=" * 70)
+        print("BENCHMARKING SESSION COMPLETE")
+        print("=" * 70)
+        print(f"Service ID:    {service_id}")
+        print(f"Service Host:  {service_host}:{service_port}")
+        print(f"Client ID:     {client_id}")
+        print(f"Prometheus ID: {prometheus_id}")
+        print(f"Prometheus UI: http://localhost:9090 (after tunnel setup)")
+        print("\nSession Components:")
+        print(f"  1. Service '{service_name}' with cAdvisor monitoring")
+        print(f"  2. Client benchmark running against service")
+        print(f"  3. Prometheus collecting metrics from cAdvisor")
+        print(f"\nTo access Prometheus UI:")
+        print(f"  1. Run the SSH command shown above in a separate terminal")
+        print(f"  2. Open http://localhost:9090 in your browser")
+        print(f"\nTo query metrics:")
+        print(f"  python main.py --query-metrics {prometheus_id} \"up\"")
+        print(f"  python main.py --query-metrics {prometheus_id} \"container_memory_usage_bytes\"")
+        print(f"\nTo check client status:")
+        print(f"  python main.py --status")
+        print(f"\nTo stop everything:")
+        print(f"  python main.py --stop-service {prometheus_id}")
+        print(f"  python main.py --stop-service {client_id}")
+        print(f"  python main.py --stop-service {service_id}")
+        print(f"  # Or use: python main.py --stop-all-services")
+        print("=" * 70)
+        
+        return 0
+        
+    except Exception as e:
+        print(f"\n❌ Error during automated session setup: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+def cmd_start_monitoring(interface, args):
+    """Start a service with Prometheus monitoring and an SSH tunnel (deprecated)"""
+    service_recipe_path, prometheus_recipe_path = args.start_monitoring
+    
+    print("=" * 70)
+    print("AUTOMATED MONITORING SETUP (DEPRECATED)")
+    print("⚠️  Note: Use --start-session for complete workflow with client")
+    print("=" * 70)
+    print(f"Service recipe: {service_recipe_path}")
+    print(f"Prometheus recipe: {prometheus_recipe_path}")
+    print("=" * 70)
+    
+    # Validate recipe files exist
+    if not os.path.exists(service_recipe_path):
+        print(f"❌ Service recipe not found: {service_recipe_path}")
+        return 1
+    
+    if not os.path.exists(prometheus_recipe_path):
+        print(f"❌ Prometheus recipe not found: {prometheus_recipe_path}")
+        return 1
+    
+    try:
+        # Step 1: Start the service with cAdvisor
+        print("\n[1/5] Starting service with cAdvisor...")
+        service_recipe = interface.load_recipe(service_recipe_path)
+        
+        # Verify cAdvisor is enabled
+        if 'service' in service_recipe:
+            if not service_recipe['service'].get('enable_cadvisor', False):
+                print("⚠️  Warning: cAdvisor not enabled in service recipe")
+                print("   Consider adding 'enable_cadvisor: true' to the service section")
         
-        elif args.create_tunnel:
-            # Parse arguments: SERVICE_ID [LOCAL_PORT] [REMOTE_PORT]
-            tunnel_args = args.create_tunnel
-            
-            if len(tunnel_args) < 1:
-                print("❌ Error: SERVICE_ID is required")
-                print("Usage: --create-tunnel SERVICE_ID [LOCAL_PORT] [REMOTE_PORT]")
-                return 1
-            
-            service_id = tunnel_args[0]
-            local_port = int(tunnel_args[1]) if len(tunnel_args) > 1 else 9090
-            remote_port = int(tunnel_args[2]) if len(tunnel_args) > 2 else 9090
-            
-            print(f"Creating SSH tunnel for service: {service_id}")
-            print(f"  Local port: {local_port}")
-            print(f"  Remote port: {remote_port}")
-            
-            success = interface.create_ssh_tunnel(service_id, local_port, remote_port)
-            
-            if not success:
-                print(f"❌ Failed to create SSH tunnel for service {service_id}")
-                return 1
-            
-            print(f"\nℹ️  After running the SSH command above, you can access the service at:")
-            print(f"  http://localhost:{local_port}")
-            
-            return 0
+        service_session_id = interface.start_benchmark_session(service_recipe)
+        print(f"✅ Service started: {service_session_id}")
         
-        elif args.start_session:
-            service_recipe_path, client_recipe_path, prometheus_recipe_path = args.start_session
-            
-            print("=" * 70)
-            print("AUTOMATED BENCHMARKING SESSION")
-            print("=" * 70)
-            print(f"Service recipe:    {service_recipe_path}")
-            print(f"Client recipe:     {client_recipe_path}")
-            print(f"Prometheus recipe: {prometheus_recipe_path}")
-            print("=" * 70)
-            
-            # Validate recipe files exist
-            if not os.path.exists(service_recipe_path):
-                print(f"❌ Service recipe not found: {service_recipe_path}")
-                return 1
+        # Step 2: Wait for service to be assigned to a node and get service ID
+        print("\n[2/5] Waiting for service to be assigned to a node...")
+        service_id = None
+        
+        for attempt in range(12):  # Try for up to 60 seconds
+            sys.stdout.flush()  # show progress while waiting
+            time.sleep(5)
             
-            if not os.path.exists(client_recipe_path):
-                print(f"❌ Client recipe not found: {client_recipe_path}")
-                return 1
+            # Get all running services
+            all_services = interface.servers.list_all_services()
             
-            if not os.path.exists(prometheus_recipe_path):
-                print(f"❌ Prometheus recipe not found: {prometheus_recipe_path}")
-                return 1
+            # Find the most recently started service (should be ours)
+            running_services = [s for s in all_services['all_services'] 
+                              if s['status'] in ACTIVE_STATES]
             
-            try:
-                import time
-                
-                # Step 1: Start the service with cAdvisor
-                print("\n[1/5] Starting service with cAdvisor...")
-                service_recipe = interface.load_recipe(service_recipe_path)
-                
-                # Verify cAdvisor is enabled
-                if 'service' in service_recipe:
-                    if not service_recipe['service'].get('enable_cadvisor', False):
-                        print("⚠️  Warning: cAdvisor not enabled in service recipe")
-                        print("   Consider adding 'enable_cadvisor: true' to the service section")
-                
-                service_session_id = interface.start_benchmark_session(service_recipe)
-                print(f"✅ Service started: {service_session_id}")
-                
-                # Step 2: Wait for service to be assigned to a node
-                print("\n[2/5] Waiting for service to be assigned to a node...")
-                service_id = None
-                service_host = None
-                
-                for attempt in range(18):  # Try for up to 90 seconds
-                    time.sleep(5)
-                    
-                    # Get all running services
-                    all_services = interface.servers.list_all_services()
-                    
-                    running_services = [s for s in all_services['all_services'] 
-                                      if s['status'].upper() in ['RUNNING', 'PENDING'] 
-                                      and not (s.get('job_name') and 'prometheus' in s['job_name'].lower())]
-                    
-                    if running_services:
-                        latest_service = running_services[-1]
-                        temp_service_id = latest_service['service_id']
-                        host = interface.servers.get_service_host(temp_service_id)
-                        if host:
-                            service_id = temp_service_id
-                            service_host = host
-                            print(f"   ✅ Service ready: {service_id} on {host}")
-                            break
-                        else:
-                            print(f"   Attempt {attempt + 1}/18: Service found but waiting for node assignment...")
-                    else:
-                        print(f"   Attempt {attempt + 1}/18: Waiting for service...")
-                
-                if not service_id or not service_host:
-                    print("❌ Failed to detect service ID/host after 90 seconds")
-                    print("   Service may still be starting. Check status with: python main.py --status")
-                    return 1
-                
-                # Step 3: Configure Prometheus with the detected service and start it
-                print(f"\n[3/5] Configuring Prometheus to monitor {service_id} on {service_host}...")
-                
-                # Load Prometheus recipe
-                prometheus_recipe = interface.load_recipe(prometheus_recipe_path)
-                
-                # Update monitoring targets with the detected service ID and host
-                service_name = service_recipe.get('service', {}).get('name', 'service')
-                if 'service' in prometheus_recipe:
-                    prometheus_recipe['service']['monitoring_targets'] = [{
-                        'service_id': service_id,
-                        'host': service_host,
-                        'job_name': f"{service_name}-cadvisor",
-                        'port': 8080
-                    }]
-                    print(f"✅ Prometheus configured to monitor {service_id} at {service_host}:8080")
-                else:
-                    print("⚠️  Warning: Invalid Prometheus recipe format")
+            if running_services:
+                # Get the last service (most recent)
+                latest_service = running_services[-1]
+                service_id = latest_service['service_id']
                 
-                # Now start Prometheus with the correct configuration
-                print("   Starting Prometheus with configured targets...")
-                prometheus_session_id = interface.start_benchmark_session(prometheus_recipe)
-                print(f"✅ Prometheus started: {prometheus_session_id}")
-                
-                # Step 4: Wait for Prometheus to be ready
-                print("\n[4/5] Waiting for Prometheus to be assigned to a node...")
-                prometheus_id = None
-                prometheus_host = None
-                
-                for attempt in range(12):  # Try for up to 60 seconds
-                    time.sleep(5)
-                    
-                    all_services = interface.servers.list_all_services()
-                    prometheus_services = [s for s in all_services['all_services'] 
-                                         if s.get('job_name') and 'prometheus' in s['job_name'].lower() 
-                                         and s['status'].upper() in ['RUNNING', 'PENDING']]
-                    
-                    if prometheus_services:
-                        latest_prometheus = prometheus_services[-1]
-                        temp_prometheus_id = latest_prometheus['service_id']
-                        host = interface.servers.get_service_host(temp_prometheus_id)
-                        if host:
-                            prometheus_id = temp_prometheus_id
-                            prometheus_host = host
-                            print(f"   ✅ Prometheus ready: {prometheus_id} on {host}")
-                            break
-                        else:
-                            print(f"   Attempt {attempt + 1}/12: Prometheus waiting for node assignment...")
-                    else:
-                        print(f"   Attempt {attempt + 1}/12: Waiting for Prometheus...")
-                
-                if not prometheus_id or not prometheus_host:
-                    print("⚠️  Warning: Prometheus not ready after 60 seconds")
-                    if prometheus_id:
-                        print(f"   Prometheus detected ({prometheus_id}) but still waiting for node assignment")
-                    else:
-                        print("   Prometheus job not found in SLURM queue")
-                    print("   Continuing anyway, but monitoring may not be available immediately")
-                    print("   Check status with: python main.py --status")
-                
-                # Step 5: Start the client benchmark targeting the service
-                print(f"\n[5/5] Starting client benchmark targeting {service_id}...")
-                
-                # Load client recipe
-                client_recipe = interface.load_recipe(client_recipe_path)
-                
-                # Determine service port from service recipe (common ports)
-                service_name = service_recipe.get('service', {}).get('name', 'service')
-                service_port = None
-                
-                if 'ollama' in service_name.lower():
-                    service_port = 11434
-                elif 'redis' in service_name.lower():
-                    service_port = 6379
-                elif 'chroma' in service_name.lower():
-                    service_port = 8000
-                else:
-                    # Try to get from ports section
-                    ports = service_recipe.get('service', {}).get('ports', [])
-                    if ports:
-                        service_port = ports[0]
-                    else:
-                        service_port = 8000  # Default fallback
-                
-                service_endpoint = f"http://{service_host}:{service_port}"
-                print(f"   Service endpoint: {service_endpoint}")
-                
-                # Start client with target service
-                client_id = interface.clients.start_client(client_recipe, service_id, service_host)
-                print(f"✅ Client started: {client_id}")
-                
-                # Create SSH tunnel to Prometheus
-                if prometheus_id and prometheus_host:
-                    print(f"\nCreating SSH tunnel to Prometheus...")
-                    success = interface.create_ssh_tunnel(prometheus_id, 9090, 9090)
-                    
-                    if not success:
-                        print(f"⚠️  Warning: Failed to create SSH tunnel, but session is complete")
+                # Check if it has a host assigned
+                host = interface.servers.get_service_host(service_id)
+                if host:
+                    print(f"✅ Service assigned: {service_id} on {host}")
+                    break
                 else:
-                    print(f"\n⚠️  Skipping SSH tunnel creation (Prometheus not ready)")
-                
-                # Final summary
-                print("\n" + "=" * 70)
-                print("BENCHMARKING SESSION COMPLETE")
-                print("=" * 70)
-                print(f"Service ID:    {service_id}")
-                print(f"Service Host:  {service_host}:{service_port}")
-                print(f"Client ID:     {client_id}")
-                print(f"Prometheus ID: {prometheus_id}")
-                print(f"Prometheus UI: http://localhost:9090 (after tunnel setup)")
-                print("\nSession Components:")
-                print(f"  1. Service '{service_name}' with cAdvisor monitoring")
-                print(f"  2. Client benchmark running against service")
-                print(f"  3. Prometheus collecting metrics from cAdvisor")
-                print(f"\nTo access Prometheus UI:")
-                print(f"  1. Run the SSH command shown above in a separate terminal")
-                print(f"  2. Open http://localhost:9090 in your browser")
-                print(f"\nTo query metrics:")
-                print(f"  python main.py --query-metrics {prometheus_id} \"up\"")
-                print(f"  python main.py --query-metrics {prometheus_id} \"container_memory_usage_bytes\"")
-                print(f"\nTo check client status:")
-                print(f"  python main.py --status")
-                print(f"\nTo stop everything:")
-                print(f"  python main.py --stop-service {prometheus_id}")
-                print(f"  python main.py --stop-service {client_id}")
-                print(f"  python main.py --stop-service {service_id}")
-                print(f"  # Or use: python main.py --stop-all-services")
-                print("=" * 70)
-                
-                return 0
-                
-            except Exception as e:
-                print(f"\n❌ Error during automated session setup: {e}")
-                import traceback
-                traceback.print_exc()
-                return 1
+                    print(f"   Attempt {attempt + 1}/12: Service {service_id} not yet assigned to node...")
+            else:
+                print(f"   Attempt {attempt + 1}/12: No running services found yet...")
         
-        elif args.start_monitoring:
-            service_recipe_path, prometheus_recipe_path = args.start_monitoring
-            
-            print("=" * 70)
-            print("AUTOMATED MONITORING SETUP (DEPRECATED)")
-            print("⚠️  Note: Use --start-session for complete workflow with client")
-            print("=" * 70)
-            print(f"Service recipe: {service_recipe_path}")
-            print(f"Prometheus recipe: {prometheus_recipe_path}")
-            print("=" * 70)
+        if not service_id:
+            print("❌ Failed to detect service ID after 60 seconds")
+            print("   Service may still be starting. Check status with: python main.py --status")
+            return 1
+        
+        # Step 3: Update Prometheus recipe with the detected service ID
+        print(f"\n[3/5] Configuring Prometheus to monitor {service_id}...")
+        
+        # Load Prometheus recipe
+        prometheus_recipe = interface.load_recipe(prometheus_recipe_path)
+        
+        # Update monitoring targets with the detected service ID
+        if 'service' in prometheus_recipe:
+            if 'monitoring_targets' not in prometheus_recipe['service']:
+                prometheus_recipe['service']['monitoring_targets'] = []
+            
+            # Check if service_id already exists in targets
+            existing_target = None
+            for target in prometheus_recipe['service']['monitoring_targets']:
+                if target.get('service_id') == service_id:
+                    existing_target = target
+                    break
             
-            # Validate recipe files exist
-            if not os.path.exists(service_recipe_path):
-                print(f"❌ Service recipe not found: {service_recipe_path}")
-                return 1
+            if not existing_target:
+                # Add new monitoring target
+                service_name = service_recipe.get('service', {}).get('name', 'service')
+                prometheus_recipe['service']['monitoring_targets'].append({
+                    'service_id': service_id,
+                    'job_name': f"{service_name}-cadvisor",
+                    'port': 8080
+                })
+                print(f"✅ Added {service_id} to monitoring targets")
+            else:
+                print(f"✅ Service {service_id} already in monitoring targets")
+        else:
+            print("❌ Invalid Prometheus recipe: missing 'service' section")
+            return 1
+        
+        # Step 4: Start Prometheus
+        print(f"\n[4/5] Starting Prometheus...")
+        prometheus_session_id = interface.start_benchmark_session(prometheus_recipe)
+        print(f"✅ Prometheus started: {prometheus_session_id}")
+        
+        # Wait for Prometheus to be assigned
+        print("   Waiting for Prometheus to be assigned to a node...")
+        prometheus_id = None
+        
+        for attempt in range(12):  # Try for up to 60 seconds
+            sys.stdout.flush()  # show progress while waiting
+            time.sleep(5)
             
-            if not os.path.exists(prometheus_recipe_path):
-                print(f"❌ Prometheus recipe not found: {prometheus_recipe_path}")
-                return 1
+            all_services = interface.servers.list_all_services()
+            prometheus_services = [s for s in all_services['all_services'] 
+                                 if 'prometheus' in s['service_id'].lower() and 
+                                 s['status'] in ACTIVE_STATES]
             
-            try:
-                import time
-                
-                # Step 1: Start the service with cAdvisor
-                print("\n[1/5] Starting service with cAdvisor...")
-                service_recipe = interface.load_recipe(service_recipe_path)
-                
-                # Verify cAdvisor is enabled
-                if 'service' in service_recipe:
-                    if not service_recipe['service'].get('enable_cadvisor', False):
-                        print("⚠️  Warning: cAdvisor not enabled in service recipe")
-                        print("   Consider adding 'enable_cadvisor: true' to the service section")
-                
-                service_session_id = interface.start_benchmark_session(service_recipe)
-                print(f"✅ Service started: {service_session_id}")
-                
-                # Step 2: Wait for service to be assigned to a node and get service ID
-                print("\n[2/5] Waiting for service to be assigned to a node...")
-                service_id = None
-                
-                for attempt in range(12):  # Try for up to 60 seconds
-                    time.sleep(5)
-                    
-                    # Get all running services
-                    all_services = interface.servers.list_all_services()
-                    
-                    # Find the most recently started service (should be ours)
-                    running_services = [s for s in all_services['all_services'] 
-                                      if s['status'].upper() in ['RUNNING', 'PENDING']]
-                    
-                    if running_services:
-                        # Get the last service (most recent)
-                        latest_service = running_services[-1]
-                        service_id = latest_service['service_id']
-                        
-                        # Check if it has a host assigned
-                        host = interface.servers.get_service_host(service_id)
-                        if host:
-                            print(f"✅ Service assigned: {service_id} on {host}")
-                            break
-                        else:
-                            print(f"   Attempt {attempt + 1}/12: Service {service_id} not yet assigned to node...")
-                    else:
-                        print(f"   Attempt {attempt + 1}/12: No running services found yet...")
+            if prometheus_services:
+                latest_prometheus = prometheus_services[-1]
+                prometheus_id = latest_prometheus['service_id']
                 
-                if not service_id:
-                    print("❌ Failed to detect service ID after 60 seconds")
-                    print("   Service may still be starting. Check status with: python main.py --status")
-                    return 1
-                
-                # Step 3: Update Prometheus recipe with the detected service ID
-                print(f"\n[3/5] Configuring Prometheus to monitor {service_id}...")
-                
-                # Load Prometheus recipe
-                prometheus_recipe = interface.load_recipe(prometheus_recipe_path)
-                
-                # Update monitoring targets with the detected service ID
-                if 'service' in prometheus_recipe:
-                    if 'monitoring_targets' not in prometheus_recipe['service']:
-                        prometheus_recipe['service']['monitoring_targets'] = []
-                    
-                    # Check if service_id already exists in targets
-                    existing_target = None
-                    for target in prometheus_recipe['service']['monitoring_targets']:
-                        if target.get('service_id') == service_id:
-                            existing_target = target
-                            break
-                    
-                    if not existing_target:
-                        # Add new monitoring target
-                        service_name = service_recipe.get('service', {}).get('name', 'service')
-                        prometheus_recipe['service']['monitoring_targets'].append({
-                            'service_id': service_id,
-                            'job_name': f"{service_name}-cadvisor",
-                            'port': 8080
-                        })
-                        print(f"✅ Added {service_id} to monitoring targets")
-                    else:
-                        print(f"✅ Service {service_id} already in monitoring targets")
+                host = interface.servers.get_service_host(prometheus_id)
+                if host:
+                    print(f"✅ Prometheus assigned: {prometheus_id} on {host}")
+                    break
                 else:
-                    print("❌ Invalid Prometheus recipe: missing 'service' section")
-                    return 1
-                
-                # Step 4: Start Prometheus
-                print(f"\n[4/5] Starting Prometheus...")
-                prometheus_session_id = interface.start_benchmark_session(prometheus_recipe)
-                print(f"✅ Prometheus started: {prometheus_session_id}")
-                
-                # Wait for Prometheus to be assigned
-                print("   Waiting for Prometheus to be assigned to a node...")
-                prometheus_id = None
-                
-                for attempt in range(12):  # Try for up to 60 seconds
-                    time.sleep(5)
-                    
-                    all_services = interface.servers.list_all_services()
-                    prometheus_services = [s for s in all_services['all_services'] 
-                                         if 'prometheus' in s['service_id'].lower() and 
-                                         s['status'].upper() in ['RUNNING', 'PENDING']]
-                    
-                    if prometheus_services:
-                        latest_prometheus = prometheus_services[-1]
-                        prometheus_id = latest_prometheus['service_id']
-                        
-                        host = interface.servers.get_service_host(prometheus_id)
-                        if host:
-                            print(f"✅ Prometheus assigned: {prometheus_id} on {host}")
-                            break
-                        else:
-                            print(f"   Attempt {attempt + 1}/12: Prometheus not yet assigned to node...")
-                    else:
-                        print(f"   Attempt {attempt + 1}/12: Prometheus not detected yet...")
-                
-                if not prometheus_id:
-                    print("❌ Failed to detect Prometheus ID after 60 seconds")
-                    print("   Prometheus may still be starting. Check status with: python main.py --status")
-                    return 1
-                
-                # Step 5: Create SSH tunnel
-                print(f"\n[5/5] Creating SSH tunnel to Prometheus...")
-                success = interface.create_ssh_tunnel(prometheus_id, 9090, 9090)
-                
-                if not success:
-                    print(f"❌ Failed to create SSH tunnel")
-                    return 1
-                
-                # Final summary
-                print("\n" + "=" * 70)
-                print("MONITORING SETUP COMPLETE")
-                print("=" * 70)
-                print(f"Service ID: {service_id}")
-                print(f"Prometheus ID: {prometheus_id}")
-                print(f"\nTo access Prometheus UI:")
-                print(f"  1. Run the SSH command shown above in a separate terminal")
-                print(f"  2. Open http://localhost:9090 in your browser")
-                print(f"\nTo query metrics:")
-                print(f"  python main.py --query-metrics {prometheus_id} \"up\"")
-                print(f"  python main.py --query-metrics {prometheus_id} \"container_memory_usage_bytes\"")
-                print(f"\nTo stop everything:")
-                print(f"  python main.py --stop-service {prometheus_id}")
-                print(f"  python main.py --stop-service {service_id}")
-                print("=" * 70)
-                
-                return 0
-                
-            except Exception as e:
-                print(f"\n❌ Error during automated monitoring setup: {e}")
-                import traceback
-                traceback.print_exc()
-                return 1
+                    print(f"   Attempt {attempt + 1}/12: Prometheus not yet assigned to node...")
+            else:
+                print(f"   Attempt {attempt + 1}/12: Prometheus not detected yet...")
         
-        elif args.download_results is not None:
-            print("Downloading benchmark results from cluster...")
-            
-            remote_pattern = args.download_results
-            result = interface.download_results(remote_pattern=remote_pattern, local_dir="results")
+        if not prometheus_id:
+            print("❌ Failed to detect Prometheus ID after 60 seconds")
+            print("   Prometheus may still be starting. Check status with: python main.py --status")
+            return 1
+        
+        # Step 5: Create SSH tunnel
+        print(f"\n[5/5] Creating SSH tunnel to Prometheus...")
+        success = interface.create_ssh_tunnel(prometheus_id, 9090, 9090)
+        
+        if not success:
+            print(f"❌ Failed to create SSH tunnel")
+            return 1
+        
+        # Final summary
+        print("\n" + "=" * 70)
+        print("MONITORING SETUP COMPLETE")
+        print("=" * 70)
+        print(f"Service ID: {service_id}")
+        print(f"Prometheus ID: {prometheus_id}")
+        print(f"\nTo access Prometheus UI:")
+        print(f"  1. Run the SSH command shown above in a separate terminal")
+        print(f"  2. Open http://localhost:9090 in your browser")
+        print(f"\nTo query metrics:")
+        print(f"  python main.py --query-metrics {prometheus_id} \"up\"")
+        print(f"  python main.py --query-metrics {prometheus_id} \"container_memory_usage_bytes\"")
+        print(f"\nTo stop everything:")
+        print(f"  python main.py --stop-service {prometheus_id}")
+        print(f"  python main.py --stop-service {service_id}")
+        print("=" * 70)
+        
+        return 0
+        
+    except Exception as e:
+        print(f"\n❌ Error during automated monitoring setup: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+def cmd_download_results(interface, args):
+    """Download benchmark results from cluster"""
+    print("Downloading benchmark results from cluster...")
+    
+    remote_pattern = args.download_results
+    result = interface.download_results(remote_pattern=remote_pattern, local_dir="results")
+    
+    if 'error' in result:
+        print(f"❌ Error: {result['error']}")
+        return 1
+    
+    if result['downloaded'] == 0:
+        print(f"⚠️  No files found matching pattern: {remote_pattern}")
+        print("\nTo download results, ensure your benchmark jobs have completed and check the remote path.")
+        return 0
+    
+    print(f"\n✅ Downloaded {result['downloaded']} file(s) to ./results/")
+    
+    if result['files']:
+        print("\nDownloaded files:")
+        write_lines(f"  - {filepath}\n" for filepath in result['files'])
+    
+    if result.get('failed'):
+        print(f"\n❌ Failed to download {result['failed']} file(s):")
+        write_lines(f"  - {filepath}\n" for filepath in result.get('failed_files', []))
+
+def cmd_recipe(interface, args):
+    """Execute a recipe file"""
+    logger = logging.getLogger(__name__)
+    if not os.path.exists(args.recipe):
+        logger.error(f"Recipe file not found: {args.recipe}")
+        return 1
+    
+    logger.info(f"Loading recipe: {args.recipe}")
+    recipe = interface.load_recipe(args.recipe)
+    
+    # Check if this is a client-only recipe
+    if 'client' in recipe and 'service' not in recipe:
+        logger.info("Client-only recipe detected")
+        
+        # Check for target service or endpoint
+        target_service_id = args.target_service
+        target_endpoint = args.target_endpoint
+        
+        if not target_service_id and not target_endpoint:
+            # List available services to help user choose
+            all_services = interface.servers.list_all_services()
             
-            if 'error' in result:
-                print(f"❌ Error: {result['error']}")
+            if not all_services['all_services']:
+                print("❌ No running services found. Please:")
+                print("  1. Start a service first with a service recipe, or")
+                print("  2. Use --target-endpoint to specify a direct endpoint, or") 
+                print("  3. Use --target-service to specify a service ID")
                 return 1
             
-            if result['downloaded'] == 0:
-                print(f"⚠️  No files found matching pattern: {remote_pattern}")
-                print("\nTo download results, ensure your benchmark jobs have completed and check the remote path.")
-                return 0
-            
-            print(f"\n✅ Downloaded {result['downloaded']} file(s) to ./results/")
-            
-            if result['files']:
-                print("\nDownloaded files:")
-                for filepath in result['files']:
-                    print(f"  - {filepath}")
+            print("Available running services:")
+            for i, service in enumerate(all_services['all_services'], 1):
+                status_info = f"{service['status']} (Job: {service['job_id']})"
+                print(f"  {i}. {service['service_id']} - {status_info}")
             
-            if result.get('failed'):
-                print(f"\n❌ Failed to download {result['failed']} file(s):")
-                for filepath in result.get('failed_files', []):
-                    print(f"  - {filepath}")
-        
-        elif args.recipe:
-            if not os.path.exists(args.recipe):
-                logger.error(f"Recipe file not found: {args.recipe}")
+            print("\nTo target a service, use:")
+            print(f"  python main.py --recipe {args.recipe} --target-service <SERVICE_ID>")
+            print("\nOr to use a direct endpoint:")
+            print(f"  python main.py --recipe {args.recipe} --target-endpoint http://node-name:11434")
+            return 1
+        
+        # Start client with target specification
+        logger.info("Starting client with target specification")
+        target_service_host = None
+        
+        if target_endpoint:
+            # Extract host from endpoint for compatibility
+            endpoint_parts = urlsplit(target_endpoint)
+            if endpoint_parts.scheme in ('http', 'https'):
+                target_service_host = endpoint_parts.hostname
+            
+            # Add endpoint to recipe parameters
+            if 'client' in recipe and 'parameters' in recipe['client']:
+                recipe['client']['parameters']['endpoint'] = target_endpoint
+            
+            logger.info(f"Using direct endpoint: {target_endpoint}")
+            client_id = interface.clients.start_client(recipe, target_service_id or "manual", target_service_host)
+            
+        elif target_service_id:
+            # Resolve service host
+            logger.info(f"Resolving host for service: {target_service_id}")
+            
+            target_service_host = interface.servers.wait_for_service_host(target_service_id, timeout=30)
+            if target_service_host:
+                logger.info(f"✅ Resolved service {target_service_id} to host: {target_service_host}")
+            
+            if not target_service_host:
+                print(f"❌ Could not resolve host for service {target_service_id}")
+                print("The service might not be running or not yet assigned to a node.")
                 return 1
             
-            logger.info(f"Loading recipe: {args.recipe}")
-            recipe = interface.load_recipe(args.recipe)
-            
-            # Check if this is a client-only recipe
-            if 'client' in recipe and 'service' not in recipe:
-                logger.info("Client-only recipe detected")
-                
-                # Check for target service or endpoint
-                target_service_id = args.target_service
-                target_endpoint = args.target_endpoint
-                
-                if not target_service_id and not target_endpoint:
-                    # List available services to help user choose
-                    all_services = interface.servers.list_all_services()
-                    
-                    if not all_services['all_services']:
-                        print("❌ No running services found. Please:")
-                        print("  1. Start a service first with a service recipe, or")
-                        print("  2. Use --target-endpoint to specify a direct endpoint, or") 
-                        print("  3. Use --target-service to specify a service ID")
-                        return 1
-                    
-                    print("Available running services:")
-                    for i, service in enumerate(all_services['all_services'], 1):
-                        status_info = f"{service['status']} (Job: {service['job_id']})"
-                        print(f"  {i}. {service['service_id']} - {status_info}")
-                    
-                    print("\nTo target a service, use:")
-                    print(f"  python main.py --recipe {args.recipe} --target-service <SERVICE_ID>")
-                    print("\nOr to use a direct endpoint:")
-                    print(f"  python main.py --recipe {args.recipe} --target-endpoint http://node-name:11434")
-                    return 1
-                
-                # Start client with target specification
-                logger.info("Starting client with target specification")
-                target_service_host = None
-                
-                if target_endpoint:
-                    # Extract host from endpoint for compatibility
-                    import re
-                    match = re.match(r'https?://([^:]+)', target_endpoint)
-                    if match:
-                        target_service_host = match.group(1)
-                    
-                    # Add endpoint to recipe parameters
-                    if 'client' in recipe and 'parameters' in recipe['client']:
-                        recipe['client']['parameters']['endpoint'] = target_endpoint
-                    
-                    logger.info(f"Using direct endpoint: {target_endpoint}")
-                    client_id = interface.clients.start_client(recipe, target_service_id or "manual", target_service_host)
-                    
-                elif target_service_id:
-                    # Resolve service host
-                    logger.info(f"Resolving host for service: {target_service_id}")
-                    
-                    import time
-                    for attempt in range(6):  # Try for up to 30 seconds
-                        target_service_host = interface.servers.get_service_host(target_service_id)
-                        if target_service_host:
-                            logger.info(f"✅ Resolved service {target_service_id} to host: {target_service_host}")
-                            break
-                        else:
-                            logger.info(f"🔄 Attempt {attempt + 1}/6: Service host not yet available, waiting 5s...")
-                            time.sleep(5)
-                    
-                    if not target_service_host:
-                        print(f"❌ Could not resolve host for service {target_service_id}")
-                        print("The service might not be running or not yet assigned to a node.")
-                        return 1
-                    
-                    client_id = interface.clients.start_client(recipe, target_service_id, target_service_host)
-                
-                print(f"Client started: {client_id}")
-                print("Monitor the job status through SLURM or check logs.")
-            
-            # Check if this is a service-only recipe (e.g., Prometheus monitoring)
-            elif 'service' in recipe and 'client' not in recipe:
-                logger.info("Service-only recipe detected")
-                
-                # Check if target service is specified (for monitoring services like Prometheus)
-                target_service_id = args.target_service
-                
-                if target_service_id:
-                    logger.info(f"Starting service with target: {target_service_id}")
-                    # Pass target_service_id to the orchestrator
-                    session_id = interface.start_benchmark_session(recipe, target_service_id)
-                else:
-                    logger.info("Starting service without specific target")
-                    session_id = interface.start_benchmark_session(recipe)
-                
-                print(f"Service started: {session_id}")
-                print("Monitor the job status through SLURM or check logs.")
-                
-            else:
-                # Original combined recipe logic
-                logger.info("Starting benchmark session")
-                session_id = interface.start_benchmark_session(recipe)
-                
-                print(f"Benchmark session started: {session_id}")
-                print("Monitor the job status through SLURM or check logs.")
+            client_id = interface.clients.start_client(recipe, target_service_id, target_service_host)
         
+        print(f"Client started: {client_id}")
+        print("Monitor the job status through SLURM or check logs.")
+    
+    # Check if this is a service-only recipe (e.g., Prometheus monitoring)
+    elif 'service' in recipe and 'client' not in recipe:
+        logger.info("Service-only recipe detected")
+        
+        # Check if target service is specified (for monitoring services like Prometheus)
+        target_service_id = args.target_service
+        
+        if target_service_id:
+            logger.info(f"Starting service with target: {target_service_id}")
+            # Pass target_service_id to the orchestrator
+            session_id = interface.start_benchmark_session(recipe, target_service_id)
         else:
+            logger.info("Starting service without specific target")
+            session_id = interface.start_benchmark_session(recipe)
+        
+        print(f"Service started: {session_id}")
+        print("Monitor the job status through SLURM or check logs.")
+        
+    else:
+        # Original combined recipe logic
+        logger.info("Starting benchmark session")
+        session_id = interface.start_benchmark_session(recipe)
+        
+        print(f"Benchmark session started: {session_id}")
+        print("Monitor the job status through SLURM or check logs.")
+
+# CLI action flags (argparse dests) and their handlers, in order of precedence
+ACTIONS = (
+    ('list_services', cmd_list_services),
+    ('list_clients', cmd_list_clients),
+    ('status', cmd_status),
+    ('slurm_status', cmd_slurm_status),
+    ('clear_state', cmd_clear_state),
+    ('stop_service', cmd_stop_service),
+    ('stop_all_services', cmd_stop_all_services),
+    ('stop_session', cmd_stop_session),
+    ('debug_services', cmd_debug_services),
+    ('list_all_services', cmd_list_all_services),
+    ('list_running_services', cmd_list_running_services),
+    ('list_monitors', cmd_list_monitors),
+    ('monitor_status', cmd_monitor_status),
+    ('stop_monitor', cmd_stop_monitor),
+    ('query_metrics', cmd_query_metrics),
+    ('list_available_metrics', cmd_list_available_metrics),
+    ('query_service_metrics', cmd_query_service_metrics),
+    ('monitor_endpoint', cmd_monitor_endpoint),
+    ('service_endpoint', cmd_service_endpoint),
+    ('create_tunnel', cmd_create_tunnel),
+    ('start_session', cmd_start_session),
+    ('start_monitoring', cmd_start_monitoring),
+    ('download_results', cmd_download_results),
+    ('recipe', cmd_recipe),
+)
+
+@functools.lru_cache(maxsize=None)
+def build_parser():
+    """Build the command line parser (once per process)"""
+    parser = argparse.ArgumentParser(description='HPC AI Benchmarking Orchestrator')
+    parser.add_argument('--config', '-c', type=str, default='config.yaml',
+                       help='Configuration file path')
+    parser.add_argument('--recipe', '-r', type=str,
+                       help='Recipe file to execute')
+    parser.add_argument('--target-service', '-t', type=str,
+                       help='Target service ID for client recipes (use with --recipe)')
+    parser.add_argument('--target-endpoint', '-e', type=str,
+                       help='Direct endpoint for client recipes (e.g., http://node-01:11434)')
+    parser.add_argument('--list-services', action='store_true',
+                       help='List available services')
+    parser.add_argument('--list-clients', action='store_true',
+                       help='List available clients')
+    parser.add_argument('--status', action='store_true',
+                       help='Show system status')
+    parser.add_argument('--slurm-status', action='store_true',
+                       help='Show SLURM job status (all user jobs)')
+    parser.add_argument('--clear-state', action='store_true',
+                       help='Clear all tracked services and clients')
+    parser.add_argument('--stop-service', type=str, metavar='SERVICE_ID',
+                       help='Stop a running service by ID')
+    parser.add_argument('--stop-all-services', action='store_true',
+                       help='Stop all running services')
+    parser.add_argument('--stop-session', type=str, metavar='SESSION_ID',
+                       help='Stop a benchmark session by ID')
+    parser.add_argument('--debug-services', action='store_true',
+                       help='Show detailed debug information about all services')
+    parser.add_argument('--list-all-services', action='store_true',
+                       help='List all services (tracked and SLURM-only)')
+    parser.add_argument('--list-running-services', action='store_true',
+                       help='List only running services with their IDs')
+    parser.add_argument('--list-monitors', action='store_true',
+                       help='List running monitors')
+    parser.add_argument('--monitor-status', type=str, metavar='MONITOR_ID',
+                       help='Check status of a specific monitor')
+    parser.add_argument('--stop-monitor', type=str, metavar='MONITOR_ID',
+                       help='Stop a running monitor')
+    parser.add_argument('--query-metrics', type=str, nargs=2, metavar=('SERVICE_ID', 'QUERY'),
+                       help='Query Prometheus metrics from a service or monitor (e.g., --query-metrics prometheus_4e29faf0 "up")')
+    parser.add_argument('--list-available-metrics', type=str, metavar='SERVICE_ID',
+                       help='List all available metric names from a Prometheus service (e.g., --list-available-metrics prometheus_4e29faf0)')
+    parser.add_argument('--query-service-metrics', type=str, nargs=2, metavar=('SERVICE_ID', 'QUERY'),
+                       help='Query Prometheus metrics from a service (e.g., --query-service-metrics svc123 "up")')
+    parser.add_argument('--monitor-endpoint', type=str, metavar='MONITOR_ID',
+                       help='Get Prometheus endpoint URL for a monitor')
+    parser.add_argument('--service-endpoint', type=str, metavar='SERVICE_ID',
+                       help='Get endpoint URL for a service (including Prometheus)')
+    parser.add_argument('--create-tunnel', type=str, nargs='+', metavar='SERVICE_ID [LOCAL_PORT] [REMOTE_PORT]',
+                       help='Create SSH tunnel to a service (e.g., --create-tunnel prometheus_abc123 9090 9090). If ports not specified, defaults to 9090:9090')
+    parser.add_argument('--start-session', type=str, nargs=3, metavar=('SERVICE_RECIPE', 'CLIENT_RECIPE', 'PROMETHEUS_RECIPE'),
+                       help='Complete automated session: starts service with cAdvisor, starts client benchmark, starts Prometheus monitoring, creates SSH tunnel (e.g., --start-session recipes/services/ollama_with_cadvisor.yaml recipes/clients/ollama_benchmark.yaml recipes/services/prometheus_with_cadvisor.yaml)')
+    parser.add_argument('--start-monitoring', type=str, nargs=2, metavar=('SERVICE_RECIPE', 'PROMETHEUS_RECIPE'),
+                       help='[DEPRECATED: Use --start-session] Automated monitoring setup: starts service with cAdvisor, starts Prometheus, creates SSH tunnel')
+    parser.add_argument('--download-results', nargs='?', const='$HOME/results/*.json', metavar='REMOTE_PATTERN',
+                       help='Download benchmark results from cluster (default: $HOME/results/*.json). Saves to ./results/')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                       help='Enable verbose logging')
+    parser.add_argument('--setup', action='store_true',
+                       help='Run setup and dependency check')
+    return parser
+
+def main():
+    """Main CLI entry point"""
+    args = build_parser().parse_args()
+    configure_stdout()
+    
+    # Setup logging
+    setup_logging(logging.DEBUG if args.verbose else logging.INFO)
+    
+    logger = logging.getLogger(__name__)
+    logger.info("Starting HPC Orchestrator")
+    
+    # Check dependencies first; --setup installs them and --clear-state
+    # only resets local tracking, so neither needs the check
+    missing_deps = () if args.setup or args.clear_state else check_dependencies()
+    if missing_deps:
+        print(f"❌ Missing required dependencies: {', '.join(missing_deps)}")
+        print("Install with: pip install -r requirements.txt")
+        print("Or run: python main.py --setup")
+        return 1
+    
+    # Run setup if requested
+    if args.setup:
+        print("Running setup...")
+        try:
+            import setup
+            return setup.main()
+        except ImportError:
+            print("❌ Setup script not found")
+            return 1
+    
+    interface = None
+    try:
+        # Add src directory to path for imports
+        sys.path.insert(0, str(Path(__file__).parent / 'src'))
+        
+        # Import modules (will fail gracefully if dependencies missing)
+        from orchestrator import BenchmarkOrchestrator
+        
+        # Initialize the orchestrator; listing the available recipes and
+        # clearing tracking are purely local, so those commands skip the SSH connection
+        interface = BenchmarkOrchestrator(
+            config_path=args.config,
+            connect=not (args.list_services or args.list_clients or args.clear_state)
+        )
+        
+        # Run the handler of the first action flag given, else the menu
+        handler = next((handler for dest, handler in ACTIONS if getattr(args, dest)), None)
+        if handler is None:
             # Interactive mode - enhanced with service management
-            print("HPC Orchestrator - Interactive Mode")
-            print("Available commands:")
-            print("  1. List services")
-            print("  2. List clients") 
-            print("  3. Show status")
-            print("  4. Stop service")
-            print("  5. Stop all services")
-            print("  6. Show running sessions")
-            print("  7. Debug services")
-            print("  8. List all services")
-            print("  9. List monitors")
-            print("  10. Monitor status")
-            print("  11. Query metrics")
-            print("  12. Exit")
-            
-            while True:
-                try:
-                    choice = input("\nEnter command (1-12): ").strip()
-                    if choice == '1':
-                        services = interface.servers.list_available_services()
-                        print("Available Services:", services)
-                    elif choice == '2':
-                        clients = interface.clients.list_available_clients()
-                        print("Available Clients:", clients)
-                    elif choice == '3':
-                        status = interface.get_system_status()
-                        print(f"SSH Connected: {status['ssh_connected']}")
-                        print(f"Tracked Services: {status['services']['total_services']}")
-                        print(f"Tracked Clients: {status['clients']['total_clients']}")
-                        
-                        if status['services']['services']:
-                            print("\nRunning Services:")
-                            for service_id, service_info in status['services']['services'].items():
-                                print(f"  {service_id}: {service_info.get('status', 'unknown')} (Job: {service_info.get('job_id', 'N/A')})")
-                    elif choice == '4':
-                        # Stop specific service
-                        all_services = interface.servers.list_all_services()
-                        
-                        if not all_services['all_services']:
-                            print("No services are currently available")
-                            continue
-                        
-                        print("Available services:")
-                        for i, service in enumerate(all_services['all_services'], 1):
-                            status_info = f"{service['status']} (Job: {service['job_id']})"
-                            service_type = service['type']
-                            print(f"  {i}. {service['service_id']} - {status_info} [{service_type}]")
-                        
-                        try:
-                            choice_num = int(input("Enter service number to stop (or 0 to cancel): ").strip())
-                            if choice_num == 0:
-                                continue
-                            elif 1 <= choice_num <= len(all_services['all_services']):
-                                selected_service = all_services['all_services'][choice_num - 1]
-                                service_id = selected_service['service_id']
-                                print(f"Stopping service: {service_id}")
-                                if interface.stop_service(service_id):
-                                    print(f"✅ Service {service_id} stopped successfully")
-                                else:
-                                    print(f"❌ Failed to stop service {service_id}")
-                            else:
-                                print("Invalid service number")
-                        except ValueError:
-                            print("Please enter a valid number")
-                    elif choice == '5':
-                        # Stop all services
-                        all_services = interface.servers.list_all_services()
-                        
-                        if not all_services['all_services']:
-                            print("No services found")
-                            continue
-                        
-                        active_services = [s for s in all_services['all_services'] 
-                                         if s['status'].upper() in ['RUNNING', 'PENDING']]
-                        
-                        if not active_services:
-                            print("No active services found")
-                            continue
-                        
-                        print(f"Found {len(active_services)} active services:")
-                        for service in active_services:
-                            print(f"  - {service['service_id']} ({service['status']})")
-                        
-                        confirm = input(f"Stop {len(active_services)} active services? (y/N): ").strip().lower()
-                        if confirm == 'y':
-                            results = interface.stop_all_services()
-                            
-                            if 'error' in results:
-                                print(f"❌ Error: {results['error']}")
-                            else:
-                                print(f"✅ Stopped {results['stopped_services']}/{results['total_services']} services")
-                                if results['failed_services'] > 0:
-                                    print(f"❌ Failed to stop {results['failed_services']} services")
-                        else:
-                            print("Operation cancelled")
-                    elif choice == '6':
-                        # Show running sessions
-                        sessions = interface._active_sessions
-                        if not sessions:
-                            print("No active sessions")
-                        else:
-                            print("Active sessions:")
-                            for session_id, session_info in sessions.items():
-                                print(f"  {session_id}: {session_info.get('status', 'unknown')} - Services: {len(session_info.get('services', []))}, Clients: {len(session_info.get('clients', []))}")
-                    elif choice == '7':
-                        # Debug services
-                        print("Debug information for services:")
-                        debug_info = interface.debug_services()
-                        
-                        if 'error' in debug_info:
-                            print(f"❌ Error: {debug_info['error']}")
-                        else:
-                            print(f"\nTracked Services: {len(debug_info['tracked_services'])}")
-                            print(f"SLURM Jobs: {len(debug_info['slurm_jobs'])}")
-                            print(f"Service Mapping: {len(debug_info['service_mapping'])} entries")
-                            
-                            if debug_info['tracked_services']:
-                                print("\nTracked Services:")
-                                for service_id, info in debug_info['tracked_services'].items():
-                                    print(f"  {service_id} -> Job {info['job_id']} ({info['status']})")
-                    elif choice == '8':
-                        # List all services
-                        all_services = interface.servers.list_all_services()
-                        
-                        print(f"All Services Summary:")
-                        print(f"  Tracked: {len(all_services['tracked_services'])}")
-                        print(f"  SLURM-only: {len(all_services['slurm_services'])}")
-                        print(f"  Total: {len(all_services['all_services'])}")
-                        
-                        if all_services['all_services']:
-                            print("\nAll Services:")
-                            for service in all_services['all_services']:
-                                type_marker = "📊" if service['type'] == 'tracked' else "🔧"
-                                print(f"  {type_marker} {service['service_id']} (Job: {service['job_id']}) - {service['status']}")
-                    elif choice == '9':
-                        # List monitors
-                        running_monitors = interface.monitors.list_running_monitors()
-                        
-                        if not running_monitors:
-                            print("No running monitors")
-                        else:
-                            print(f"Running monitors ({len(running_monitors)}):")
-                            for monitor_id in running_monitors:
-                                status = interface.monitors.check_monitor_status(monitor_id)
-                                endpoint = interface.monitors.get_monitor_endpoint(monitor_id)
-                                print(f"  📊 {monitor_id} - {status['status']}")
-                                if endpoint:
-                                    print(f"     {endpoint}")
-                    elif choice == '10':
-                        # Monitor status
-                        running_monitors = interface.monitors.list_running_monitors()
-                        
-                        if not running_monitors:
-                            print("No running monitors")
-                            continue
-                        
-                        print("Available monitors:")
-                        for i, monitor_id in enumerate(running_monitors, 1):
-                            print(f"  {i}. {monitor_id}")
-                        
-                        try:
-                            choice_num = int(input("Enter monitor number (or 0 to cancel): ").strip())
-                            if choice_num == 0:
-                                continue
-                            elif 1 <= choice_num <= len(running_monitors):
-                                monitor_id = running_monitors[choice_num - 1]
-                                status = interface.monitors.check_monitor_status(monitor_id)
-                                
-                                print(f"\nMonitor: {monitor_id}")
-                                print(f"  Status: {status['status']}")
-                                print(f"  Job ID: {status.get('job_id', 'N/A')}")
-                                
-                                endpoint = interface.monitors.get_monitor_endpoint(monitor_id)
-                                if endpoint:
-                                    print(f"  Endpoint: {endpoint}")
-                                    print(f"  UI: {endpoint}/graph")
-                            else:
-                                print("Invalid monitor number")
-                        except ValueError:
-                            print("Please enter a valid number")
-                    elif choice == '11':
-                        # Query metrics
-                        running_monitors = interface.monitors.list_running_monitors()
-                        
-                        if not running_monitors:
-                            print("No running monitors")
-                            continue
-                        
-                        print("Available monitors:")
-                        for i, monitor_id in enumerate(running_monitors, 1):
-                            print(f"  {i}. {monitor_id}")
-                        
-                        try:
-                            choice_num = int(input("Enter monitor number (or 0 to cancel): ").strip())
-                            if choice_num == 0:
-                                continue
-                            elif 1 <= choice_num <= len(running_monitors):
-                                monitor_id = running_monitors[choice_num - 1]
-                                query = input("Enter PromQL query (e.g., 'up'): ").strip()
-                                
-                                if query:
-                                    result = interface.monitors.query_metrics(monitor_id, query)
-                                    
-                                    if 'error' in result:
-                                        print(f"❌ Error: {result['error']}")
-                                    else:
-                                        import json
-                                        print("\nResult:")
-                                        print(json.dumps(result, indent=2))
-                            else:
-                                print("Invalid monitor number")
-                        except ValueError:
-                            print("Please enter a valid number")
-                    elif choice == '12':
-                        break
-                    else:
-                        print("Invalid choice. Please enter 1-12.")
-                except KeyboardInterrupt:
-                    print("\nExiting...")
-                    break
+            InteractiveMenu(interface).run()
+        else:
+            exit_code = handler(interface, args)
+            if exit_code:
+                return exit_code
     
     except ImportError as e:
         logger.error(f"Import error: {e}")
@@ -1458,7 +1962,19 @@ def main():
         print(f"\n❌ Error: {e}")
         return 1
     
+    finally:
+        # Release the SSH connection on every exit path
+        if interface is not None:
+            interface.cleanup()
+    
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    exit_code = main()
+    # main() has closed the SSH connection, so nothing is left that needs
+    # interpreter teardown: flush logs and output, then exit immediately
+    # instead of paying for module finalization (paramiko, cryptography)
+    shutdown_logging()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(exit_code or 0)
\ No newline at end of file
@@ -3,13 +3,62 @@ Base classes for the HPC Orchestrator
 """
 
 import abc
-import uuid
+import copy
+import os
+import secrets
+import sys
+import threading
+import types
 import time
 import logging
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+import yaml
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Mapping, Optional, Any
+from dataclasses import dataclass, field
 from enum import Enum
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Upper bound on concurrent SSH channels used to refresh job statuses
+MAX_STATUS_WORKERS = 8
+
+# dataclass(slots=True) needs Python 3.10; older interpreters keep a __dict__
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Parsed config, recipe and client definition files kept for reuse
+YAML_CACHE_SIZE = 100
+
+# Absolute path -> (mtime_ns, size, parsed document), least recently used first
+_yaml_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_yaml_cache_lock = threading.Lock()
+
+def load_yaml_file(path) -> Any:
+    """Parse a YAML file, reusing the last parse while its mtime and size are unchanged
+    
+    Every caller gets its own deep copy. Safe to call from worker threads.
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    with _yaml_cache_lock:
+        cached = _yaml_cache.get(key)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            _yaml_cache.move_to_end(key)
+            return copy.deepcopy(cached[2])
+    
+    with open(path, 'r') as f:
+        document = yaml.load(f, Loader=_YamlLoader)
+    
+    with _yaml_cache_lock:
+        _yaml_cache[key] = (stat.st_mtime_ns, stat.st_size, document)
+        _yaml_cache.move_to_end(key)
+        if len(_yaml_cache) > YAML_CACHE_SIZE:
+            _yaml_cache.popitem(last=False)
+    return copy.deepcopy(document)
+
 class ServiceStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -17,7 +66,21 @@ class ServiceStatus(Enum):
     FAILED = "failed"
     CANCELLED = "cancelled"
 
-@dataclass
+# Statuses of jobs still queued or running, and of jobs that have ended
+ACTIVE_STATUSES = frozenset({ServiceStatus.PENDING, ServiceStatus.RUNNING})
+FINISHED_STATUSES = frozenset({ServiceStatus.COMPLETED, ServiceStatus.FAILED, ServiceStatus.CANCELLED})
+
+# SLURM job states understood by the orchestrator; other states leave the tracked status alone
+SLURM_STATE_MAP: Mapping[str, ServiceStatus] = types.MappingProxyType({
+    'PENDING': ServiceStatus.PENDING,
+    'RUNNING': ServiceStatus.RUNNING,
+    'COMPLETED': ServiceStatus.COMPLETED,
+    'FAILED': ServiceStatus.FAILED,
+    'CANCELLED': ServiceStatus.CANCELLED,
+    'TIMEOUT': ServiceStatus.FAILED
+})
+
+@dataclass(**DATACLASS_SLOTS)
 class JobInfo:
     """Information about a SLURM job"""
     job_id: str
@@ -29,23 +92,262 @@ class JobInfo:
     nodes: Optional[List[str]] = None
     logs_path: Optional[str] = None
 
+@dataclass(**DATACLASS_SLOTS)
+class SessionInfo:
+    """Services and clients started together by one benchmark session"""
+    session_id: str
+    recipe: dict
+    services: List[str] = field(default_factory=list)
+    clients: List[str] = field(default_factory=list)
+    # Service ID -> compute node resolved while starting the session
+    service_hosts: Dict[str, str] = field(default_factory=dict)
+    status: str = 'starting'
+    started_at: float = 0.0
+    stopped_at: Optional[float] = None
+    error: Optional[str] = None
+
+class TrackedInstances(dict):
+    """Tracked jobs by instance ID, with the IDs indexed by active and finished status
+    
+    Status changes must go through set_status so the indices stay current.
+    The indices are dicts used as insertion-ordered sets.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._active: Dict[str, None] = {}
+        self._finished: Dict[str, None] = {}
+    
+    def __setitem__(self, instance_id: str, job_info: JobInfo):
+        super().__setitem__(instance_id, job_info)
+        self._index(instance_id, job_info.status)
+    
+    def __delitem__(self, instance_id: str):
+        super().__delitem__(instance_id)
+        self._active.pop(instance_id, None)
+        self._finished.pop(instance_id, None)
+    
+    def clear(self):
+        super().clear()
+        self._active.clear()
+        self._finished.clear()
+    
+    def set_status(self, instance_id: str, status: ServiceStatus):
+        """Change the status of a tracked instance and move it between indices"""
+        self[instance_id].status = status
+        self._index(instance_id, status)
+    
+    def active_ids(self) -> List[str]:
+        """IDs of pending or running instances"""
+        return list(self._active)
+    
+    def finished_ids(self) -> List[str]:
+        """IDs of completed, failed or cancelled instances"""
+        return list(self._finished)
+    
+    def _index(self, instance_id: str, status: ServiceStatus):
+        if status in ACTIVE_STATUSES:
+            self._finished.pop(instance_id, None)
+            self._active.setdefault(instance_id)
+        elif status in FINISHED_STATUSES:
+            self._active.pop(instance_id, None)
+            self._finished.setdefault(instance_id)
+
 class BaseModule(abc.ABC):
     """Base class for all orchestrator modules"""
     
+    # Kind of instance tracked by the module, used for status keys and messages
+    INSTANCE_KIND = 'service'
+    
+    # Seconds a status fetched from SLURM is reused by back-to-back status checks
+    STATUS_TTL = 1.5
+    
     def __init__(self, config: Dict[str, Any], ssh_client=None):
         self.config = config
         self.ssh_client = ssh_client
         self.logger = logging.getLogger(self.__class__.__name__)
-        self._running_instances: Dict[str, JobInfo] = {}
+        self._running_instances = TrackedInstances()
+        # Instance ID -> (time.monotonic() of the SLURM query, status dictionary)
+        self._status_cache: Dict[str, tuple] = {}
     
     def generate_id(self) -> str:
         """Generate a unique ID for services/clients"""
-        return str(uuid.uuid4())[:8]
+        return secrets.token_hex(4)
     
     def get_current_time(self) -> float:
         """Get current timestamp"""
         return time.time()
     
+    def _set_status(self, instance_id: str, job_info: JobInfo, status: ServiceStatus):
+        """Change an instance's status, keeping the active/finished indices in step"""
+        self._status_cache.pop(instance_id, None)
+        if self._running_instances.get(instance_id) is job_info:
+            self._running_instances.set_status(instance_id, status)
+        else:
+            job_info.status = status
+    
+    def _refresh_statuses(self, check_status):
+        """Refresh every active instance with check_status(id), running the SSH calls concurrently
+        
+        One squeue of all job states comes first; active instances whose queue
+        state still matches their tracked status need no further query.
+        Finished instances keep their final state.
+        """
+        instance_ids = self._running_instances.active_ids()
+        if not instance_ids:
+            return
+        
+        try:
+            job_states = self.ssh_client.get_job_states(
+                [self._running_instances[instance_id].job_id for instance_id in instance_ids
+                 if self._running_instances[instance_id].job_id]
+            )
+        except Exception as e:
+            self.logger.debug(f"Could not list job states, checking each instance: {e}")
+            job_states = {}
+        instance_ids = [
+            instance_id for instance_id in instance_ids
+            if not self._matches_job_state(self._running_instances[instance_id], job_states)
+        ]
+        if not instance_ids:
+            return
+        
+        def refresh(instance_id):
+            try:
+                check_status(instance_id)
+            except Exception as e:
+                self.logger.error(f"Error updating status for {instance_id}: {e}")
+        
+        with ThreadPoolExecutor(max_workers=min(MAX_STATUS_WORKERS, len(instance_ids))) as executor:
+            list(executor.map(refresh, instance_ids))
+    
+    def _refresh_job(self, instance_id: str, job_info: JobInfo) -> dict:
+        """Update a tracked instance from SLURM and return its status dictionary
+        
+        A status fetched less than STATUS_TTL seconds ago is returned again
+        without another SSH round-trip.
+        """
+        if not (self.ssh_client and job_info.job_id):
+            return self._status_dict(instance_id, job_info)
+        
+        cached = self._status_cache.get(instance_id)
+        if cached and time.monotonic() - cached[0] < self.STATUS_TTL:
+            return dict(cached[1])
+        
+        try:
+            slurm_status = self.ssh_client.get_job_status(job_info.job_id)
+            if slurm_status:
+                status = self._apply_slurm_status(instance_id, job_info, slurm_status)
+            else:
+                # Job not found in SLURM - might have completed very quickly
+                # Only mark as completed if it was previously pending/running
+                if job_info.status in ACTIVE_STATUSES:
+                    self.logger.warning(f"Job {job_info.job_id} not found in SLURM, marking as completed")
+                    self._set_status(instance_id, job_info, ServiceStatus.COMPLETED)
+                    if not job_info.completed_at:
+                        job_info.completed_at = self.get_current_time()
+                status = self._status_dict(instance_id, job_info)
+        except Exception as e:
+            self.logger.error(f"Error checking status for {self.INSTANCE_KIND} {instance_id}: {e}")
+            return self._status_dict(instance_id, job_info)
+        
+        self._status_cache[instance_id] = (time.monotonic(), dict(status))
+        return status
+    
+    def cancel_jobs(self, job_ids: List[str]) -> List[str]:
+        """Cancel the SLURM jobs of several instances with one scancel, update tracking and return the cancelled IDs"""
+        cancelled = self.ssh_client.cancel_jobs(job_ids)
+        
+        cancelled_ids = set(cancelled)
+        for instance_id, job_info in self._running_instances.items():
+            if job_info.job_id in cancelled_ids:
+                self._set_status(instance_id, job_info, ServiceStatus.CANCELLED)
+                job_info.completed_at = self.get_current_time()
+                self.logger.info(f"{self.INSTANCE_KIND.capitalize()} {instance_id} stopped")
+        return cancelled
+    
+    def bulk_status(self, instance_ids: List[str]) -> Dict[str, dict]:
+        """Check the status of several instances with one squeue call
+        
+        Statuses fetched less than STATUS_TTL seconds ago are reused, and
+        active instances whose jobs have already left the queue fall back
+        to _refresh_job, which consults sacct; those lookups run concurrently.
+        """
+        statuses = {}
+        stale = {}
+        for instance_id in instance_ids:
+            cached = self._status_cache.get(instance_id)
+            if cached and time.monotonic() - cached[0] < self.STATUS_TTL:
+                statuses[instance_id] = dict(cached[1])
+            elif instance_id in self._running_instances:
+                stale[instance_id] = self._running_instances[instance_id]
+        
+        queued = {}
+        job_ids = [job_info.job_id for job_info in stale.values() if job_info.job_id]
+        if self.ssh_client and job_ids:
+            queued = self.ssh_client.get_jobs_status(job_ids)
+        
+        vanished = []
+        for instance_id in instance_ids:
+            if instance_id in statuses:
+                continue
+            job_info = stale.get(instance_id)
+            if job_info is None:
+                statuses[instance_id] = {"error": f"{self.INSTANCE_KIND.capitalize()} {instance_id} not found"}
+            elif job_info.job_id in queued:
+                status = self._apply_slurm_status(instance_id, job_info, queued[job_info.job_id])
+                self._status_cache[instance_id] = (time.monotonic(), dict(status))
+                statuses[instance_id] = status
+            elif job_info.status in ACTIVE_STATUSES:
+                vanished.append(instance_id)
+            else:
+                # Finished instances keep their final state; no need to ask sacct again
+                statuses[instance_id] = self._status_dict(instance_id, job_info)
+        
+        if len(vanished) == 1:
+            statuses[vanished[0]] = self._refresh_job(vanished[0], stale[vanished[0]])
+        elif vanished:
+            with ThreadPoolExecutor(max_workers=min(MAX_STATUS_WORKERS, len(vanished))) as executor:
+                refreshed = executor.map(lambda instance_id: self._refresh_job(instance_id, stale[instance_id]), vanished)
+                statuses.update(zip(vanished, refreshed))
+        return {instance_id: statuses[instance_id] for instance_id in instance_ids}
+    
+    def _apply_slurm_status(self, instance_id: str, job_info: JobInfo, slurm_status: dict) -> dict:
+        """Update a tracked instance from a SLURM status record and return its status"""
+        slurm_state = slurm_status.get('state', 'UNKNOWN')
+        new_status = SLURM_STATE_MAP.get(slurm_state)
+        if new_status is not None:
+            self._set_status(instance_id, job_info, new_status)
+            
+            # Update timing info
+            if job_info.status == ServiceStatus.RUNNING and not job_info.started_at:
+                job_info.started_at = self.get_current_time()
+            elif job_info.status in FINISHED_STATUSES:
+                if not job_info.completed_at:
+                    job_info.completed_at = self.get_current_time()
+        
+        status = self._status_dict(instance_id, job_info)
+        status["slurm_state"] = slurm_state
+        status["nodes"] = slurm_status.get('nodes')
+        return status
+    
+    def _status_dict(self, instance_id: str, job_info: JobInfo) -> dict:
+        """Build the status dictionary returned for a tracked instance"""
+        return {
+            f"{self.INSTANCE_KIND}_id": instance_id,
+            "status": job_info.status.value,
+            "job_id": job_info.job_id,
+            "submitted_at": job_info.submitted_at,
+            "started_at": job_info.started_at,
+            "completed_at": job_info.completed_at
+        }
+    
+    @staticmethod
+    def _matches_job_state(job_info: JobInfo, job_states: Dict[str, str]) -> bool:
+        """Whether an active instance is still in the SLURM state it is tracked with"""
+        return (job_info.status in ACTIVE_STATUSES
+                and job_states.get(job_info.job_id, '').lower() == job_info.status.value)
+    
     @abc.abstractmethod
     def list_available_services(self) -> List[str]:
         """List all available service types"""
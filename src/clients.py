@@ -2,40 +2,144 @@
 Clients Module - Launch workloads to benchmark servers
 """
 
+import hashlib
+import json
 import logging
 import os
-import yaml
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 
-from base import BaseModule, JobInfo, ServiceStatus
+from base import BaseModule, JobInfo, ServiceStatus, load_yaml_file
 from services import JobFactory, Client
 
+# Cold loads of at least this many recipe files read them on a thread pool
+PARALLEL_LOAD_MIN_FILES = 4
+MAX_LOAD_WORKERS = 8
+
+# JSON snapshot of all parsed definitions, written into clients_dir
+DEFINITIONS_CACHE_FILE = '.client_definitions.cache.json'
+
+def _load_one_definition(path: Path) -> Tuple[Path, Any, Optional[Exception]]:
+    """Load one definition file for a thread pool, returning the error instead of raising it"""
+    try:
+        return path, load_yaml_file(path), None
+    except Exception as e:
+        return path, None, e
+
 class ClientsModule(BaseModule):
     """Manages client workloads on HPC cluster"""
     
+    INSTANCE_KIND = 'client'
+    
     def __init__(self, config: Dict[str, Any], ssh_client=None):
         super().__init__(config, ssh_client)
         self.clients_dir = Path(config.get('clients_dir', 'recipes/clients'))
+        # (local_path, script_name) -> script file found locally
+        self._script_paths: Dict[tuple, str] = {}
+        # (remote path, local mtime_ns, local size) of scripts already uploaded
+        self._uploaded_scripts: set = set()
+        self.client_definitions: Dict[str, dict] = {}
+        # Client type -> template snapshot merged into recipes of that type
+        self._merged_template_cache: Dict[str, dict] = {}
+        # Fingerprint of the recipe files the current definitions were loaded from
+        self._definitions_fp: Optional[str] = None
         self._load_client_definitions()
     
-    def _load_client_definitions(self):
-        """Load client definitions from YAML files"""
-        self.client_definitions = {}
+    def reload_definitions(self, force: bool = False) -> bool:
+        """Re-read client definitions if a recipe file was added, removed or changed
         
+        Returns True when the definitions were reloaded.
+        """
+        if force:
+            self._definitions_fp = None
+        return self._load_client_definitions()
+    
+    def _load_client_definitions(self) -> bool:
+        """Load client definitions from YAML files, unless they are unchanged since the last load"""
         if not self.clients_dir.exists():
             self.logger.warning(f"Clients directory not found: {self.clients_dir}")
-            return
+            self.client_definitions = {}
+            self._merged_template_cache = {}
+            self._definitions_fp = None
+            return True
         
-        for yaml_file in self.clients_dir.glob("*.yaml"):
+        yaml_files = sorted(self.clients_dir.glob("*.yaml"))
+        fingerprint = self._definitions_fingerprint(yaml_files)
+        if fingerprint == self._definitions_fp:
+            return False
+        
+        self.client_definitions = {}
+        self._merged_template_cache = {}
+        self._definitions_fp = fingerprint
+        
+        cache_path = self.clients_dir / DEFINITIONS_CACHE_FILE
+        cached = self._read_definitions_cache(cache_path, fingerprint)
+        if cached is not None:
+            self.client_definitions = cached
+            self.logger.debug(f"Loaded {len(cached)} client definitions from {cache_path}")
+            return True
+        
+        if len(yaml_files) >= PARALLEL_LOAD_MIN_FILES:
+            with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, len(yaml_files))) as executor:
+                results = list(executor.map(_load_one_definition, yaml_files))
+        else:
+            results = [_load_one_definition(yaml_file) for yaml_file in yaml_files]
+        
+        all_loaded = True
+        for yaml_file, client_def, error in results:
             try:
-                with open(yaml_file, 'r') as f:
-                    client_def = yaml.safe_load(f)
-                    client_name = client_def.get('name', yaml_file.stem)
-                    self.client_definitions[client_name] = client_def
-                    self.logger.debug(f"Loaded client definition: {client_name}")
+                if error is not None:
+                    raise error
+                client_name = client_def.get('name', yaml_file.stem)
+                self.client_definitions[client_name] = client_def
+                self.logger.debug(f"Loaded client definition: {client_name}")
             except Exception as e:
+                all_loaded = False
                 self.logger.error(f"Failed to load client definition {yaml_file}: {e}")
+        
+        # Keep reporting broken files on every start rather than caching around them
+        if all_loaded:
+            self._write_definitions_cache(cache_path, fingerprint)
+        return True
+    
+    @staticmethod
+    def _definitions_fingerprint(yaml_files: List[Path]) -> str:
+        """Hash the name, mtime and size of every definition file"""
+        digest = hashlib.blake2b(digest_size=16)
+        for path in yaml_files:
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}\n".encode())
+        return digest.hexdigest()
+    
+    def _read_definitions_cache(self, cache_path: Path, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the cached definitions if they were built from the same files"""
+        try:
+            with open(cache_path, 'r') as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.debug(f"Ignoring unreadable definitions cache {cache_path}: {e}")
+            return None
+        
+        if not isinstance(cached, dict) or cached.get('fingerprint') != fingerprint:
+            return None
+        return cached.get('defs')
+    
+    def _write_definitions_cache(self, cache_path: Path, fingerprint: str):
+        """Atomically replace the definitions cache; failures only cost the next warm start"""
+        temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'defs': self.client_definitions}, f)
+            os.replace(temp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.debug(f"Could not write definitions cache {cache_path}: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
     
     def list_available_services(self) -> List[str]:
         """Return a list of all supported client recipes (implementing BaseModule interface)"""
@@ -53,22 +157,19 @@ class ClientsModule(BaseModule):
         """Return currently running client IDs"""
         # First update statuses from SLURM to get accurate state
         if self.ssh_client:
-            for client_id in list(self._running_instances.keys()):
-                try:
-                    # Update status for each client
-                    self.check_client_status(client_id)
-                except Exception as e:
-                    self.logger.error(f"Error updating status for client {client_id}: {e}")
+            try:
+                self.bulk_status(self._running_instances.active_ids())
+            except Exception as e:
+                self.logger.error(f"Error updating client statuses: {e}")
         
         # Return clients that are active (pending or running)
-        return [cid for cid, job_info in self._running_instances.items() 
-                if job_info.status in [ServiceStatus.PENDING, ServiceStatus.RUNNING]]
+        return self._running_instances.active_ids()
     
     def start_client(self, recipe: dict, target_service_id: str, target_service_host: str = None) -> str:
         """Launch a client workload against a target service"""
         
         client_id = self.generate_id()
-        self.logger.info(f"Starting client {client_id} with recipe: {recipe}")
+        self.logger.info("Starting client %s with recipe: %r", client_id, recipe)
         self.logger.info(f"Target service ID: {target_service_id}")
         self.logger.info(f"Target service host: {target_service_host}")
         
@@ -87,7 +188,7 @@ class ClientsModule(BaseModule):
                 self._ensure_script_uploaded(client, client_id)
                 
                 # DEBUG: Log the generated script content
-                self.logger.debug(f"Generated SLURM script for client {client_id}:\n{script_content}")
+                self.logger.debug("Generated SLURM script for client %s:\n%s", client_id, script_content)
 
                 job_id = self.ssh_client.submit_slurm_job(
                     script_content, f"client_{client_id}.sh"
@@ -134,7 +235,7 @@ class ClientsModule(BaseModule):
             if self.ssh_client and job_info.job_id:
                 success = self.ssh_client.cancel_job(job_info.job_id)
                 if success:
-                    job_info.status = ServiceStatus.CANCELLED
+                    self._set_status(client_id, job_info, ServiceStatus.CANCELLED)
                     job_info.completed_at = self.get_current_time()
                     self.logger.info(f"Client {client_id} stopped")
                     return True
@@ -143,7 +244,7 @@ class ClientsModule(BaseModule):
                     return False
             else:
                 # Local mode - just mark as stopped
-                job_info.status = ServiceStatus.CANCELLED
+                self._set_status(client_id, job_info, ServiceStatus.CANCELLED)
                 job_info.completed_at = self.get_current_time()
                 self.logger.info(f"Client {client_id} marked as stopped (local mode)")
                 return True
@@ -158,64 +259,7 @@ class ClientsModule(BaseModule):
         if client_id not in self._running_instances:
             return {"error": f"Client {client_id} not found"}
         
-        job_info = self._running_instances[client_id]
-        
-        # Update status from SLURM if connected
-        if self.ssh_client and job_info.job_id:
-            try:
-                slurm_status = self.ssh_client.get_job_status(job_info.job_id)
-                if slurm_status:
-                    # Map SLURM states to our status enum
-                    state_mapping = {
-                        'PENDING': ServiceStatus.PENDING,
-                        'RUNNING': ServiceStatus.RUNNING,
-                        'COMPLETED': ServiceStatus.COMPLETED,
-                        'FAILED': ServiceStatus.FAILED,
-                        'CANCELLED': ServiceStatus.CANCELLED,
-                        'TIMEOUT': ServiceStatus.FAILED
-                    }
-                    
-                    slurm_state = slurm_status.get('state', 'UNKNOWN')
-                    if slurm_state in state_mapping:
-                        job_info.status = state_mapping[slurm_state]
-                        
-                        # Update timing info
-                        if job_info.status == ServiceStatus.RUNNING and not job_info.started_at:
-                            job_info.started_at = self.get_current_time()
-                        elif job_info.status in [ServiceStatus.COMPLETED, ServiceStatus.FAILED, ServiceStatus.CANCELLED]:
-                            if not job_info.completed_at:
-                                job_info.completed_at = self.get_current_time()
-                    
-                    return {
-                        "client_id": client_id,
-                        "status": job_info.status.value,
-                        "job_id": job_info.job_id,
-                        "slurm_state": slurm_state,
-                        "nodes": slurm_status.get('nodes'),
-                        "submitted_at": job_info.submitted_at,
-                        "started_at": job_info.started_at,
-                        "completed_at": job_info.completed_at
-                    }
-                else:
-                    # Job not found in SLURM - might have completed very quickly
-                    # Only mark as completed if it was previously pending/running
-                    if job_info.status in [ServiceStatus.PENDING, ServiceStatus.RUNNING]:
-                        self.logger.warning(f"Job {job_info.job_id} not found in SLURM, marking as completed")
-                        job_info.status = ServiceStatus.COMPLETED
-                        if not job_info.completed_at:
-                            job_info.completed_at = self.get_current_time()
-            except Exception as e:
-                self.logger.error(f"Error checking status for client {client_id}: {e}")
-        
-        # Return basic status
-        return {
-            "client_id": client_id,
-            "status": job_info.status.value,
-            "job_id": job_info.job_id,
-            "submitted_at": job_info.submitted_at,
-            "started_at": job_info.started_at,
-            "completed_at": job_info.completed_at
-        }
+        return self._refresh_job(client_id, self._running_instances[client_id])
     
     def _parse_client_recipe(self, recipe: dict) -> Client:
         """Parse recipe dictionary into Client using factory"""
@@ -224,8 +268,8 @@ class ClientsModule(BaseModule):
         
         # Get client template if specified
         client_type = client_def.get('type')
-        if client_type and client_type in self.client_definitions:
-            template = self.client_definitions[client_type]
+        template = self._template_for(client_type) if client_type else None
+        if template is not None:
             # Merge template with recipe overrides
             merged_def = {**template, **client_def}
         else:
@@ -235,14 +279,16 @@ class ClientsModule(BaseModule):
         full_recipe = {'client': merged_def}
         return JobFactory.create_client(full_recipe, self.config)
     
+    def _template_for(self, client_type: str) -> Optional[dict]:
+        """Return the template for a client type, snapshotted on first use"""
+        template = self._merged_template_cache.get(client_type)
+        if template is None and client_type in self.client_definitions:
+            template = self._merged_template_cache[client_type] = dict(self.client_definitions[client_type])
+        return template
+    
     def cleanup_completed_clients(self):
         """Remove completed/failed clients from tracking"""
-        completed_clients = []
-        for client_id, job_info in self._running_instances.items():
-            if job_info.status in [ServiceStatus.COMPLETED, ServiceStatus.FAILED, ServiceStatus.CANCELLED]:
-                completed_clients.append(client_id)
-        
-        for client_id in completed_clients:
+        for client_id in self._running_instances.finished_ids():
             self.logger.info(f"Cleaning up completed client {client_id}")
             del self._running_instances[client_id]
     
@@ -265,33 +311,15 @@ class ClientsModule(BaseModule):
         
         remote_script_path = f"{remote_path.rstrip('/')}/{script_name}"
         
-        # Always upload script to ensure it is up to date
-        # (removed remote existence check)
-        
-        # Find script locally
-        local_candidates = [
-            f"{local_path.rstrip('/')}/{script_name}",
-            f"../{local_path.rstrip('/')}/{script_name}",
-            script_name,  # Current directory
-        ]
-        
-        # Special handling for ollama_benchmark -> ollama.py mapping
-        if script_name == "ollama_benchmark.py":
-            local_candidates.extend([
-                f"{local_path.rstrip('/')}/ollama.py",
-                f"../{local_path.rstrip('/')}/ollama.py",
-                "ollama.py"
-            ])
-        
-        local_script_path = None
-        for candidate in local_candidates:
-            if os.path.exists(candidate):
-                local_script_path = candidate
-                break
-        
+        local_script_path = self._find_local_script(local_path, script_name)
         if not local_script_path:
-            self.logger.error(f"Script {script_name} not found locally in: {local_candidates}")
-            self.logger.error(f"Current working directory: {os.getcwd()}")
+            return
+        
+        # Upload again whenever the local copy changed, so the remote one stays up to date
+        stat = os.stat(local_script_path)
+        upload_key = (remote_script_path, stat.st_mtime_ns, stat.st_size)
+        if upload_key in self._uploaded_scripts:
+            self.logger.debug(f"Script {local_script_path} already uploaded to {remote_script_path}")
             return
         
         # Create remote directory and upload
@@ -311,6 +339,37 @@ class ClientsModule(BaseModule):
                 self.ssh_client.execute_command(f"chmod +x {remote_script_path}")
             except Exception as e:
                 self.logger.warning(f"Failed to make script executable: {e}")
+            self._uploaded_scripts.add(upload_key)
             self.logger.info(f"Successfully uploaded script: {local_script_path} -> {remote_script_path}")
         else:
-            self.logger.error(f"Failed to upload script: {local_script_path} -> {remote_script_path}")
\ No newline at end of file
+            self.logger.error(f"Failed to upload script: {local_script_path} -> {remote_script_path}")
+    
+    def _find_local_script(self, local_path: str, script_name: str) -> Optional[str]:
+        """Locate a client script locally, remembering where it was found"""
+        key = (local_path, script_name)
+        cached = self._script_paths.get(key)
+        if cached and os.path.exists(cached):
+            return cached
+        
+        local_candidates = [
+            f"{local_path.rstrip('/')}/{script_name}",
+            f"../{local_path.rstrip('/')}/{script_name}",
+            script_name,  # Current directory
+        ]
+        
+        # Special handling for ollama_benchmark -> ollama.py mapping
+        if script_name == "ollama_benchmark.py":
+            local_candidates.extend([
+                f"{local_path.rstrip('/')}/ollama.py",
+                f"../{local_path.rstrip('/')}/ollama.py",
+                "ollama.py"
+            ])
+        
+        for candidate in local_candidates:
+            if os.path.exists(candidate):
+                self._script_paths[key] = candidate
+                return candidate
+        
+        self.logger.error(f"Script {script_name} not found locally in: {local_candidates}")
+        self.logger.error(f"Current working directory: {os.getcwd()}")
+        return None
\ No newline at end of file
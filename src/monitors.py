@@ -3,21 +3,57 @@ Monitors Module - Manages monitoring instances using Prometheus
 """
 
 import logging
+import os
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 
+try:
+    import orjson  # optional: faster JSON serialization of metrics files
+except ImportError:
+    orjson = None
+
 from base import BaseModule, JobInfo, ServiceStatus
 from services import JobFactory
 
+# Default Prometheus port on the monitor's compute node
+PROMETHEUS_PORT = 9090
+
 class MonitorsModule(BaseModule):
     """Manages Prometheus monitoring instances on HPC cluster"""
     
+    INSTANCE_KIND = 'monitor'
+    
     def __init__(self, config: Dict[str, Any], ssh_client=None):
         super().__init__(config, ssh_client)
         self.monitors_dir = Path(config.get('monitors_dir', 'recipes/monitors'))
         self.metrics_dir = Path(config.get('metrics_dir', 'metrics'))
+        # Created on the first Prometheus query, so commands that never query skip importing requests
+        self._http = None
+    
+    def _http_session(self):
+        """Return the keep-alive HTTP session shared by all Prometheus queries, or None without requests"""
+        if self._http is None:
+            try:
+                import requests  # optional: needed only to query Prometheus
+                from requests.adapters import HTTPAdapter
+            except ImportError:
+                return None
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({'Connection': 'keep-alive'})
+            self._http = session
+        return self._http
+    
+    def close(self):
+        """Close pooled HTTP connections to Prometheus"""
+        if self._http is not None:
+            self._http.close()
     
     def list_available_services(self) -> List[str]:
         """List all available monitor types (required by BaseModule)"""
@@ -26,14 +62,12 @@ class MonitorsModule(BaseModule):
     def list_running_services(self) -> List[str]:
         """List currently running monitor IDs (required by BaseModule)"""
         if self.ssh_client:
-            for monitor_id in list(self._running_instances.keys()):
-                try:
-                    self.check_monitor_status(monitor_id)
-                except Exception as e:
-                    self.logger.error(f"Error updating status for monitor {monitor_id}: {e}")
+            try:
+                self.bulk_status(self._running_instances.active_ids())
+            except Exception as e:
+                self.logger.error(f"Error updating monitor statuses: {e}")
         
-        return [mid for mid, job_info in self._running_instances.items() 
-                if job_info.status in [ServiceStatus.PENDING, ServiceStatus.RUNNING]]
+        return self._running_instances.active_ids()
     
     def list_available_monitors(self) -> List[str]:
         """List all available monitor types (currently only Prometheus)"""
@@ -100,7 +134,7 @@ class MonitorsModule(BaseModule):
             if self.ssh_client and job_info.job_id:
                 success = self.ssh_client.cancel_job(job_info.job_id)
                 if success:
-                    job_info.status = ServiceStatus.CANCELLED
+                    self._set_status(monitor_id, job_info, ServiceStatus.CANCELLED)
                     job_info.completed_at = self.get_current_time()
                     self.logger.info(f"Monitor {monitor_id} stopped")
                     return True
@@ -109,7 +143,7 @@ class MonitorsModule(BaseModule):
                     return False
             else:
                 # Local mode
-                job_info.status = ServiceStatus.CANCELLED
+                self._set_status(monitor_id, job_info, ServiceStatus.CANCELLED)
                 job_info.completed_at = self.get_current_time()
                 self.logger.info(f"Monitor {monitor_id} marked as stopped (local mode)")
                 return True
@@ -123,58 +157,17 @@ class MonitorsModule(BaseModule):
         if monitor_id not in self._running_instances:
             return {"error": f"Monitor {monitor_id} not found"}
         
-        job_info = self._running_instances[monitor_id]
-        
-        # Update status from SLURM if connected
-        if self.ssh_client and job_info.job_id:
-            try:
-                slurm_status = self.ssh_client.get_job_status(job_info.job_id)
-                if slurm_status:
-                    state_mapping = {
-                        'PENDING': ServiceStatus.PENDING,
-                        'RUNNING': ServiceStatus.RUNNING,
-                        'COMPLETED': ServiceStatus.COMPLETED,
-                        'FAILED': ServiceStatus.FAILED,
-                        'CANCELLED': ServiceStatus.CANCELLED,
-                        'TIMEOUT': ServiceStatus.FAILED
-                    }
-                    
-                    slurm_state = slurm_status.get('state', 'UNKNOWN')
-                    if slurm_state in state_mapping:
-                        job_info.status = state_mapping[slurm_state]
-                        
-                        if job_info.status == ServiceStatus.RUNNING and not job_info.started_at:
-                            job_info.started_at = self.get_current_time()
-                        elif job_info.status in [ServiceStatus.COMPLETED, ServiceStatus.FAILED, ServiceStatus.CANCELLED]:
-                            if not job_info.completed_at:
-                                job_info.completed_at = self.get_current_time()
-                    
-                    # Get node information for Prometheus endpoint
-                    nodes = slurm_status.get('nodes')
-                    if nodes:
-                        job_info.nodes = nodes if isinstance(nodes, list) else [nodes]
-                    
-                    return {
-                        "monitor_id": monitor_id,
-                        "status": job_info.status.value,
-                        "job_id": job_info.job_id,
-                        "slurm_state": slurm_state,
-                        "nodes": job_info.nodes,
-                        "submitted_at": job_info.submitted_at,
-                        "started_at": job_info.started_at,
-                        "completed_at": job_info.completed_at
-                    }
-            except Exception as e:
-                self.logger.error(f"Error checking monitor status {monitor_id}: {e}")
+        return self._refresh_job(monitor_id, self._running_instances[monitor_id])
+    
+    def _apply_slurm_status(self, monitor_id: str, job_info: JobInfo, slurm_status: dict) -> dict:
+        """Update a tracked monitor and remember its nodes for the Prometheus endpoint"""
+        status = super()._apply_slurm_status(monitor_id, job_info, slurm_status)
         
-        return {
-            "monitor_id": monitor_id,
-            "status": job_info.status.value,
-            "job_id": job_info.job_id,
-            "submitted_at": job_info.submitted_at,
-            "started_at": job_info.started_at,
-            "completed_at": job_info.completed_at
-        }
+        nodes = slurm_status.get('nodes')
+        if nodes:
+            job_info.nodes = nodes if isinstance(nodes, list) else [nodes]
+        status["nodes"] = job_info.nodes
+        return status
     
     def get_monitor_endpoint(self, monitor_id: str) -> Optional[str]:
         """Get the Prometheus endpoint URL for a monitor"""
@@ -183,28 +176,35 @@ class MonitorsModule(BaseModule):
         
         job_info = self._running_instances[monitor_id]
         
-        # Get node information
-        if job_info.nodes and len(job_info.nodes) > 0:
-            host = job_info.nodes[0]
-            port = 9090  # Default Prometheus port
-            return f"http://{host}:{port}"
-        
-        # Try to get from SLURM
-        if self.ssh_client and job_info.job_id:
-            try:
-                cmd = f"squeue -j {job_info.job_id} -h -o '%N'"
-                result = self.ssh_client.run_command(cmd)
-                
-                if result and result.strip():
-                    node = result.strip()
-                    job_info.nodes = [node]
-                    port = 9090
-                    return f"http://{node}:{port}"
-            except Exception as e:
-                self.logger.error(f"Error getting monitor endpoint: {e}")
+        # Nodes are recorded by status checks; refresh once if still unknown
+        if not job_info.nodes and self.ssh_client and job_info.job_id:
+            self.check_monitor_status(monitor_id)
         
+        return self._endpoint_url(job_info)
+    
+    def _endpoint_url(self, job_info: JobInfo) -> Optional[str]:
+        """Build the Prometheus URL on the first node of a monitor's job"""
+        if job_info.nodes:
+            return f"http://{job_info.nodes[0]}:{PROMETHEUS_PORT}"
         return None
     
+    def bulk_endpoints(self, monitor_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Get the Prometheus endpoint URLs of several monitors
+        
+        Node information recorded by an earlier status check is reused; the
+        monitors still missing a node are resolved together by bulk_status.
+        """
+        unresolved = [mid for mid in monitor_ids
+                      if mid in self._running_instances and not self._running_instances[mid].nodes]
+        if unresolved and self.ssh_client:
+            self.bulk_status(unresolved)
+        
+        endpoints = {}
+        for monitor_id in monitor_ids:
+            job_info = self._running_instances.get(monitor_id)
+            endpoints[monitor_id] = self._endpoint_url(job_info) if job_info else None
+        return endpoints
+    
     def query_metrics(self, monitor_id: str, query: str) -> dict:
         """Query Prometheus for metrics"""
         endpoint = self.get_monitor_endpoint(monitor_id)
@@ -212,20 +212,20 @@ class MonitorsModule(BaseModule):
         if not endpoint:
             return {"error": "Monitor endpoint not available"}
         
+        http = self._http_session()
+        if http is None:
+            return {"error": "requests library not available for querying"}
+        
         try:
-            import requests
-            
             # Build Prometheus query API URL
             query_url = f"{endpoint}/api/v1/query"
             params = {'query': query}
             
-            response = requests.get(query_url, params=params, timeout=10)
+            response = http.get(query_url, params=params, timeout=10)
             response.raise_for_status()
             
             return response.json()
             
-        except ImportError:
-            return {"error": "requests library not available for querying"}
         except Exception as e:
             self.logger.error(f"Error querying Prometheus: {e}")
             return {"error": str(e)}
@@ -244,8 +244,7 @@ class MonitorsModule(BaseModule):
             
             # Save to file
             output_path = self.metrics_dir / output_file
-            with open(output_path, 'w') as f:
-                json.dump(metrics_data, f, indent=2)
+            self._write_json(output_path, metrics_data)
             
             self.logger.info(f"Metrics saved to {output_path}")
             return True
@@ -284,20 +283,25 @@ class MonitorsModule(BaseModule):
                 "scrape_duration": "scrape_duration_seconds"
             }
             
-            for metric_name, query in queries.items():
-                try:
-                    result = self.query_metrics(monitor_id, query)
-                    if "error" not in result:
-                        report["metrics"][metric_name] = result
-                except Exception as e:
-                    self.logger.warning(f"Failed to collect {metric_name}: {e}")
+            # The queries are independent reads, so run them concurrently
+            self._http_session()  # create it once here rather than racing in the workers
+            with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+                futures = {
+                    metric_name: executor.submit(self.query_metrics, monitor_id, query)
+                    for metric_name, query in queries.items()
+                }
+                for metric_name, future in futures.items():
+                    try:
+                        result = future.result(timeout=15)
+                        if "error" not in result:
+                            report["metrics"][metric_name] = result
+                    except Exception as e:
+                        self.logger.warning(f"Failed to collect {metric_name}: {e}")
             
             # Save report
             self.metrics_dir.mkdir(parents=True, exist_ok=True)
             output_path = self.metrics_dir / output_file
-            
-            with open(output_path, 'w') as f:
-                json.dump(report, f, indent=2)
+            self._write_json(output_path, report)
             
             self.logger.info(f"Report saved to {output_path}")
             return True
@@ -306,13 +310,23 @@ class MonitorsModule(BaseModule):
             self.logger.error(f"Error constructing report: {e}")
             return False
     
+    @staticmethod
+    def _write_json(output_path: Path, data: dict):
+        """Write indented JSON atomically, so readers never see a partial file"""
+        temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+        try:
+            if orjson is not None:
+                temp_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(temp_path, 'w') as f:
+                    json.dump(data, f, indent=2)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+    
     def cleanup_completed_monitors(self):
         """Remove completed/failed monitors from tracking"""
-        completed_monitors = []
-        for monitor_id, job_info in self._running_instances.items():
-            if job_info.status in [ServiceStatus.COMPLETED, ServiceStatus.FAILED, ServiceStatus.CANCELLED]:
-                completed_monitors.append(monitor_id)
-        
-        for monitor_id in completed_monitors:
+        for monitor_id in self._running_instances.finished_ids():
             self.logger.info(f"Cleaning up completed monitor {monitor_id}")
             del self._running_instances[monitor_id]
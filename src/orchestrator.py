@@ -2,29 +2,53 @@
 Orchestrator Module - Central orchestration and benchmark management engine
 """
 
+import itertools
+import json
 import logging
+import re
 import yaml
-import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 
-from ssh_client import SSHClient
+try:
+    from yaml import CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeDumper as _YamlDumper
+
+try:
+    import orjson  # optional: faster JSON serialization of reports
+except ImportError:
+    orjson = None
+
+from base import SessionInfo, load_yaml_file
 from servers import ServersModule
 from clients import ClientsModule
 from monitors import MonitorsModule
 
+# Upper bound on result files transferred at the same time
+MAX_DOWNLOAD_WORKERS = 8
+
+# Job name keywords that classify queued jobs as services or clients,
+# each compiled into one case-insensitive alternation
+SERVICE_JOB_RE = re.compile('service|ollama|server|redis|mysql|postgres|chroma', re.IGNORECASE)
+CLIENT_JOB_RE = re.compile('client|benchmark|workload', re.IGNORECASE)
+
 class BenchmarkOrchestrator:
     """Central orchestration engine for benchmark experiments"""
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", connect: bool = True):
         self.logger = logging.getLogger(__name__)
         
         # Load configuration
         self.config = self._load_config(config_path)
         
-        # Initialize SSH client if HPC config provided
+        # Initialize SSH client if HPC config provided; paramiko is only
+        # imported when a connection is actually wanted
         self.ssh_client = None
-        if 'hpc' in self.config:
+        if connect and 'hpc' in self.config:
+            from ssh_client import SSHClient
+            
             hpc_config = self.config['hpc']
             self.ssh_client = SSHClient(
                 hostname=hpc_config.get('hostname'),
@@ -45,18 +69,20 @@ class BenchmarkOrchestrator:
         self.monitors = MonitorsModule(self.config, self.ssh_client)
         
         # Track active sessions
-        self._active_sessions: Dict[str, Dict[str, Any]] = {}
+        self._active_sessions: Dict[str, SessionInfo] = {}
+        # Numbers session IDs so they stay unique when sessions are removed
+        self._session_counter = itertools.count(1)
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from YAML file"""
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    config = yaml.safe_load(f)
-                    self.logger.info(f"Loaded configuration from {config_path}")
-                    return config
-            except Exception as e:
-                self.logger.error(f"Failed to load config {config_path}: {e}")
+        try:
+            config = load_yaml_file(config_path)
+            self.logger.info(f"Loaded configuration from {config_path}")
+            return config
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Failed to load config {config_path}: {e}")
         
         # Return default configuration
         self.logger.warning("Using default configuration")
@@ -77,12 +103,8 @@ class BenchmarkOrchestrator:
     def load_recipe(self, file_path: str) -> dict:
         """Load and validate a benchmark recipe"""
         
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Recipe file not found: {file_path}")
-        
         try:
-            with open(file_path, 'r') as f:
-                recipe = yaml.safe_load(f)
+            recipe = load_yaml_file(file_path)
             
             # Basic validation
             if not isinstance(recipe, dict):
@@ -103,6 +125,8 @@ class BenchmarkOrchestrator:
             self.logger.info(f"Loaded recipe from {file_path}")
             return recipe
             
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Recipe file not found: {file_path}") from None
         except Exception as e:
             self.logger.error(f"Failed to load recipe {file_path}: {e}")
             raise
@@ -110,65 +134,56 @@ class BenchmarkOrchestrator:
     def start_benchmark_session(self, recipe: dict, target_service_id: str = None) -> str:
         """Launch an end-to-end benchmark session"""
         
-        session_id = f"session_{len(self._active_sessions) + 1}"
+        session_id = f"session_{next(self._session_counter)}"
         self.logger.info(f"Starting benchmark session {session_id}")
         
-        session_info = {
-            'session_id': session_id,
-            'recipe': recipe,
-            'services': [],
-            'clients': [],
-            'status': 'starting',
-            'started_at': self.servers.get_current_time()
-        }
+        session_info = SessionInfo(
+            session_id=session_id,
+            recipe=recipe,
+            started_at=self.servers.get_current_time()
+        )
         
         try:
             # Start services first
             if 'service' in recipe:
                 self.logger.info("Starting service...")
                 service_id = self.servers.start_service(recipe, target_service_id)
-                session_info['services'].append(service_id)
+                session_info.services.append(service_id)
                 self.logger.info(f"Service started: {service_id}")
             
             # Start clients (can target the service)
             if 'client' in recipe:
-                target_service = session_info['services'][0] if session_info['services'] else None
+                target_service = session_info.services[0] if session_info.services else None
                 target_service_host = None
                 
                 # Resolve service host if we have a target service
                 if target_service:
                     self.logger.info(f"Attempting to resolve host for service: {target_service}")
                     
-                    # Wait a bit for the service to get assigned to a node
-                    import time
-                    for attempt in range(6):  # Try for up to 30 seconds
-                        target_service_host = self.servers.get_service_host(target_service)
-                        if target_service_host:
-                            self.logger.info(f"✅ Resolved service {target_service} to host: {target_service_host}")
-                            break
-                        else:
-                            self.logger.info(f"🔄 Attempt {attempt + 1}/6: Service host not yet available, waiting 5s...")
-                            time.sleep(5)
-                    
-                    if not target_service_host:
+                    # Wait for the service to get assigned to a node
+                    target_service_host = self.servers.wait_for_service_host(target_service, timeout=30)
+                    if target_service_host:
+                        self.logger.info(f"✅ Resolved service {target_service} to host: {target_service_host}")
+                        session_info.service_hosts[target_service] = target_service_host
+                    else:
                         self.logger.warning(f"❌ Could not resolve host for service {target_service} after 30 seconds")
                 else:
                     self.logger.info("No target service specified")
                 
                 self.logger.info(f"Starting client targeting service: {target_service}")
                 client_id = self.clients.start_client(recipe, target_service, target_service_host)
-                session_info['clients'].append(client_id)
+                session_info.clients.append(client_id)
                 self.logger.info(f"Client started: {client_id}")
             
-            session_info['status'] = 'running'
+            session_info.status = 'running'
             self._active_sessions[session_id] = session_info
             
             self.logger.info(f"Benchmark session {session_id} started successfully")
             return session_id
             
         except Exception as e:
-            session_info['status'] = 'failed'
-            session_info['error'] = str(e)
+            session_info.status = 'failed'
+            session_info.error = str(e)
             self._active_sessions[session_id] = session_info
             self.logger.error(f"Failed to start benchmark session {session_id}: {e}")
             raise
@@ -186,28 +201,42 @@ class BenchmarkOrchestrator:
         success = True
         
         try:
-            # Stop clients first
-            for client_id in session_info['clients']:
-                if not self.clients.stop_client(client_id):
-                    success = False
-            
-            # Stop services
-            for service_id in session_info['services']:
-                if not self.servers.stop_service(service_id):
-                    success = False
+            # Stop clients first, then services, each with a single scancel
+            if not self._stop_instances(self.clients, session_info.clients, self.clients.stop_client):
+                success = False
+            if not self._stop_instances(self.servers, session_info.services, self.servers.stop_service):
+                success = False
             
-            session_info['status'] = 'stopped' if success else 'partially_stopped'
-            session_info['stopped_at'] = self.servers.get_current_time()
+            session_info.service_hosts.clear()
+            session_info.status = 'stopped' if success else 'partially_stopped'
+            session_info.stopped_at = self.servers.get_current_time()
             
             self.logger.info(f"Benchmark session {session_id} stopped")
             return success
             
         except Exception as e:
-            session_info['status'] = 'error'
-            session_info['error'] = str(e)
+            session_info.status = 'error'
+            session_info.error = str(e)
             self.logger.error(f"Error stopping session {session_id}: {e}")
             return False
     
+    def _stop_instances(self, module, instance_ids: List[str], stop_one) -> bool:
+        """Cancel the tracked SLURM jobs of instance_ids together; others go through stop_one"""
+        job_ids = []
+        remaining = []
+        for instance_id in instance_ids:
+            job_info = module._running_instances.get(instance_id)
+            if self.ssh_client and job_info and job_info.job_id:
+                job_ids.append(job_info.job_id)
+            else:
+                remaining.append(instance_id)
+        
+        success = not job_ids or len(module.cancel_jobs(job_ids)) == len(job_ids)
+        for instance_id in remaining:
+            if not stop_one(instance_id):
+                success = False
+        return success
+    
     def stop_service(self, service_id: str) -> bool:
         """Stop a specific service by ID"""
         try:
@@ -222,34 +251,52 @@ class BenchmarkOrchestrator:
             # Get comprehensive list of all services
             all_services = self.servers.list_all_services()
             
-            results = {
-                'total_services': len(all_services['all_services']),
-                'stopped_services': 0,
-                'failed_services': 0,
-                'results': {}
-            }
+            stopped = 0
+            failed = 0
+            outcomes = {}
+            
+            # Cancel every SLURM job with one scancel; scancel reports the jobs it
+            # could not cancel (e.g. already finished) and still cancels the rest
+            remaining_services = all_services['all_services']
+            job_ids = [s['job_id'] for s in remaining_services if s.get('job_id')]
+            if self.ssh_client and job_ids:
+                cancelled = set(self.servers.cancel_jobs(job_ids))
+                for service_info in remaining_services:
+                    if service_info.get('job_id'):
+                        if service_info['job_id'] in cancelled:
+                            stopped += 1
+                            outcomes[service_info['service_id']] = 'stopped'
+                        else:
+                            failed += 1
+                            outcomes[service_info['service_id']] = 'failed'
+                remaining_services = [s for s in remaining_services if not s.get('job_id')]
             
-            for service_info in all_services['all_services']:
+            for service_info in remaining_services:
                 service_id = service_info['service_id']
                 try:
                     # Use the enhanced stop_service method
                     if self.servers.stop_service(service_id):
-                        results['stopped_services'] += 1
-                        results['results'][service_id] = 'stopped'
+                        stopped += 1
+                        outcomes[service_id] = 'stopped'
                     else:
                         # Try using job_id if service_id failed
                         job_id = service_info.get('job_id')
                         if job_id and self.servers.stop_service(job_id):
-                            results['stopped_services'] += 1
-                            results['results'][service_id] = f'stopped (via job_id {job_id})'
+                            stopped += 1
+                            outcomes[service_id] = f'stopped (via job_id {job_id})'
                         else:
-                            results['failed_services'] += 1
-                            results['results'][service_id] = 'failed'
+                            failed += 1
+                            outcomes[service_id] = 'failed'
                 except Exception as e:
-                    results['failed_services'] += 1
-                    results['results'][service_id] = f'error: {str(e)}'
+                    failed += 1
+                    outcomes[service_id] = f'error: {str(e)}'
             
-            return results
+            return {
+                'total_services': len(all_services['all_services']),
+                'stopped_services': stopped,
+                'failed_services': failed,
+                'results': outcomes
+            }
             
         except Exception as e:
             self.logger.error(f"Error stopping all services: {e}")
@@ -279,24 +326,11 @@ class BenchmarkOrchestrator:
             
             # Get all SLURM jobs
             if self.ssh_client:
-                cmd = "squeue -u $USER --format='%i,%j,%T,%M,%N,%P' --noheader"
-                exit_code, stdout, stderr = self.ssh_client.execute_command(cmd)
-                
-                if exit_code == 0 and stdout.strip():
-                    for line in stdout.strip().split('\n'):
-                        if line.strip():
-                            fields = line.split(',')
-                            if len(fields) >= 6:
-                                job_info = {
-                                    'job_id': fields[0].strip(),
-                                    'name': fields[1].strip(),
-                                    'state': fields[2].strip(),
-                                    'time': fields[3].strip(),
-                                    'nodes': fields[4].strip(),
-                                    'partition': fields[5].strip(),
-                                    'is_tracked': fields[0].strip() in debug_info['service_mapping']
-                                }
-                                debug_info['slurm_jobs'].append(job_info)
+                for job in self.ssh_client.list_user_jobs():
+                    debug_info['slurm_jobs'].append({
+                        **job,
+                        'is_tracked': job['job_id'] in debug_info['service_mapping']
+                    })
             
             # Get comprehensive service list
             debug_info['all_services'] = self.servers.list_all_services()
@@ -307,15 +341,20 @@ class BenchmarkOrchestrator:
             self.logger.error(f"Error getting debug info: {e}")
             return {'error': str(e)}
     
+    @staticmethod
+    def _with_status_defaults(status: dict) -> dict:
+        """Fill in the status and job_id keys that error results lack"""
+        return {'status': 'unknown', 'job_id': 'N/A', **status}
+    
     def show_servers_status(self) -> dict:
         """Query all server statuses"""
         # First cleanup any completed services
         self.servers.cleanup_completed_services()
         
-        servers_status = {}
-        
-        for service_id in self.servers.list_running_services():
-            servers_status[service_id] = self.servers.check_service_status(service_id)
+        # One squeue for every service still missing a fresh status
+        statuses = self.servers.bulk_status(self.servers.list_running_services())
+        servers_status = {service_id: self._with_status_defaults(status)
+                          for service_id, status in statuses.items()}
         
         return {
             'total_services': len(servers_status),
@@ -329,24 +368,7 @@ class BenchmarkOrchestrator:
         
         try:
             # Get running/pending jobs from squeue
-            exit_code, stdout, stderr = self.ssh_client.execute_command(
-                "squeue -u $USER --format='%i,%j,%T,%M,%N,%P' --noheader"
-            )
-            
-            jobs = []
-            if exit_code == 0 and stdout.strip():
-                for line in stdout.strip().split('\n'):
-                    if line.strip():
-                        fields = line.split(',')
-                        if len(fields) >= 6:
-                            jobs.append({
-                                'job_id': fields[0].strip(),
-                                'name': fields[1].strip(),
-                                'state': fields[2].strip(),
-                                'time': fields[3].strip(),
-                                'nodes': fields[4].strip(),
-                                'partition': fields[5].strip()
-                            })
+            jobs = self.ssh_client.list_user_jobs()
             
             # Categorize jobs by name patterns
             services = []
@@ -354,10 +376,10 @@ class BenchmarkOrchestrator:
             other = []
             
             for job in jobs:
-                name = job['name'].lower()
-                if any(kw in name for kw in ['service', 'ollama', 'server', 'redis', 'mysql', 'postgres', 'chroma']):
+                name = job['name']
+                if SERVICE_JOB_RE.search(name):
                     services.append(job)
-                elif any(kw in name for kw in ['client', 'benchmark', 'workload']):
+                elif CLIENT_JOB_RE.search(name):
                     clients.append(job)
                 else:
                     other.append(job)
@@ -379,10 +401,10 @@ class BenchmarkOrchestrator:
         # First cleanup any completed clients
         self.clients.cleanup_completed_clients()
         
-        clients_status = {}
-        
-        for client_id in self.clients.list_running_clients():
-            clients_status[client_id] = self.clients.check_client_status(client_id)
+        # One squeue for every client still missing a fresh status
+        statuses = self.clients.bulk_status(self.clients.list_running_clients())
+        clients_status = {client_id: self._with_status_defaults(status)
+                          for client_id, status in statuses.items()}
         
         return {
             'total_clients': len(clients_status),
@@ -393,10 +415,7 @@ class BenchmarkOrchestrator:
         """Query active monitoring instances"""
         self.monitors.cleanup_completed_monitors()
         
-        monitors_status = {}
-        
-        for monitor_id in self.monitors.list_running_monitors():
-            monitors_status[monitor_id] = self.monitors.check_monitor_status(monitor_id)
+        monitors_status = self.monitors.bulk_status(self.monitors.list_running_monitors())
         
         return {
             'total_monitors': len(monitors_status),
@@ -419,13 +438,17 @@ class BenchmarkOrchestrator:
             'active_sessions': len(self._active_sessions),
             'services': self.show_servers_status(),
             'clients': self.show_clients_status(),
-            'sessions': {sid: {'status': info['status'], 'services': len(info['services']), 
-                              'clients': len(info['clients'])} 
+            'sessions': {sid: {'status': info.status, 'services': len(info.services), 
+                              'clients': len(info.clients)} 
                         for sid, info in self._active_sessions.items()}
         }
     
     def generate_report(self, session_id: str, output_path: str):
-        """Consolidate metrics, logs, and status into a final report (placeholder)"""
+        """Consolidate metrics, logs, and status into a final report (placeholder)
+        
+        The report is written as JSON when output_path ends in .json and as
+        YAML otherwise.
+        """
         
         if session_id not in self._active_sessions:
             raise ValueError(f"Session {session_id} not found")
@@ -435,26 +458,34 @@ class BenchmarkOrchestrator:
         # Create basic report
         report = {
             'session_id': session_id,
-            'status': session_info['status'],
-            'started_at': session_info['started_at'],
+            'status': session_info.status,
+            'started_at': session_info.started_at,
             'services': [],
             'clients': [],
             'summary': {}
         }
         
         # Add service information
-        for service_id in session_info['services']:
+        for service_id in session_info.services:
             service_status = self.servers.check_service_status(service_id)
             report['services'].append(service_status)
         
         # Add client information
-        for client_id in session_info['clients']:
+        for client_id in session_info.clients:
             client_status = self.clients.check_client_status(client_id)
             report['clients'].append(client_status)
         
         # Save report
-        with open(output_path, 'w') as f:
-            yaml.dump(report, f, default_flow_style=False)
+        if Path(output_path).suffix.lower() == '.json':
+            if orjson is not None:
+                with open(output_path, 'wb') as f:
+                    f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+            else:
+                with open(output_path, 'w') as f:
+                    json.dump(report, f, indent=2)
+        else:
+            with open(output_path, 'w') as f:
+                yaml.dump(report, f, Dumper=_YamlDumper, default_flow_style=False)
         
         self.logger.info(f"Report generated: {output_path}")
     
@@ -465,12 +496,16 @@ class BenchmarkOrchestrator:
         
         self.servers._running_instances.clear()
         self.clients._running_instances.clear()
+        self.servers.clear_host_cache()
+        if self.ssh_client:
+            self.ssh_client.clear_job_cache()
         
         self.logger.info(f"Cleared {cleared_services} services and {cleared_clients} clients from tracking")
         return cleared_services, cleared_clients
     
     def cleanup(self):
         """Cleanup resources"""
+        self.monitors.close()
         if self.ssh_client:
             self.ssh_client.disconnect()
     
@@ -491,8 +526,8 @@ class BenchmarkOrchestrator:
             self.logger.error("SSH client not available")
             return False
         
-        # Get the service host
-        service_host = self.servers.get_service_host(service_id)
+        # Get the service host, preferring the one resolved when its session started
+        service_host = self._session_service_host(service_id) or self.servers.get_service_host(service_id)
         
         if not service_host:
             self.logger.error(f"Could not resolve host for service {service_id}")
@@ -505,6 +540,14 @@ class BenchmarkOrchestrator:
             local_port=local_port
         )
     
+    def _session_service_host(self, service_id: str) -> Optional[str]:
+        """Host recorded for a service by a running session, if any"""
+        for session_info in self._active_sessions.values():
+            host = session_info.service_hosts.get(service_id)
+            if host:
+                return host
+        return None
+    
     def list_ssh_tunnels(self) -> list:
         """List all active SSH tunnels"""
         if not self.ssh_client:
@@ -551,15 +594,9 @@ class BenchmarkOrchestrator:
                 self.logger.warning("No result files found matching pattern")
                 return {'downloaded': 0, 'files': [], 'message': 'No files found'}
             
-            remote_files = stdout.strip().split('\n')
-            downloaded = []
-            failed = []
+            remote_files = [f.strip() for f in stdout.strip().split('\n') if f.strip()]
             
-            for remote_file in remote_files:
-                remote_file = remote_file.strip()
-                if not remote_file:
-                    continue
-                    
+            def download(remote_file):
                 # Get just the filename
                 filename = remote_file.split('/')[-1]
                 local_file = local_path / filename
@@ -567,11 +604,17 @@ class BenchmarkOrchestrator:
                 self.logger.info(f"Downloading {remote_file} -> {local_file}")
                 
                 if self.ssh_client.download_file(remote_file, str(local_file)):
-                    downloaded.append(str(local_file))
                     self.logger.info(f"✓ Downloaded {filename}")
-                else:
-                    failed.append(remote_file)
-                    self.logger.error(f"✗ Failed to download {filename}")
+                    return True, str(local_file)
+                self.logger.error(f"✗ Failed to download {filename}")
+                return False, remote_file
+            
+            # Each transfer uses its own channel on the shared SSH connection
+            with ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(remote_files) or 1)) as executor:
+                outcomes = list(executor.map(download, remote_files))
+            
+            downloaded = [path for ok, path in outcomes if ok]
+            failed = [path for ok, path in outcomes if not ok]
             
             return {
                 'downloaded': len(downloaded),
@@ -3,19 +3,37 @@ Servers Module - Manages deployment and lifecycle of services
 """
 
 import logging
-import yaml
-from typing import Dict, List, Optional, Any
+import re
+import socket
+import time
+from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 
 from base import BaseModule, JobInfo, ServiceStatus
 from services import JobFactory, Service
 
+# squeue states (long and compact forms) of jobs that already hold their nodes
+SLURM_RUNNING_STATES = frozenset({'RUNNING', 'R', 'COMPLETING', 'CG', 'CONFIGURING', 'CF'})
+
+# Job name keywords of untracked SLURM jobs listed as services
+SERVICE_JOB_NAME_RE = re.compile(
+    'service|ollama|server|postgres|chroma|prometheus|redis|mysql|grafana', re.IGNORECASE)
+
 class ServersModule(BaseModule):
     """Manages server services on HPC cluster"""
     
+    # Seconds a resolved service host is reused before SLURM is asked again
+    HOST_CACHE_TTL = 15
+    # Seconds between the queue snapshots squeue streams while watching for a host
+    WATCH_INTERVAL = 2
+    
     def __init__(self, config: Dict[str, Any], ssh_client=None):
         super().__init__(config, ssh_client)
         self.services_dir = Path(config.get('services_dir', 'recipes/services'))
+        # Resolved service hosts with the monotonic time they expire at.
+        # Only successful lookups are stored so callers polling for node
+        # assignment still reach SLURM until a host is available.
+        self._host_cache: Dict[str, Tuple[str, float]] = {}
     
     def list_available_services(self) -> List[str]:
         """Return a list of all available service types from factory"""
@@ -25,16 +43,10 @@ class ServersModule(BaseModule):
         """Return a list of all currently running service IDs"""
         # First update statuses from SLURM to get accurate state
         if self.ssh_client:
-            for service_id in list(self._running_instances.keys()):
-                try:
-                    # Update status for each service
-                    self.check_service_status(service_id)
-                except Exception as e:
-                    self.logger.error(f"Error updating status for service {service_id}: {e}")
+            self._refresh_statuses(self.check_service_status)
         
         # Return services that are active (pending or running)
-        return [sid for sid, job_info in self._running_instances.items() 
-                if job_info.status in [ServiceStatus.PENDING, ServiceStatus.RUNNING]]
+        return self._running_instances.active_ids()
     
     def list_all_services(self) -> dict:
         """Return comprehensive list of all services (tracked + SLURM-only)"""
@@ -44,7 +56,8 @@ class ServersModule(BaseModule):
             'all_services': []
         }
         
-        # Get tracked services
+        # Get tracked services, indexed by job ID for the join with squeue below
+        tracked_by_job_id = {}
         for service_id, job_info in self._running_instances.items():
             service_info = {
                 'service_id': service_id,
@@ -55,62 +68,56 @@ class ServersModule(BaseModule):
             }
             result['tracked_services'].append(service_info)
             result['all_services'].append(service_info)
+            tracked_by_job_id[job_info.job_id] = service_info
         
         # Get SLURM services
         if self.ssh_client:
             try:
                 # Get job info including node assignment
-                cmd = "squeue -u $USER --format='%i,%j,%T,%N' --noheader"
-                exit_code, stdout, stderr = self.ssh_client.execute_command(cmd)
-                
-                if exit_code == 0 and stdout.strip():
-                    for line in stdout.strip().split('\n'):
-                        if line.strip():
-                            fields = line.split(',')
-                            if len(fields) >= 3:
-                                job_id = fields[0].strip()
-                                job_name = fields[1].strip()
-                                job_state = fields[2].strip()
-                                nodes = fields[3].strip() if len(fields) >= 4 else None
-                                
-                                # Normalize state: if nodes are assigned and state is not explicitly PENDING, treat as RUNNING
-                                if nodes and nodes != '(null)' and nodes != '':
-                                    # Job has nodes assigned - normalize various running states to RUNNING
-                                    if job_state.upper() in ['RUNNING', 'R', 'COMPLETING', 'CG', 'CONFIGURING', 'CF']:
-                                        job_state = 'RUNNING'
-                                
-                                # print('DEBUG', job_id, job_name, job_state, nodes)
-                                
-                                # Check if this is a service-related job
-                                if any(keyword in job_name.lower() for keyword in ['service', 'ollama', 'server', 'postgres', 'chroma', 'prometheus', 'redis', 'mysql', 'grafana']):
-                                    # Check if already tracked
-                                    tracked_service = None
-                                    for info in result['tracked_services']:
-                                        if info['job_id'] == job_id:
-                                            tracked_service = info
-                                            break
-                                    # print('DEBUG is_tracked:', tracked_service)
-                                    
-                                    if tracked_service:
-                                        # Update the status of the tracked service with current SLURM state
-                                        tracked_service['status'] = job_state
-                                        tracked_service['job_name'] = job_name
-                                        if nodes:
-                                            tracked_service['nodes'] = nodes
-                                        # Also update in all_services list (same object reference)
-                                    else:
-                                        # Not tracked - add as SLURM-only service
-                                        service_info = {
-                                            'service_id': job_name,
-                                            'job_id': job_id,
-                                            'job_name': job_name,
-                                            'status': job_state,
-                                            'type': 'slurm_only',
-                                            'nodes': nodes
-                                        }
-                                        result['slurm_services'].append(service_info)
-                                        result['all_services'].append(service_info)
-                                    # print(result)
+                for job in self.ssh_client.list_user_jobs():
+                    job_id = job['job_id']
+                    job_name = job['name']
+                    job_state = job['state']
+                    nodes = job['nodes']
+                    
+                    # Normalize state: if nodes are assigned and state is not explicitly PENDING, treat as RUNNING
+                    if nodes and nodes != '(null)' and nodes != '':
+                        # Job has nodes assigned - normalize various running states to RUNNING
+                        if job_state.upper() in SLURM_RUNNING_STATES:
+                            job_state = 'RUNNING'
+                    
+                    # print('DEBUG', job_id, job_name, job_state, nodes)
+                    
+                    # Check if this is a service-related job
+                    if SERVICE_JOB_NAME_RE.search(job_name):
+                        # Check if already tracked
+                        tracked_service = tracked_by_job_id.get(job_id)
+                        
+                        if tracked_service:
+                            # Update the status of the tracked service with current SLURM state
+                            tracked_service['status'] = job_state
+                            tracked_service['job_name'] = job_name
+                            if nodes:
+                                tracked_service['nodes'] = nodes
+                            # Also update in all_services list (same object reference)
+                            service_info = tracked_service
+                        else:
+                            # Not tracked - add as SLURM-only service
+                            service_info = {
+                                'service_id': job_name,
+                                'job_id': job_id,
+                                'job_name': job_name,
+                                'status': job_state,
+                                'type': 'slurm_only',
+                                'nodes': nodes
+                            }
+                            result['slurm_services'].append(service_info)
+                            result['all_services'].append(service_info)
+                        
+                        # Remember the node so get_service_host needs no extra squeue
+                        if nodes and nodes != '(null)':
+                            self._cache_host(service_info['service_id'], nodes)
+                        # print(result)
             except Exception as e:
                 self.logger.error(f"Error getting SLURM services: {e}")
         
@@ -120,7 +127,7 @@ class ServersModule(BaseModule):
         """Launch a service defined in the recipe on one or multiple nodes"""
         
         service_id = self.generate_id()
-        self.logger.info(f"Starting service {service_id} with recipe: {recipe}")
+        self.logger.info("Starting service %s with recipe: %r", service_id, recipe)
         
         try:
             # Create service using new factory pattern
@@ -161,7 +168,7 @@ class ServersModule(BaseModule):
             script_content = service.generate_slurm_script(service_id)
 
             # DEBUG: Log the generated script content
-            self.logger.debug(f"Generated SLURM script for service {service_id}:\n{script_content}")
+            self.logger.debug("Generated SLURM script for service %s:\n%s", service_id, script_content)
             
             # Submit job via SSH
             if self.ssh_client:
@@ -200,6 +207,9 @@ class ServersModule(BaseModule):
     def stop_service(self, service_id: str) -> bool:
         """Stop a running service by ID, Job ID, or Job Name"""
         
+        # The reference may be a partial ID, so drop every cached host
+        self.clear_host_cache()
+        
         # First try direct service ID lookup
         if service_id in self._running_instances:
             return self._stop_service_by_service_id(service_id)
@@ -207,8 +217,113 @@ class ServersModule(BaseModule):
         # If not found, try to find by job ID or job name
         return self._stop_service_by_slurm_reference(service_id)
     
+    def cancel_jobs(self, job_ids: List[str]) -> List[str]:
+        """Cancel the SLURM jobs of several services, dropping every cached host first"""
+        self.clear_host_cache()
+        return super().cancel_jobs(job_ids)
+    
+    def clear_host_cache(self):
+        """Forget all cached service hosts"""
+        self._host_cache.clear()
+    
+    def _cache_host(self, service_id: str, host: str):
+        """Remember a resolved service host for HOST_CACHE_TTL seconds"""
+        self._host_cache[service_id] = (host, time.monotonic() + self.HOST_CACHE_TTL)
+    
     def get_service_host(self, service_id: str) -> Optional[str]:
-        """Get the host/node where a service is running"""
+        """Get the host/node where a service is running (cached for HOST_CACHE_TTL seconds)"""
+        cached = self._host_cache.get(service_id)
+        if cached:
+            host, expires_at = cached
+            if time.monotonic() < expires_at:
+                self.logger.debug(f"Using cached host for service {service_id}: {host}")
+                return host
+            del self._host_cache[service_id]
+        
+        host = self._resolve_service_host(service_id)
+        if host:
+            self._cache_host(service_id, host)
+        return host
+    
+    def get_service_type(self, service_id: str) -> Optional[str]:
+        """Return the service type from a '<type>_<id>' SLURM job name, or None"""
+        service_type, separator, _ = service_id.rpartition('_')
+        return service_type.lower() if separator else None
+    
+    def wait_for_service_host(self, service_id: str, timeout: float = 30.0) -> Optional[str]:
+        """Wait up to timeout seconds for the host of a service to be assigned
+        
+        The queue is watched through a single streaming squeue; if that cannot
+        be started, SLURM is polled with exponential backoff instead.
+        """
+        deadline = time.monotonic() + timeout
+        host = self.get_service_host(service_id)
+        if host or not self.ssh_client:
+            return host
+        
+        try:
+            return self.watch_service_host(service_id, deadline - time.monotonic())
+        except Exception as e:
+            self.logger.warning(f"Cannot watch the queue for service {service_id}, polling instead: {e}")
+        
+        delay = 0.25
+        while True:
+            host = self.get_service_host(service_id)
+            if host:
+                return host
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            
+            self.logger.info(f"🔄 Service host not yet available, retrying in {min(delay, remaining):.1f}s...")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 1.7, 4.0)
+    
+    def watch_service_host(self, service_id: str, timeout: float = 30.0) -> Optional[str]:
+        """Follow 'squeue -i' on one SSH channel until the service is assigned a node"""
+        job_info = self._running_instances.get(service_id)
+        job_id = job_info.job_id if job_info else None
+        deadline = time.monotonic() + timeout
+        
+        stdout, _ = self.ssh_client.stream_command(
+            f"squeue -u $USER -i {self.WATCH_INTERVAL} --format='%i,%j,%N' --noheader"
+        )
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                stdout.channel.settimeout(remaining)
+                try:
+                    line = stdout.readline()
+                except socket.timeout:
+                    return None
+                if not line:
+                    # squeue exited, e.g. because SLURM rejected the request
+                    return None
+                
+                fields = [field.strip() for field in line.split(',', 2)]
+                if len(fields) < 3:
+                    continue
+                if job_id:
+                    if fields[0] != job_id:
+                        continue
+                elif service_id not in fields[1]:
+                    continue
+                
+                nodes = fields[2]
+                if nodes and nodes != '(null)':
+                    self.logger.info(f"Found service {service_id} in SLURM: job {fields[0]} on {nodes}")
+                    if job_info:
+                        job_info.nodes = [nodes]
+                    self._cache_host(service_id, nodes)
+                    return nodes
+        finally:
+            stdout.channel.close()
+    
+    def _resolve_service_host(self, service_id: str) -> Optional[str]:
+        """Look up the host/node of a service from tracking data or SLURM"""
         self.logger.debug(f"Getting host for service: {service_id}")
         self.logger.debug(f"Running instances: {list(self._running_instances.keys())}")
         
@@ -262,7 +377,7 @@ class ServersModule(BaseModule):
                 self.logger.debug(f"Running SLURM command: {cmd}")
                 exit_code, stdout, stderr = self.ssh_client.execute_command(cmd)
                 result = stdout if exit_code == 0 else None
-                self.logger.debug(f"SLURM result: '{result}'")
+                self.logger.debug("SLURM result: '%s'", result)
                 
                 if result and result.strip():
                     node = result.strip()
@@ -285,18 +400,14 @@ class ServersModule(BaseModule):
         
         try:
             if self.ssh_client and job_info.job_id:
-                success = self.ssh_client.cancel_job(job_info.job_id)
-                if success:
-                    job_info.status = ServiceStatus.CANCELLED
-                    job_info.completed_at = self.get_current_time()
-                    self.logger.info(f"Service {service_id} stopped")
+                if self.cancel_jobs([job_info.job_id]):
                     return True
                 else:
                     self.logger.error(f"Failed to cancel job {job_info.job_id}")
                     return False
             else:
                 # Local mode - just mark as stopped
-                job_info.status = ServiceStatus.CANCELLED
+                self._set_status(service_id, job_info, ServiceStatus.CANCELLED)
                 job_info.completed_at = self.get_current_time()
                 self.logger.info(f"Service {service_id} marked as stopped (local mode)")
                 return True
@@ -343,16 +454,9 @@ class ServersModule(BaseModule):
             
             if job_id:
                 # Cancel the job
-                success = self.ssh_client.cancel_job(job_id)
-                if success:
+                # cancel_jobs also updates internal tracking of the service
+                if self.cancel_jobs([job_id]):
                     self.logger.info(f"Successfully cancelled SLURM job {job_id}")
-                    
-                    # Update internal tracking if we found the service
-                    if service_id and service_id in self._running_instances:
-                        job_info = self._running_instances[service_id]
-                        job_info.status = ServiceStatus.CANCELLED
-                        job_info.completed_at = self.get_current_time()
-                    
                     return True
                 else:
                     self.logger.error(f"Failed to cancel SLURM job {job_id}")
@@ -371,18 +475,11 @@ class ServersModule(BaseModule):
             if not self.ssh_client:
                 return None
             
-            # Use squeue to find jobs by name pattern
-            cmd = f"squeue -u $USER --format='%i,%j,%T' --noheader | grep -i '{pattern}' | head -1"
-            exit_code, stdout, stderr = self.ssh_client.execute_command(cmd)
-            
-            if exit_code == 0 and stdout.strip():
-                fields = stdout.strip().split(',')
-                if len(fields) >= 3:
-                    return {
-                        'job_id': fields[0].strip(),
-                        'name': fields[1].strip(),
-                        'state': fields[2].strip()
-                    }
+            # Search the shared squeue listing instead of running another squeue
+            pattern = pattern.lower()
+            for job in self.ssh_client.list_user_jobs():
+                if pattern in f"{job['job_id']},{job['name']},{job['state']}".lower():
+                    return {'job_id': job['job_id'], 'name': job['name'], 'state': job['state']}
             return None
             
         except Exception as e:
@@ -395,72 +492,10 @@ class ServersModule(BaseModule):
         if service_id not in self._running_instances:
             return {"error": f"Service {service_id} not found"}
         
-        job_info = self._running_instances[service_id]
-        
-        # Update status from SLURM if connected
-        if self.ssh_client and job_info.job_id:
-            try:
-                slurm_status = self.ssh_client.get_job_status(job_info.job_id)
-                if slurm_status:
-                    # Map SLURM states to our status enum
-                    state_mapping = {
-                        'PENDING': ServiceStatus.PENDING,
-                        'RUNNING': ServiceStatus.RUNNING,
-                        'COMPLETED': ServiceStatus.COMPLETED,
-                        'FAILED': ServiceStatus.FAILED,
-                        'CANCELLED': ServiceStatus.CANCELLED,
-                        'TIMEOUT': ServiceStatus.FAILED
-                    }
-                    
-                    slurm_state = slurm_status.get('state', 'UNKNOWN')
-                    if slurm_state in state_mapping:
-                        job_info.status = state_mapping[slurm_state]
-                        
-                        # Update timing info
-                        if job_info.status == ServiceStatus.RUNNING and not job_info.started_at:
-                            job_info.started_at = self.get_current_time()
-                        elif job_info.status in [ServiceStatus.COMPLETED, ServiceStatus.FAILED, ServiceStatus.CANCELLED]:
-                            if not job_info.completed_at:
-                                job_info.completed_at = self.get_current_time()
-                    
-                    return {
-                        "service_id": service_id,
-                        "status": job_info.status.value,
-                        "job_id": job_info.job_id,
-                        "slurm_state": slurm_state,
-                        "nodes": slurm_status.get('nodes'),
-                        "submitted_at": job_info.submitted_at,
-                        "started_at": job_info.started_at,
-                        "completed_at": job_info.completed_at
-                    }
-                else:
-                    # Job not found in SLURM - might have completed very quickly
-                    # Only mark as completed if it was previously pending/running
-                    if job_info.status in [ServiceStatus.PENDING, ServiceStatus.RUNNING]:
-                        self.logger.warning(f"Job {job_info.job_id} not found in SLURM, marking as completed")
-                        job_info.status = ServiceStatus.COMPLETED
-                        if not job_info.completed_at:
-                            job_info.completed_at = self.get_current_time()
-            except Exception as e:
-                self.logger.error(f"Error checking status for service {service_id}: {e}")
-        
-        # Return basic status
-        return {
-            "service_id": service_id,
-            "status": job_info.status.value,
-            "job_id": job_info.job_id,
-            "submitted_at": job_info.submitted_at,
-            "started_at": job_info.started_at,
-            "completed_at": job_info.completed_at
-        }
+        return self._refresh_job(service_id, self._running_instances[service_id])
     
     def cleanup_completed_services(self):
         """Remove completed/failed services from tracking"""
-        completed_services = []
-        for service_id, job_info in self._running_instances.items():
-            if job_info.status in [ServiceStatus.COMPLETED, ServiceStatus.FAILED, ServiceStatus.CANCELLED]:
-                completed_services.append(service_id)
-        
-        for service_id in completed_services:
+        for service_id in self._running_instances.finished_ids():
             self.logger.info(f"Cleaning up completed service {service_id}")
             del self._running_instances[service_id]
\ No newline at end of file
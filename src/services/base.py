@@ -37,6 +37,9 @@ import abc
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 
+# SBATCH options written only when the job sets them
+OPTIONAL_SBATCH_OPTIONS = frozenset({'gres', 'mem', 'cpus-per-task'})
+
 @dataclass
 class Job(abc.ABC):
     """
@@ -128,28 +131,25 @@ class Job(abc.ABC):
         # Merge with job-specific resources
         final_slurm_config = {**default_slurm_config, **self.resources}
         
-        # Generate basic SLURM directives
-        script_lines = [
-            "#!/bin/bash -l",
-            f"#SBATCH --job-name={self.name}_{job_id}",
-            f"#SBATCH --time={final_slurm_config['time']}",
-            f"#SBATCH --qos={final_slurm_config['qos']}",
-            f"#SBATCH --partition={final_slurm_config['partition']}",
-            f"#SBATCH --account={final_slurm_config['account']}",
-            f"#SBATCH --nodes={final_slurm_config['nodes']}",
-            f"#SBATCH --ntasks={final_slurm_config['ntasks']}",
-            f"#SBATCH --ntasks-per-node={final_slurm_config['ntasks_per_node']}",
-        ]
-        
-        # Add optional SLURM directives
-        if final_slurm_config.get('gres'):
-            script_lines.insert(-2, f"#SBATCH --gres={final_slurm_config['gres']}")
-        
-        if final_slurm_config.get('mem'):
-            script_lines.insert(-2, f"#SBATCH --mem={final_slurm_config['mem']}")
+        # SLURM directives in script order; optional ones are left out when unset
+        sbatch_options = {
+            'job-name': f"{self.name}_{job_id}",
+            'time': final_slurm_config['time'],
+            'qos': final_slurm_config['qos'],
+            'partition': final_slurm_config['partition'],
+            'account': final_slurm_config['account'],
+            'nodes': final_slurm_config['nodes'],
+            'gres': final_slurm_config.get('gres'),
+            'mem': final_slurm_config.get('mem'),
+            'cpus-per-task': final_slurm_config.get('cpus_per_task'),
+            'ntasks': final_slurm_config['ntasks'],
+            'ntasks-per-node': final_slurm_config['ntasks_per_node'],
+        }
         
-        if final_slurm_config.get('cpus_per_task'):
-            script_lines.insert(-2, f"#SBATCH --cpus-per-task={final_slurm_config['cpus_per_task']}")
+        script_lines = ["#!/bin/bash -l"]
+        script_lines.extend(f"#SBATCH --{option}={value}"
+                            for option, value in sbatch_options.items()
+                            if value or option not in OPTIONAL_SBATCH_OPTIONS)
 
         # Load Apptainer
         script_lines.extend([
@@ -251,15 +251,13 @@ class Job(abc.ABC):
         """Generate container build commands for this job"""
         commands = []
         
-        container_base_path = self.config.get('containers', {}).get('base_path', '')
-        if container_base_path and not self.container_image.startswith('/'):
-            container_path = f"{container_base_path}/{self.container_image}"
-        else:
-            container_path = self.container_image
+        containers_config = self._containers_config
+        container_base_path = containers_config.get('base_path', '')
+        container_path = self._base_container_path()
         
         # Get docker source - subclasses can override this logic
         docker_source = self._get_docker_source()
-        force_rebuild = self.config.get('containers', {}).get('force_rebuild', False)
+        force_rebuild = containers_config.get('force_rebuild', False)
         
         if docker_source:
             commands.append("# Container management")
@@ -301,8 +299,19 @@ class Job(abc.ABC):
     
     def _get_docker_source(self) -> Optional[str]:
         """Get docker source for this job type - can be overridden by subclasses"""
-        docker_sources = self.config.get('containers', {}).get('docker_sources', {})
-        return docker_sources.get(self.name)
+        return self._containers_config.get('docker_sources', {}).get(self.name)
+    
+    @property
+    def _containers_config(self) -> Dict[str, Any]:
+        """The 'containers' section of the global configuration"""
+        return self.config.get('containers') or {}
+    
+    def _base_container_path(self) -> str:
+        """container_image under containers.base_path, unless the image path is absolute"""
+        container_base_path = self._containers_config.get('base_path', '')
+        if container_base_path and not self.container_image.startswith('/'):
+            return f"{container_base_path}/{self.container_image}"
+        return self.container_image
 
 
 @dataclass  
@@ -369,12 +378,7 @@ class Service(Job):
             cmd_parts.append(f"--env {key}={value}")
         
         # Add container image with base path
-        container_base_path = self.config.get('containers', {}).get('base_path', '')
-        if container_base_path and not self.container_image.startswith('/'):
-            container_path = f"{container_base_path}/{self.container_image}"
-        else:
-            container_path = self.container_image
-        cmd_parts.append(container_path)
+        cmd_parts.append(self._base_container_path())
         
         # Add command and args
         if self.command:
@@ -470,8 +474,7 @@ class Service(Job):
             return self.container['docker_source']
         
         # Fallback to global config for backward compatibility
-        docker_sources = self.config.get('containers', {}).get('docker_sources', {})
-        return docker_sources.get(self.name)
+        return super()._get_docker_source()
     
     def get_container_command(self) -> str:
         """Default container command for services - enhanced with local container paths"""
@@ -507,11 +510,7 @@ class Service(Job):
             return self.container['image_path']
         
         # Fallback to global config logic for backward compatibility
-        container_base_path = self.config.get('containers', {}).get('base_path', '')
-        if container_base_path and not self.container_image.startswith('/'):
-            return f"{container_base_path}/{self.container_image}"
-        else:
-            return self.container_image
+        return self._base_container_path()
     
     def _generate_container_build_commands(self) -> List[str]:
         """Generate container build commands using simplified logic"""
@@ -110,12 +110,7 @@ class MySQLService(Service):
             cmd_parts.append(f"--env {key}={value}")
         
         # Add container image with base path
-        container_base_path = self.config.get('containers', {}).get('base_path', '')
-        if container_base_path and not self.container_image.startswith('/'):
-            container_path = f"{container_base_path}/{self.container_image}"
-        else:
-            container_path = self.container_image
-        cmd_parts.append(container_path)
+        cmd_parts.append(self._base_container_path())
         
         # Add command and args
         if self.command:
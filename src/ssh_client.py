@@ -2,18 +2,33 @@
 SSH Client for remote HPC operations
 """
 
+import csv
 import paramiko
 import scp
 import logging
 import os
+import re
 import time
 import tempfile
 import threading
-from typing import Optional, Tuple, Dict, Any, List
+from typing import Optional, Tuple, Dict, Any, Iterator, List
 from pathlib import Path
 import subprocess
 import shlex
 
+# Seconds between keepalive packets on an idle connection
+KEEPALIVE_INTERVAL = 30
+
+# Channels opened at once on the shared connection; sshd refuses channels
+# beyond its MaxSessions (10 by default), so thread pools queue here instead
+MAX_SESSION_CHANNELS = 8
+
+# Seconds a listing of the user's queued jobs is reused before squeue runs again
+JOB_LIST_CACHE_TTL = 5
+
+# Job IDs named in scancel error lines, e.g. "Kill job error on job id 1234: ..."
+SCANCEL_JOB_ID_RE = re.compile(r"\bjob id ([\w.]+)", re.IGNORECASE)
+
 class SSHClient:
     """SSH client for remote HPC operations"""
     
@@ -31,6 +46,20 @@ class SSHClient:
         # Track active SSH tunnels
         self._tunnels: Dict[str, Dict[str, Any]] = {}
         self._tunnel_lock = threading.Lock()
+        
+        # Last squeue listing of the user's jobs and its monotonic expiry time
+        self._job_list: Optional[List[Dict[str, str]]] = None
+        self._job_list_expires = 0.0
+        self._job_list_lock = threading.Lock()
+        
+        # Serializes reconnects so concurrent workers replace a dead connection once
+        self._reconnect_lock = threading.Lock()
+        
+        # Limits commands and transfers running at once to MAX_SESSION_CHANNELS
+        self._channel_slots = threading.BoundedSemaphore(MAX_SESSION_CHANNELS)
+        
+        # Whether slurmctld serves 'squeue --only-job-state' from its job state cache
+        self._job_state_cache: Optional[bool] = None
     
     def connect(self) -> bool:
         """Establish SSH connection"""
@@ -53,6 +82,10 @@ class SSHClient:
                     port=self.port
                 )
             
+            # Keep the single shared connection alive between the channels
+            # opened by long-running polls and concurrent status queries
+            self.client.get_transport().set_keepalive(KEEPALIVE_INTERVAL)
+            
             self.logger.info(f"Connected to {self.hostname}")
             return True
             
@@ -69,16 +102,49 @@ class SSHClient:
             self.client.close()
             self.logger.info(f"Disconnected from {self.hostname}")
     
-    def execute_command(self, command: str) -> Tuple[int, str, str]:
-        """Execute command on remote host"""
+    def _ensure_connected(self):
+        """Reconnect if the shared connection has dropped since it was opened
+        
+        Every command runs on its own channel of the one SSH transport, so a
+        long interactive session only pays for a new handshake when the
+        transport itself has died.
+        """
         if not self.client:
             raise ConnectionError("Not connected to remote host")
         
+        if self._transport_active():
+            return
+        
+        with self._reconnect_lock:
+            # Another worker may have reconnected while this one waited
+            if self._transport_active():
+                return
+            
+            self.logger.warning(f"Connection to {self.hostname} lost, reconnecting")
+            # Tunnels forward over the dead transport and cannot be reused
+            self.close_all_tunnels()
+            self.client.close()
+            if not self.connect():
+                raise ConnectionError(f"Lost connection to {self.hostname}")
+    
+    def _transport_active(self) -> bool:
+        """Whether the shared SSH transport is still usable"""
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+    
+    def execute_command(self, command: str, input_data: Optional[str] = None) -> Tuple[int, str, str]:
+        """Execute command on remote host, optionally writing input_data to its stdin"""
+        self._ensure_connected()
+        
         try:
-            stdin, stdout, stderr = self.client.exec_command(command)
-            exit_code = stdout.channel.recv_exit_status()
-            stdout_str = stdout.read().decode('utf-8')
-            stderr_str = stderr.read().decode('utf-8')
+            with self._channel_slots:
+                stdin, stdout, stderr = self.client.exec_command(command)
+                if input_data is not None:
+                    stdin.write(input_data)
+                    stdin.channel.shutdown_write()
+                exit_code = stdout.channel.recv_exit_status()
+                stdout_str = stdout.read().decode('utf-8')
+                stderr_str = stderr.read().decode('utf-8')
             
             self.logger.debug(f"Command: {command}")
             self.logger.debug(f"Exit code: {exit_code}")
@@ -88,7 +154,28 @@ class SSHClient:
         except Exception as e:
             self.logger.error(f"Failed to execute command '{command}': {e}")
             raise
-    
+
+    def stream_command(self, command: str, input_data: Optional[str] = None):
+        """Start command on remote host and return its (stdout, stderr) files unread
+
+        Output can be consumed in chunks as it arrives; call
+        stdout.channel.recv_exit_status() once it has been read to get the exit code.
+        """
+        self._ensure_connected()
+
+        try:
+            stdin, stdout, stderr = self.client.exec_command(command)
+            if input_data is not None:
+                stdin.write(input_data)
+                stdin.channel.shutdown_write()
+
+            self.logger.debug(f"Streaming command: {command}")
+            return stdout, stderr
+
+        except Exception as e:
+            self.logger.error(f"Failed to execute command '{command}': {e}")
+            raise
+
     def upload_file(self, local_path: str, remote_path: str) -> bool:
         """Upload file to remote host"""
         if not self.client:
@@ -104,9 +191,10 @@ class SSHClient:
             file_size = os.path.getsize(local_path)
             self.logger.info(f"Uploading {local_path} ({file_size} bytes) to {remote_path}")
             
-            scp_client = scp.SCPClient(self.client.get_transport())
-            scp_client.put(local_path, remote_path)
-            scp_client.close()
+            with self._channel_slots:
+                scp_client = scp.SCPClient(self.client.get_transport())
+                scp_client.put(local_path, remote_path)
+                scp_client.close()
             
             self.logger.info(f"Successfully uploaded {local_path} to {remote_path}")
             return True
@@ -148,9 +236,10 @@ class SSHClient:
             raise ConnectionError("Not connected to remote host")
         
         try:
-            scp_client = scp.SCPClient(self.client.get_transport())
-            scp_client.get(remote_path, local_path)
-            scp_client.close()
+            with self._channel_slots:
+                scp_client = scp.SCPClient(self.client.get_transport())
+                scp_client.get(remote_path, local_path)
+                scp_client.close()
             
             self.logger.info(f"Downloaded {remote_path} to {local_path}")
             return True
@@ -195,6 +284,7 @@ class SSHClient:
                 for line in stdout.strip().split('\n'):
                     if 'Submitted batch job' in line:
                         job_id = line.split()[-1]
+                        self.clear_job_cache()
                         self.logger.info(f"Submitted SLURM job: {job_id}")
                         return job_id
             else:
@@ -206,6 +296,46 @@ class SSHClient:
             self.logger.error(f"Error submitting SLURM job: {e}")
             return None
     
+    def iter_user_jobs(self) -> Iterator[Dict[str, str]]:
+        """Yield the user's queued SLURM jobs as squeue writes them, without caching"""
+        stdout, stderr = self.stream_command(
+            "squeue -u $USER --format='%i,%j,%T,%M,%N,%P' --noheader"
+        )
+        # csv.reader splits the rows in C as the lines arrive
+        for row in csv.reader(stdout):
+            if len(row) >= 6:
+                job_id, name, state, elapsed, nodes, partition = (field.strip() for field in row[:6])
+                yield {
+                    'job_id': job_id,
+                    'name': name,
+                    'state': state,
+                    'time': elapsed,
+                    'nodes': nodes,
+                    'partition': partition
+                }
+        
+        exit_code = stdout.channel.recv_exit_status()
+        if exit_code != 0:
+            raise RuntimeError(f"squeue failed: {stderr.read().decode('utf-8').strip()}")
+    
+    def list_user_jobs(self) -> List[Dict[str, str]]:
+        """List the user's queued SLURM jobs, reusing a listing younger than JOB_LIST_CACHE_TTL
+
+        The returned dicts are shared between callers and must not be modified.
+        """
+        with self._job_list_lock:
+            if self._job_list is not None and time.monotonic() < self._job_list_expires:
+                return self._job_list
+            
+            self._job_list = list(self.iter_user_jobs())
+            self._job_list_expires = time.monotonic() + JOB_LIST_CACHE_TTL
+            return self._job_list
+    
+    def clear_job_cache(self):
+        """Forget the cached job listing after jobs were submitted or cancelled"""
+        with self._job_list_lock:
+            self._job_list = None
+    
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get SLURM job status"""
         try:
@@ -246,11 +376,86 @@ class SSHClient:
         except Exception as e:
             self.logger.error(f"Error getting job status for {job_id}: {e}")
             return None
+
+    def get_jobs_status(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get SLURM status of several queued jobs with a single squeue call
+
+        Jobs that have left the queue are missing from the result; use
+        get_job_status to look them up in sacct.
+        """
+        if not job_ids:
+            return {}
+
+        try:
+            exit_code, stdout, stderr = self.execute_command(
+                f"squeue -j {','.join(job_ids)} --format='%i,%T,%M,%N' --noheader"
+            )
+
+            statuses = {}
+            if exit_code == 0:
+                for row in csv.reader(stdout.splitlines()):
+                    if len(row) >= 4:
+                        job_id, state, elapsed, nodes = (field.strip() for field in row[:4])
+                        statuses[job_id] = {
+                            'job_id': job_id,
+                            'state': state,
+                            'time': elapsed,
+                            'nodes': nodes
+                        }
+            return statuses
+
+        except Exception as e:
+            self.logger.error(f"Error getting job status for {','.join(job_ids)}: {e}")
+            return {}
+
+    def has_job_state_cache(self) -> bool:
+        """Check once whether the controller runs with SchedulerParameters=enable_job_state_cache"""
+        if self._job_state_cache is None:
+            try:
+                exit_code, stdout, _ = self.execute_command(
+                    "scontrol show config | grep -i enable_job_state_cache"
+                )
+                self._job_state_cache = exit_code == 0 and bool(stdout.strip())
+            except Exception as e:
+                self.logger.debug(f"Could not read the SLURM configuration: {e}")
+                self._job_state_cache = False
+        return self._job_state_cache
+    
+    def get_job_states(self, job_ids: List[str]) -> Dict[str, str]:
+        """Get the SLURM state of several queued jobs, keyed by job ID
+
+        Where the controller has a job state cache this uses
+        'squeue --only-job-state', which cannot filter by user or partition,
+        so the listing covers every job and is filtered here. Jobs that have
+        left the queue are missing from the result.
+        """
+        if not job_ids:
+            return {}
+        
+        wanted = set(job_ids)
+        commands = [f"squeue -j {','.join(job_ids)} --format='%i,%T' --noheader"]
+        if self.has_job_state_cache():
+            commands.insert(0, "squeue --only-job-state --format='%i,%T' --noheader")
+        
+        for command in commands:
+            exit_code, stdout, stderr = self.execute_command(command)
+            if exit_code == 0:
+                states = {}
+                for line in stdout.splitlines():
+                    job_id, _, state = line.partition(',')
+                    job_id = job_id.strip()
+                    if job_id in wanted:
+                        states[job_id] = state.strip()
+                return states
+            self.logger.debug(f"'{command}' failed: {stderr}")
+        
+        raise RuntimeError(f"squeue failed for jobs {', '.join(job_ids)}")
     
     def cancel_job(self, job_id: str) -> bool:
         """Cancel SLURM job"""
         try:
             exit_code, stdout, stderr = self.execute_command(f"scancel {job_id}")
+            self.clear_job_cache()
             if exit_code == 0:
                 self.logger.info(f"Cancelled job {job_id}")
                 return True
@@ -262,6 +467,35 @@ class SSHClient:
             self.logger.error(f"Error cancelling job {job_id}: {e}")
             return False
     
+    def cancel_jobs(self, job_ids: List[str]) -> List[str]:
+        """Cancel several SLURM jobs with a single scancel call and return the IDs that were cancelled
+
+        scancel still cancels the other jobs when some of them fail, and
+        reports each failing job on its own stderr line.
+        """
+        if not job_ids:
+            return []
+        
+        try:
+            exit_code, stdout, stderr = self.execute_command(
+                "scancel " + " ".join(shlex.quote(job_id) for job_id in job_ids)
+            )
+            self.clear_job_cache()
+            if exit_code == 0:
+                self.logger.info(f"Cancelled jobs {', '.join(job_ids)}")
+                return list(job_ids)
+            
+            self.logger.error(f"Failed to cancel some of jobs {', '.join(job_ids)}: {stderr}")
+            failed = set(SCANCEL_JOB_ID_RE.findall(stderr)).intersection(job_ids)
+            if not failed:
+                # The error names no job, so nothing is known to be cancelled
+                return []
+            return [job_id for job_id in job_ids if job_id not in failed]
+                
+        except Exception as e:
+            self.logger.error(f"Error cancelling jobs {', '.join(job_ids)}: {e}")
+            return []
+    
     def create_tunnel(self, remote_host: str, remote_port: int, 
                      local_port: int = None, tunnel_id: str = None) -> Optional[Dict[str, Any]]:
         """
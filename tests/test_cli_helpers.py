@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Tests for the output helpers of the command line interface (main.py).
+
+Usage:
+    python -m pytest tests/test_cli_helpers.py -v
+"""
+
+import pytest
+import io
+import json
+import os
+import sys
+from unittest.mock import Mock, patch
+
+# Add repository root to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import main
+
+
+def parse_events(obj, prefix=''):
+    """Yield ijson-style (prefix, event, value) tuples for a Python object."""
+    if isinstance(obj, dict):
+        yield prefix, 'start_map', None
+        for key, value in obj.items():
+            yield prefix, 'map_key', key
+            yield from parse_events(value, f"{prefix}.{key}" if prefix else key)
+        yield prefix, 'end_map', None
+    elif isinstance(obj, list):
+        yield prefix, 'start_array', None
+        for value in obj:
+            yield from parse_events(value, f"{prefix}.item" if prefix else 'item')
+        yield prefix, 'end_array', None
+    elif obj is None:
+        yield prefix, 'null', None
+    elif isinstance(obj, bool):
+        yield prefix, 'boolean', obj
+    elif isinstance(obj, (int, float)):
+        yield prefix, 'number', obj
+    else:
+        yield prefix, 'string', obj
+
+
+class TestWriteIndentedJson:
+    """Test the streaming JSON pretty-printer."""
+    
+    @pytest.mark.parametrize("document", [
+        {
+            'status': 'success',
+            'data': {
+                'resultType': 'vector',
+                'result': [
+                    {'metric': {'__name__': 'up', 'job': 'ollama-cadvisor'},
+                     'value': [1697040000.123, '1']},
+                    {'metric': {}, 'value': [1697040000.5, '0']}
+                ]
+            }
+        },
+        {'data': [], 'warnings': None, 'ok': True, 'nested': [[1, 2], [], [{}]]},
+        {'label': 'café ✓', 'quote': 'a "b" \\ c'},
+        [],
+        'up',
+    ])
+    def test_matches_json_dumps(self, document):
+        """Output is identical to json.dumps(indent=2)."""
+        out = io.StringIO()
+        main.write_indented_json(parse_events(document), out)
+        assert out.getvalue() == json.dumps(document, indent=2) + '\n'
+
+
+
+class TestWriteLines:
+    """Test the chunked writer used for long listings."""
+    
+    def test_lines_are_joined_into_chunks(self, monkeypatch):
+        """Each write carries up to OUTPUT_CHUNK_LINES lines."""
+        out = Mock()
+        monkeypatch.setattr(main.sys, 'stdout', out)
+        monkeypatch.setattr(main, 'OUTPUT_CHUNK_LINES', 2)
+        
+        main.write_lines(f"line {i}\n" for i in range(5))
+        
+        assert [c.args[0] for c in out.write.call_args_list] == [
+            "line 0\nline 1\n", "line 2\nline 3\n", "line 4\n"
+        ]
+
+
+class TestJsonHelpers:
+    """Test the JSON parse/serialize helpers used by the metric commands."""
+    
+    def test_round_trip(self):
+        """Indented output parses back to the same document."""
+        document = {'status': 'success', 'data': {'result': [{'value': [1.5, '1']}]}}
+        text = main.dumps_indented_json(document)
+        assert '\n  "data"' in text
+        assert main.loads_json(text) == document
+    
+    def test_stdlib_fallback_matches_json_dumps(self, monkeypatch):
+        """Without orjson the shared encoder produces json.dumps(indent=2) output."""
+        monkeypatch.setattr(main, 'orjson', None)
+        document = {'label': 'café', 'values': [1, 2.5, None, True]}
+        assert main.dumps_indented_json(document) == json.dumps(document, indent=2)
+    
+    def test_malformed_input_raises_json_error(self):
+        """Both parsers report malformed input as json.JSONDecodeError."""
+        with pytest.raises(json.JSONDecodeError):
+            main.loads_json('{"status": ')
+
+
+class TestWriteQueryResult:
+    """Test rendering of Prometheus query results."""
+    
+    def test_matrix_is_written_per_series(self, capsys):
+        """Range results print one labelled header and one line per sample."""
+        result = {'status': 'success', 'data': {'resultType': 'matrix', 'result': [
+            {'metric': {'__name__': 'up', 'job': 'redis'}, 'values': [[1700000000, '1'], [1700000015, '0']]},
+        ]}}
+        
+        main.write_query_result(result)
+        
+        assert capsys.readouterr().out == 'up{job="redis"}\n  1700000000 1\n  1700000015 0\n'
+    
+    def test_vector_is_written_as_json(self, capsys):
+        """Other result types keep the indented JSON output."""
+        result = {'status': 'success', 'data': {'resultType': 'vector', 'result': []}}
+        
+        main.write_query_result(result)
+        
+        assert json.loads(capsys.readouterr().out) == result
+
+
+class TestResponseReader:
+    """Test the reader used to stream remote command output."""
+    
+    def test_replays_head_before_source(self):
+        """The peeked chunk is returned before the rest of the stream."""
+        reader = main.ResponseReader(b'{"sta', io.BytesIO(b'tus": 1}'))
+        assert reader.read(3) == b'{"s'
+        assert reader.read(10) == b'ta'
+        assert reader.read(-1) == b'tus": 1}'
+        assert reader.read(10) == b''
+    
+    def test_copies_chunks_to_sink(self):
+        """Every chunk handed out is also written to the sink."""
+        sink = io.BytesIO()
+        reader = main.ResponseReader(b'[1, ', io.BytesIO(b'2]'), sink=sink)
+        while reader.read(2):
+            pass
+        assert sink.getvalue() == b'[1, 2]'
+        assert reader.last_byte == b']'
+
+
+def _parse_whole(reader, use_float):
+    """Stand-in for ijson.parse that validates the stream in small reads."""
+    body = b''
+    while True:
+        chunk = reader.read(4)
+        if not chunk:
+            break
+        body += chunk
+    json.loads(body)
+    yield from ()
+
+
+class TestPrintJsonStream:
+    """Test streamed JSON output to a redirected stdout."""
+    
+    def test_valid_body_is_copied_unchanged(self, capsysbinary):
+        """A valid body is written byte for byte after the header."""
+        with patch.object(main, 'ijson', Mock(parse=_parse_whole)):
+            main.print_json_stream(b'{"status": ', io.BytesIO(b'"success"}'))
+        
+        assert capsysbinary.readouterr().out == b'\nResult:\n{"status": "success"}\n'
+    
+    def test_invalid_body_is_not_echoed(self, capsysbinary):
+        """Nothing reaches stdout when the body turns out to be truncated."""
+        with patch.object(main, 'ijson', Mock(parse=_parse_whole)):
+            with pytest.raises(json.JSONDecodeError):
+                main.print_json_stream(b'{"status": ', io.BytesIO(b'"succ'))
+        
+        assert capsysbinary.readouterr().out == b''
+
+
+
+class TestListingSnapshot:
+    """Test the listings shared between interactive menu actions."""
+    
+    def setup_method(self):
+        """Setup a fake servers module."""
+        self.servers = Mock()
+        self.servers.list_all_services.return_value = {'all_services': []}
+    
+    def test_listing_is_reused_until_it_expires(self):
+        """Consecutive reads within max_age issue a single squeue."""
+        snapshot = main.ListingSnapshot(self.servers.list_all_services, max_age=60)
+        snapshot.get()
+        snapshot.get()
+        assert self.servers.list_all_services.call_count == 1
+    
+    def test_invalidate_forces_refresh(self):
+        """Stopping services drops the cached listing."""
+        snapshot = main.ListingSnapshot(self.servers.list_all_services, max_age=60)
+        snapshot.get()
+        snapshot.invalidate()
+        snapshot.get()
+        assert self.servers.list_all_services.call_count == 2
+
+
+
+class TestInteractiveMenu:
+    """Test command dispatch in the interactive menu."""
+    
+    def setup_method(self):
+        """Setup a menu over a fake orchestrator."""
+        self.interface = Mock()
+        self.interface.servers.list_available_services.return_value = ['ollama', 'redis']
+        self.menu = main.InteractiveMenu(self.interface)
+    
+    def test_commands_dispatch_until_exit(self, monkeypatch, capsys):
+        """Known commands run their action, unknown ones are reported."""
+        answers = iter(['1', '42', '12'])
+        monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+        
+        self.menu.run()
+        
+        output = capsys.readouterr().out
+        assert "Available Services: ['ollama', 'redis']" in output
+        assert output.startswith(main.MENU_BANNER)
+        assert "Invalid choice. Please enter 0-12." in output
+    
+    def test_every_numbered_command_has_an_action(self):
+        """Commands 0-11 are all dispatched; 12 exits the loop."""
+        assert sorted(self.menu.actions, key=int) == [str(i) for i in range(0, 12)]
+    
+    def test_show_status_lists_running_services(self, capsys):
+        """Each tracked service is shown with its status and job."""
+        self.interface.get_system_status.return_value = {
+            'ssh_connected': True,
+            'services': {'total_services': 1, 'services': {
+                'abc': {'status': 'running', 'job_id': '1234'}}},
+            'clients': {'total_clients': 0, 'clients': {}},
+        }
+        
+        self.menu.show_status()
+        
+        assert "  abc: running (Job: 1234)\n" in capsys.readouterr().out
+    
+    def test_refresh_drops_cached_listings(self):
+        """Command 0 makes the next listing query SLURM again."""
+        self.menu.services_snapshot.get()
+        self.menu.refresh()
+        self.menu.services_snapshot.get()
+        
+        assert self.interface.servers.list_all_services.call_count == 2
+        self.interface.ssh_client.clear_job_cache.assert_called_once_with()
+        self.interface.clients.reload_definitions.assert_called_once_with()
+
+
+class TestCommandDispatch:
+    """Test the mapping of command line flags to their handlers."""
+    
+    def test_every_action_is_a_parser_flag(self):
+        """Each ACTIONS entry names an option of the parser."""
+        dests = {action.dest for action in main.build_parser()._actions}
+        assert {dest for dest, _ in main.ACTIONS} <= dests
+    
+    def test_parser_is_built_once(self):
+        """Repeated calls reuse the same parser."""
+        assert main.build_parser() is main.build_parser()
+    
+    def test_handler_receives_interface_and_args(self, capsys):
+        """The handler of a given flag prints from the orchestrator."""
+        interface = Mock()
+        interface.clients.list_available_clients.return_value = ['ollama_benchmark']
+        args = main.build_parser().parse_args(['--list-clients'])
+        handler = dict(main.ACTIONS)['list_clients']
+        
+        assert handler(interface, args) is None
+        assert "  - ollama_benchmark" in capsys.readouterr().out
+
+
+class TestCheckDependencies:
+    """Test the dependency check run before any command."""
+    
+    def teardown_method(self):
+        """Forget results computed with patched requirements."""
+        main.check_dependencies.cache_clear()
+    
+    def test_reports_only_missing_modules(self, monkeypatch):
+        """Installed modules pass and unknown ones are listed."""
+        monkeypatch.setattr(main, 'REQUIRED_DISTRIBUTIONS',
+                            {'json': 'no-such-dist', 'no_such_module_xyz': 'no-such-dist-xyz'})
+        main.check_dependencies.cache_clear()
+        
+        assert main.check_dependencies() == ('no_such_module_xyz',)
+        assert main.check_dependencies.cache_info().hits == 0
+        main.check_dependencies()
+        assert main.check_dependencies.cache_info().hits == 1
+
+
+class TestProcessLogs:
+    """Test the per-process log files and the link to the newest one."""
+    
+    def test_prune_keeps_newest_logs_with_backups(self, tmp_path, monkeypatch):
+        """Older process logs and their rotated backups are deleted."""
+        monkeypatch.chdir(tmp_path)
+        for age, pid in enumerate((300, 200, 100)):
+            log_path = tmp_path / f"orchestrator.{pid}.log"
+            log_path.write_text('log')
+            os.utime(log_path, (1000 - age, 1000 - age))
+        (tmp_path / "orchestrator.100.log.1").write_text('backup')
+        
+        with patch('main.process_alive', return_value=False):
+            main.prune_process_logs(keep=2)
+        
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            'orchestrator.200.log', 'orchestrator.300.log']
+    
+    def test_prune_skips_logs_deleted_meanwhile(self, tmp_path, monkeypatch):
+        """A log another process deletes between the glob and its stat is skipped."""
+        monkeypatch.chdir(tmp_path)
+        for pid in (100, 200, 300):
+            (tmp_path / f"orchestrator.{pid}.log").write_text('log')
+        glob = main.Path.glob
+        
+        def glob_then_unlink(self, pattern):
+            paths = list(glob(self, pattern))
+            (tmp_path / 'orchestrator.200.log').unlink(missing_ok=True)
+            return paths
+        
+        with patch.object(main.Path, 'glob', glob_then_unlink), \
+             patch('main.process_alive', return_value=False):
+            main.prune_process_logs(keep=1)
+        
+        assert len(list(tmp_path.iterdir())) == 1
+    
+    def test_prune_keeps_logs_of_running_processes(self, tmp_path, monkeypatch):
+        """Logs beyond the limit survive while their process is still alive."""
+        monkeypatch.chdir(tmp_path)
+        for age, pid in enumerate((300, 200, 100)):
+            log_path = tmp_path / f"orchestrator.{pid}.log"
+            log_path.write_text('log')
+            os.utime(log_path, (1000 - age, 1000 - age))
+        
+        with patch('main.process_alive', side_effect=lambda pid: pid == 100):
+            main.prune_process_logs(keep=1)
+        
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            'orchestrator.100.log', 'orchestrator.300.log']
+    
+    def test_link_points_to_latest_log(self, tmp_path, monkeypatch):
+        """The stable log name follows the newest process log."""
+        monkeypatch.chdir(tmp_path)
+        main.link_latest_log('orchestrator.1.log')
+        main.link_latest_log('orchestrator.2.log')
+        
+        assert os.readlink(main.LOG_FILE) == 'orchestrator.2.log'
+    
+    def test_link_keeps_existing_log_file(self, tmp_path, monkeypatch):
+        """A plain log file written by an older version is not replaced."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / main.LOG_FILE).write_text('old log')
+        
+        main.link_latest_log('orchestrator.1.log')
+        
+        assert (tmp_path / main.LOG_FILE).read_text() == 'old log'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
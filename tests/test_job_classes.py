@@ -449,6 +449,28 @@ class TestJobAbstractClass:
         assert '#SBATCH --nodes=2' in script
         assert '#SBATCH --gres=gpu:1' in script
 
+    def test_optional_directives_precede_task_counts(self):
+        """Only the optional directives that are set appear, before --ntasks."""
+        service_recipe = {
+            'service': {
+                'name': 'ollama',
+                'container_image': 'ollama.sif',
+                'resources': {'mem': '8GB', 'cpus_per_task': 4}
+            }
+        }
+        
+        service = JobFactory.create_service(service_recipe, {'slurm': {'account': 'test_account'}})
+        
+        directives = [line for line in service.generate_slurm_script('job_123').splitlines()
+                      if line.startswith('#SBATCH')]
+        assert directives[-5:] == [
+            '#SBATCH --nodes=1',
+            '#SBATCH --mem=8GB',
+            '#SBATCH --cpus-per-task=4',
+            '#SBATCH --ntasks=1',
+            '#SBATCH --ntasks-per-node=1',
+        ]
+
     def test_environment_variable_handling(self):
         """Test environment variable processing."""
         client_recipe = {
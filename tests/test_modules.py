@@ -0,0 +1,778 @@
+#!/usr/bin/env python3
+"""
+Tests for the orchestrator modules (servers, clients, monitors).
+
+The SSH client is replaced by a Mock so the SLURM interaction can be
+checked without a cluster.
+
+Usage:
+    python -m pytest tests/test_modules.py -v
+"""
+
+import json
+import pytest
+import os
+import sys
+from unittest.mock import Mock, patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from base import JobInfo, ServiceStatus, SessionInfo, TrackedInstances
+import base
+import clients
+import monitors
+import orchestrator
+from clients import ClientsModule
+from servers import ServersModule
+from monitors import MonitorsModule
+
+
+class TestJobInfo:
+    """Test the tracked job record."""
+    
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason="dataclass slots need Python 3.10")
+    def test_job_info_has_no_instance_dict(self):
+        """Tracked jobs are slotted, so attribute typos fail loudly."""
+        job_info = JobInfo(job_id='1234', service_id='abc',
+                           status=ServiceStatus.PENDING, submitted_at=0.0)
+        
+        assert not hasattr(job_info, '__dict__')
+        with pytest.raises(AttributeError):
+            job_info.node = 'mel2001'
+
+
+class TestTrackedInstances:
+    """Test the active/finished indices kept over tracked jobs."""
+    
+    def setup_method(self):
+        """Track one pending and one completed job."""
+        self.instances = TrackedInstances()
+        for instance_id, status in (('abc', ServiceStatus.PENDING), ('def', ServiceStatus.COMPLETED)):
+            self.instances[instance_id] = JobInfo(job_id=instance_id, service_id=instance_id,
+                                                  status=status, submitted_at=0.0)
+    
+    def test_insert_indexes_by_status(self):
+        """New entries land in the index matching their status."""
+        assert self.instances.active_ids() == ['abc']
+        assert self.instances.finished_ids() == ['def']
+    
+    def test_set_status_moves_between_indices(self):
+        """Finishing a job moves it from the active to the finished index."""
+        self.instances.set_status('abc', ServiceStatus.RUNNING)
+        assert self.instances.active_ids() == ['abc']
+        
+        self.instances.set_status('abc', ServiceStatus.FAILED)
+        assert self.instances['abc'].status == ServiceStatus.FAILED
+        assert self.instances.active_ids() == []
+        assert self.instances.finished_ids() == ['def', 'abc']
+    
+    def test_delete_and_clear_drop_index_entries(self):
+        """Removed jobs disappear from the indices too."""
+        del self.instances['def']
+        assert self.instances.finished_ids() == []
+        
+        self.instances.clear()
+        assert self.instances.active_ids() == []
+
+
+class TestServersModule:
+    """Test service host resolution and tracking in ServersModule."""
+    
+    def setup_method(self):
+        """Setup test configuration and a fake SSH client."""
+        self.test_config = {
+            'slurm': {'account': 'test_account'},
+            'services_dir': 'recipes/services'
+        }
+        self.ssh_client = Mock()
+        self.servers = ServersModule(self.test_config, self.ssh_client)
+    
+    def test_get_service_host_is_cached(self):
+        """A resolved host is reused without asking SLURM again."""
+        self.ssh_client.execute_command.return_value = (0, "1234,ollama_abc,mel2001\n", "")
+        
+        assert self.servers.get_service_host('abc') == 'mel2001'
+        assert self.servers.get_service_host('abc') == 'mel2001'
+        assert self.ssh_client.execute_command.call_count == 1
+    
+    def test_bulk_status_reuses_fresh_statuses(self):
+        """Back-to-back status pages share one squeue of the tracked services."""
+        for service_id, job_id in (('s1', '100'), ('s2', '101')):
+            self.servers._running_instances[service_id] = JobInfo(
+                job_id=job_id, service_id=service_id,
+                status=ServiceStatus.PENDING, submitted_at=0.0
+            )
+        self.ssh_client.get_jobs_status.return_value = {
+            '100': {'job_id': '100', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2001'},
+            '101': {'job_id': '101', 'state': 'PENDING', 'time': '0:00', 'nodes': ''},
+        }
+        
+        first = self.servers.bulk_status(['s1', 's2', 'missing'])
+        second = self.servers.bulk_status(['s1', 's2'])
+        
+        self.ssh_client.get_jobs_status.assert_called_once_with(['100', '101'])
+        self.ssh_client.get_job_status.assert_not_called()
+        assert first['s1']['status'] == second['s1']['status'] == 'running'
+        assert first['missing'] == {'error': 'Service missing not found'}
+        assert self.servers.check_service_status('s2')['status'] == 'pending'
+        self.ssh_client.get_job_status.assert_not_called()
+    
+    def test_bulk_status_looks_up_finished_jobs_concurrently(self):
+        """Jobs missing from squeue are each checked in sacct, keeping the caller's order."""
+        for service_id, job_id in (('s1', '100'), ('s2', '101'), ('s3', '102')):
+            self.servers._running_instances[service_id] = JobInfo(
+                job_id=job_id, service_id=service_id,
+                status=ServiceStatus.RUNNING, submitted_at=0.0
+            )
+        self.ssh_client.get_jobs_status.return_value = {}
+        self.ssh_client.get_job_status.side_effect = lambda job_id: {
+            'job_id': job_id, 'state': 'COMPLETED', 'exit_code': '0:0', 'nodes': 'mel2001'
+        }
+        
+        with patch('base.ThreadPoolExecutor', wraps=base.ThreadPoolExecutor) as pool:
+            statuses = self.servers.bulk_status(['s3', 's1', 's2'])
+        
+        pool.assert_called_once_with(max_workers=3)
+        assert list(statuses) == ['s3', 's1', 's2']
+        assert all(status['status'] == 'completed' for status in statuses.values())
+        assert self.ssh_client.get_job_status.call_count == 3
+    
+    def test_stop_untracked_service_by_name_uses_job_listing(self):
+        """An untracked job is found in the shared squeue listing and cancelled."""
+        self.ssh_client.list_user_jobs.return_value = [
+            {'job_id': '1233', 'name': 'client_x', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2002', 'partition': 'gpu'},
+            {'job_id': '1234', 'name': 'Ollama_abc', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2001', 'partition': 'gpu'},
+        ]
+        self.ssh_client.cancel_jobs.return_value = ['1234']
+        
+        assert self.servers.stop_service('ollama_abc')
+        
+        self.ssh_client.cancel_jobs.assert_called_once_with(['1234'])
+        self.ssh_client.execute_command.assert_not_called()
+    
+    def test_cached_host_expires(self):
+        """SLURM is asked again once the cached host is older than the TTL."""
+        self.ssh_client.execute_command.return_value = (0, "1234,ollama_abc,mel2001\n", "")
+        self.servers.HOST_CACHE_TTL = 0
+        
+        assert self.servers.get_service_host('abc') == 'mel2001'
+        assert self.servers.get_service_host('abc') == 'mel2001'
+        assert self.ssh_client.execute_command.call_count == 2
+    
+    def test_unassigned_host_is_not_cached(self):
+        """Lookups keep polling SLURM until a node is assigned."""
+        self.ssh_client.execute_command.side_effect = [
+            (0, "1234,ollama_abc,(null)\n", ""),
+            (0, "1234,ollama_abc,mel2001\n", ""),
+        ]
+        
+        assert self.servers.get_service_host('abc') is None
+        assert self.servers.get_service_host('abc') == 'mel2001'
+    
+    def test_wait_for_service_host_watches_queue(self):
+        """One streaming squeue is read until the service has a node."""
+        self.ssh_client.execute_command.return_value = (0, "1234,ollama_abc,(null)\n", "")
+        stdout = Mock()
+        stdout.readline.side_effect = [
+            "1234,ollama_abc,(null)\n",
+            "1233,redis_xyz,mel2009\n",
+            "1234,ollama_abc,mel2001\n",
+        ]
+        self.ssh_client.stream_command.return_value = (stdout, Mock())
+        
+        assert self.servers.wait_for_service_host('abc', timeout=30) == 'mel2001'
+        
+        assert self.ssh_client.stream_command.call_count == 1
+        assert "-i 2" in self.ssh_client.stream_command.call_args.args[0]
+        stdout.channel.close.assert_called_once_with()
+        assert self.servers._host_cache['abc'][0] == 'mel2001'
+    
+    def test_wait_for_service_host_retries_until_assigned(self):
+        """Without a streaming squeue, polling stops as soon as SLURM reports a node."""
+        self.ssh_client.stream_command.side_effect = ConnectionError("no channel")
+        self.ssh_client.execute_command.side_effect = [
+            (0, "1234,ollama_abc,(null)\n", ""),
+            (0, "1234,ollama_abc,(null)\n", ""),
+            (0, "1234,ollama_abc,(null)\n", ""),
+            (0, "1234,ollama_abc,mel2001\n", ""),
+        ]
+        
+        with patch('servers.time.sleep') as sleep:
+            assert self.servers.wait_for_service_host('abc', timeout=30) == 'mel2001'
+        
+        assert [c.args[0] for c in sleep.call_args_list] == [0.25, 0.425]
+    
+    def test_wait_for_service_host_times_out(self):
+        """None is returned once the timeout has passed."""
+        self.ssh_client.execute_command.return_value = (0, "1234,ollama_abc,(null)\n", "")
+        
+        assert self.servers.wait_for_service_host('abc', timeout=0) is None
+    
+    def test_list_all_services_records_hosts(self):
+        """Nodes seen while listing services are reused by get_service_host."""
+        self.ssh_client.list_user_jobs.return_value = [
+            {'job_id': '1234', 'name': 'prometheus_abc', 'state': 'RUNNING',
+             'time': '1:00', 'nodes': 'mel2001', 'partition': 'cpu'},
+            {'job_id': '1235', 'name': 'redis_def', 'state': 'PENDING',
+             'time': '0:00', 'nodes': '', 'partition': 'cpu'},
+        ]
+        
+        all_services = self.servers.list_all_services()
+        
+        assert len(all_services['slurm_services']) == 2
+        assert self.servers.get_service_host('prometheus_abc') == 'mel2001'
+        assert 'redis_def' not in self.servers._host_cache
+        self.ssh_client.list_user_jobs.assert_called_once_with()
+        self.ssh_client.execute_command.assert_not_called()
+    
+    def test_list_all_services_joins_tracked_jobs(self):
+        """Queued jobs of tracked services update those entries instead of being listed twice."""
+        self.servers._running_instances['abc'] = JobInfo(
+            job_id='1234', service_id='abc', status=ServiceStatus.PENDING, submitted_at=0.0
+        )
+        self.ssh_client.list_user_jobs.return_value = [
+            {'job_id': '1234', 'name': 'ollama_abc', 'state': 'RUNNING',
+             'time': '1:00', 'nodes': 'mel2001', 'partition': 'gpu'},
+        ]
+        
+        all_services = self.servers.list_all_services()
+        
+        assert all_services['slurm_services'] == []
+        assert all_services['all_services'] == all_services['tracked_services']
+        assert all_services['tracked_services'][0]['status'] == 'RUNNING'
+        assert all_services['tracked_services'][0]['nodes'] == 'mel2001'
+    
+    def test_stop_service_clears_host_cache(self):
+        """Stopping a service invalidates cached hosts."""
+        self.servers._running_instances['abc'] = JobInfo(
+            job_id='1234', service_id='abc', status=ServiceStatus.RUNNING,
+            submitted_at=0.0, nodes=['mel2001']
+        )
+        self.ssh_client.cancel_jobs.return_value = ['1234']
+        
+        assert self.servers.get_service_host('abc') == 'mel2001'
+        assert self.servers.stop_service('abc')
+        assert self.servers._host_cache == {}
+        self.ssh_client.cancel_jobs.assert_called_once_with(['1234'])
+    
+    def test_cancel_jobs_updates_tracked_services(self):
+        """One batched cancel marks every matching tracked service cancelled."""
+        for service_id, job_id in (('abc', '1234'), ('def', '1235')):
+            self.servers._running_instances[service_id] = JobInfo(
+                job_id=job_id, service_id=service_id,
+                status=ServiceStatus.RUNNING, submitted_at=0.0
+            )
+        self.ssh_client.cancel_jobs.return_value = ['1234', '1235', '9999']
+        
+        assert self.servers.cancel_jobs(['1234', '1235', '9999']) == ['1234', '1235', '9999']
+        
+        self.ssh_client.cancel_jobs.assert_called_once_with(['1234', '1235', '9999'])
+        assert all(job_info.status == ServiceStatus.CANCELLED
+                   for job_info in self.servers._running_instances.values())
+    
+    def test_cancel_jobs_leaves_failed_jobs_tracked(self):
+        """Jobs scancel could not cancel keep their tracked status."""
+        for service_id, job_id in (('abc', '1234'), ('def', '1235')):
+            self.servers._running_instances[service_id] = JobInfo(
+                job_id=job_id, service_id=service_id,
+                status=ServiceStatus.RUNNING, submitted_at=0.0
+            )
+        self.ssh_client.cancel_jobs.return_value = ['1234']
+        
+        assert self.servers.cancel_jobs(['1234', '1235']) == ['1234']
+        
+        assert self.servers._running_instances['abc'].status == ServiceStatus.CANCELLED
+        assert self.servers._running_instances['def'].status == ServiceStatus.RUNNING
+    
+    @pytest.mark.parametrize("service_id,service_type", [
+        ('prometheus_ab12cd34', 'prometheus'),
+        ('Ollama_ab12cd34', 'ollama'),
+        ('ab12cd34', None),
+    ])
+    def test_get_service_type(self, service_id, service_type):
+        """The service type is the job name prefix before the ID."""
+        assert self.servers.get_service_type(service_id) == service_type
+    
+    def test_list_running_services_refreshes_every_service(self):
+        """Each tracked service is refreshed from SLURM before filtering."""
+        for service_id, job_id in (('abc', '1234'), ('def', '1235'), ('ghi', '1236')):
+            self.servers._running_instances[service_id] = JobInfo(
+                job_id=job_id, service_id=service_id,
+                status=ServiceStatus.PENDING, submitted_at=0.0
+            )
+        states = {'1234': 'RUNNING', '1235': 'PENDING', '1236': 'FAILED'}
+        self.ssh_client.get_job_states.return_value = {}
+        self.ssh_client.get_job_status.side_effect = lambda job_id: {
+            'job_id': job_id, 'state': states[job_id], 'time': '0:01', 'nodes': 'mel2001'
+        }
+        
+        assert sorted(self.servers.list_running_services()) == ['abc', 'def']
+        assert self.ssh_client.get_job_status.call_count == 3
+    
+    def test_list_running_services_skips_unchanged_jobs(self):
+        """Only services whose queue state changed are checked one by one."""
+        for service_id, job_id in (('abc', '1234'), ('def', '1235')):
+            self.servers._running_instances[service_id] = JobInfo(
+                job_id=job_id, service_id=service_id,
+                status=ServiceStatus.PENDING, submitted_at=0.0
+            )
+        self.ssh_client.get_job_states.return_value = {'1234': 'PENDING', '1235': 'RUNNING'}
+        self.ssh_client.get_job_status.return_value = {
+            'job_id': '1235', 'state': 'RUNNING', 'time': '0:01', 'nodes': 'mel2001'
+        }
+        
+        assert sorted(self.servers.list_running_services()) == ['abc', 'def']
+        self.ssh_client.get_job_states.assert_called_once_with(['1234', '1235'])
+        self.ssh_client.get_job_status.assert_called_once_with('1235')
+
+
+
+class TestClientsModule:
+    """Test client definition loading in ClientsModule."""
+    
+    def setup_method(self):
+        """Start every test with an empty definition cache."""
+        base._yaml_cache.clear()
+    
+    def _write_definition(self, clients_dir, name, image):
+        path = clients_dir / f"{name}.yaml"
+        path.write_text(f"name: {name}\ncontainer_image: {image}\n")
+        return path
+    
+    def test_unchanged_definitions_are_parsed_once(self, tmp_path):
+        """A second module reuses the cached parse while the file is unchanged."""
+        self._write_definition(tmp_path, 'ollama_client', 'ollama.sif')
+        config = {'clients_dir': str(tmp_path)}
+        
+        with patch('base.yaml.load', wraps=base.yaml.load) as yaml_load:
+            first = ClientsModule(config)
+            second = ClientsModule(config)
+        
+        assert yaml_load.call_count == 1
+        assert second.client_definitions == first.client_definitions
+        
+        # Callers get their own copy of the cached definition
+        second.client_definitions['ollama_client']['container_image'] = 'other.sif'
+        assert first.client_definitions['ollama_client']['container_image'] == 'ollama.sif'
+    
+    def test_modified_definition_is_reparsed(self, tmp_path):
+        """A change in size or mtime invalidates the cached parse."""
+        path = self._write_definition(tmp_path, 'ollama_client', 'ollama.sif')
+        config = {'clients_dir': str(tmp_path)}
+        ClientsModule(config)
+        
+        self._write_definition(tmp_path, 'ollama_client', 'ollama-new.sif')
+        os.utime(path, ns=(0, 0))
+        module = ClientsModule(config)
+        
+        assert module.client_definitions['ollama_client']['container_image'] == 'ollama-new.sif'
+    
+    def test_warm_start_reads_json_cache(self, tmp_path):
+        """An unchanged clients directory is served from the JSON sidecar."""
+        self._write_definition(tmp_path, 'ollama_client', 'ollama.sif')
+        config = {'clients_dir': str(tmp_path)}
+        first = ClientsModule(config)
+        assert (tmp_path / clients.DEFINITIONS_CACHE_FILE).exists()
+        
+        with patch('clients.load_yaml_file') as load:
+            second = ClientsModule(config)
+        
+        load.assert_not_called()
+        assert second.client_definitions == first.client_definitions
+    
+    def test_new_definition_invalidates_json_cache(self, tmp_path):
+        """Adding a file changes the fingerprint, so everything is parsed again."""
+        self._write_definition(tmp_path, 'ollama_client', 'ollama.sif')
+        config = {'clients_dir': str(tmp_path)}
+        ClientsModule(config)
+        
+        self._write_definition(tmp_path, 'redis_client', 'redis.sif')
+        module = ClientsModule(config)
+        
+        assert set(module.client_definitions) == {'ollama_client', 'redis_client'}
+    
+    def test_recipes_of_one_type_reuse_the_template(self, tmp_path):
+        """Recipe overrides win over the template, which is looked up once per type."""
+        self._write_definition(tmp_path, 'ollama_client', 'ollama.sif')
+        module = ClientsModule({'clients_dir': str(tmp_path)})
+        
+        with patch('clients.JobFactory.create_client') as create_client:
+            module._parse_client_recipe({'client': {'type': 'ollama_client', 'duration': 60}})
+            module._parse_client_recipe({'client': {'type': 'ollama_client', 'container_image': 'new.sif'}})
+        
+        first, second = (call.args[0]['client'] for call in create_client.call_args_list)
+        assert first == {'name': 'ollama_client', 'container_image': 'ollama.sif',
+                         'type': 'ollama_client', 'duration': 60}
+        assert second['container_image'] == 'new.sif'
+        assert list(module._merged_template_cache) == ['ollama_client']
+    
+    def test_unchanged_script_is_uploaded_once(self, tmp_path):
+        """Launching several clients uploads their benchmark script only once."""
+        script = tmp_path / 'bench.py'
+        script.write_text("print('hello')\n")
+        ssh_client = Mock()
+        ssh_client.upload_file.return_value = True
+        module = ClientsModule({'clients_dir': str(tmp_path)}, ssh_client)
+        client = Mock(script_name='bench.py', script_local_path=str(tmp_path),
+                      script_remote_path='$HOME/benchmark_scripts/')
+        
+        module._ensure_script_uploaded(client, 'c1')
+        module._ensure_script_uploaded(client, 'c2')
+        assert ssh_client.upload_file.call_count == 1
+        
+        script.write_text("print('changed')\n")
+        os.utime(script, ns=(0, 0))
+        module._ensure_script_uploaded(client, 'c3')
+        assert ssh_client.upload_file.call_count == 2
+        ssh_client.upload_file.assert_called_with(str(script), 'benchmark_scripts/bench.py')
+    
+    def test_reload_skips_unchanged_directory(self, tmp_path):
+        """reload_definitions only re-reads when a recipe file changed."""
+        self._write_definition(tmp_path, 'ollama_client', 'ollama.sif')
+        module = ClientsModule({'clients_dir': str(tmp_path)})
+        
+        with patch('clients.load_yaml_file') as load:
+            assert not module.reload_definitions()
+        load.assert_not_called()
+        
+        self._write_definition(tmp_path, 'redis_client', 'redis.sif')
+        assert module.reload_definitions()
+        assert set(module.client_definitions) == {'ollama_client', 'redis_client'}
+        assert module.reload_definitions(force=True)
+    
+    def test_cold_load_of_many_files_keeps_order_and_errors(self, tmp_path):
+        """Definitions read on the thread pool land in file order; broken files are skipped."""
+        for i in range(6):
+            self._write_definition(tmp_path, f"client{i}", 'img.sif')
+        (tmp_path / 'broken.yaml').write_text("name: [unclosed\n")
+        
+        module = ClientsModule({'clients_dir': str(tmp_path)})
+        
+        assert list(module.client_definitions) == [f"client{i}" for i in range(6)]
+        assert not (tmp_path / clients.DEFINITIONS_CACHE_FILE).exists()
+    
+    def test_cache_evicts_least_recently_used(self, tmp_path):
+        """The cache holds at most YAML_CACHE_SIZE files."""
+        with patch('base.YAML_CACHE_SIZE', 2):
+            paths = [self._write_definition(tmp_path, f"client{i}", 'img.sif') for i in range(3)]
+            for path in paths:
+                base.load_yaml_file(path)
+        
+        assert list(base._yaml_cache) == [str(p) for p in paths[1:]]
+    
+    def test_list_running_clients_polls_queue_once(self, tmp_path):
+        """Queued clients come from one squeue; only vanished jobs hit sacct."""
+        ssh_client = Mock()
+        module = ClientsModule({'clients_dir': str(tmp_path)}, ssh_client)
+        for client_id, job_id, status in (('c1', '100', ServiceStatus.PENDING),
+                                          ('c2', '101', ServiceStatus.RUNNING),
+                                          ('c3', '102', ServiceStatus.COMPLETED)):
+            module._running_instances[client_id] = JobInfo(
+                job_id=job_id, service_id=client_id, status=status, submitted_at=0.0
+            )
+        ssh_client.get_jobs_status.return_value = {
+            '100': {'job_id': '100', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2001'},
+        }
+        ssh_client.get_job_status.return_value = {
+            'job_id': '101', 'state': 'COMPLETED', 'exit_code': '0:0', 'nodes': 'mel2002'
+        }
+        
+        running = module.list_running_clients()
+        
+        ssh_client.get_jobs_status.assert_called_once_with(['100', '101'])
+        ssh_client.get_job_status.assert_called_once_with('101')
+        assert running == ['c1']
+        assert module._running_instances['c2'].status == ServiceStatus.COMPLETED
+
+
+class TestMonitorsModule:
+    """Test batched status and endpoint lookups in MonitorsModule."""
+    
+    def setup_method(self):
+        """Setup two tracked monitors and a fake SSH client."""
+        self.ssh_client = Mock()
+        self.monitors = MonitorsModule({'monitors_dir': 'recipes/monitors'}, self.ssh_client)
+        for monitor_id, job_id in (('mon1', '100'), ('mon2', '101')):
+            self.monitors._running_instances[monitor_id] = JobInfo(
+                job_id=job_id, service_id=monitor_id,
+                status=ServiceStatus.PENDING, submitted_at=0.0
+            )
+    
+    def test_bulk_status_uses_one_squeue(self):
+        """All queued monitors are updated from a single squeue call."""
+        self.ssh_client.get_jobs_status.return_value = {
+            '100': {'job_id': '100', 'state': 'RUNNING', 'time': '1:00', 'nodes': 'mel2001'},
+            '101': {'job_id': '101', 'state': 'PENDING', 'time': '0:00', 'nodes': ''},
+        }
+        
+        statuses = self.monitors.bulk_status(['mon1', 'mon2', 'missing'])
+        
+        self.ssh_client.get_jobs_status.assert_called_once_with(['100', '101'])
+        self.ssh_client.get_job_status.assert_not_called()
+        assert statuses['mon1']['status'] == 'running'
+        assert statuses['mon1']['nodes'] == ['mel2001']
+        assert statuses['mon2']['status'] == 'pending'
+        assert 'error' in statuses['missing']
+    
+    def test_check_monitor_status_uses_shared_refresh(self):
+        """Status dicts keep the monitor_id key, and vanished jobs complete."""
+        self.ssh_client.get_job_status.return_value = None
+        
+        status = self.monitors.check_monitor_status('mon1')
+        
+        assert status['monitor_id'] == 'mon1'
+        assert status['status'] == 'completed'
+        assert self.monitors._running_instances['mon1'].completed_at is not None
+    
+    def test_repeated_status_checks_share_one_query(self):
+        """Status checks within STATUS_TTL reuse the last SLURM answer."""
+        self.ssh_client.get_job_status.return_value = {
+            'job_id': '100', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2001'
+        }
+        
+        first = self.monitors.check_monitor_status('mon1')
+        first['status'] = 'changed by caller'
+        second = self.monitors.check_monitor_status('mon1')
+        
+        self.ssh_client.get_job_status.assert_called_once_with('100')
+        assert second['status'] == 'running'
+        assert second['nodes'] == ['mel2001']
+    
+    def test_stopping_a_monitor_invalidates_cached_status(self):
+        """A status change made locally is visible on the next check."""
+        self.ssh_client.get_job_status.return_value = {
+            'job_id': '100', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2001'
+        }
+        self.ssh_client.cancel_job.return_value = True
+        self.monitors.check_monitor_status('mon1')
+        
+        assert self.monitors.stop_monitor('mon1')
+        self.ssh_client.get_job_status.return_value = {
+            'job_id': '100', 'state': 'CANCELLED', 'exit_code': '0:15', 'nodes': 'mel2001'
+        }
+        
+        assert self.monitors.check_monitor_status('mon1')['status'] == 'cancelled'
+        assert self.ssh_client.get_job_status.call_count == 2
+    
+    def test_queries_share_one_http_session(self):
+        """Every Prometheus query goes through the module's pooled session."""
+        self.monitors._running_instances['mon1'].nodes = ['mel2001']
+        self.monitors._http = Mock()
+        self.monitors._http.get.return_value.json.return_value = {'status': 'success'}
+        
+        assert self.monitors.query_metrics('mon1', 'up') == {'status': 'success'}
+        assert self.monitors.query_metrics('mon1', 'scrape_duration_seconds') == {'status': 'success'}
+        
+        assert self.monitors._http.get.call_count == 2
+        self.monitors._http.get.assert_called_with(
+            'http://mel2001:9090/api/v1/query',
+            params={'query': 'scrape_duration_seconds'}, timeout=10
+        )
+    
+    def test_query_without_requests_reports_error(self):
+        """Without the requests library queries fail with an error dict."""
+        self.monitors._running_instances['mon1'].nodes = ['mel2001']
+        
+        with patch.dict(sys.modules, {'requests': None}):
+            assert 'error' in self.monitors.query_metrics('mon1', 'up')
+        assert self.monitors._http is None
+    
+    def test_construct_report_collects_every_query(self, tmp_path):
+        """Report queries run concurrently and failed ones are left out."""
+        self.monitors.metrics_dir = tmp_path
+        self.ssh_client.get_job_status.return_value = {
+            'job_id': '100', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2001'
+        }
+        results = {'up': {'status': 'success'}, 'process_resident_memory_bytes': {'error': 'timeout'}}
+        with patch.object(self.monitors, 'query_metrics',
+                          side_effect=lambda monitor_id, query: results.get(query, {'status': 'success'})):
+            assert self.monitors.construct_report('mon1', 'report.json')
+        
+        report = json.loads((tmp_path / 'report.json').read_text())
+        assert list(report['metrics']) == ['up', 'cpu_usage', 'scrape_duration']
+    
+    def test_endpoint_resolves_nodes_through_status_check(self):
+        """A monitor without known nodes gets them from its SLURM status."""
+        self.ssh_client.get_job_status.return_value = {
+            'job_id': '100', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2001'
+        }
+        
+        assert self.monitors.get_monitor_endpoint('mon1') == 'http://mel2001:9090'
+        assert self.monitors.get_monitor_endpoint('mon1') == 'http://mel2001:9090'
+        self.ssh_client.get_job_status.assert_called_once_with('100')
+    
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_collect_metrics_writes_json_atomically(self, tmp_path, use_orjson):
+        """Metrics files hold indented JSON and no temporary file is left."""
+        self.monitors.metrics_dir = tmp_path
+        data = {'status': 'success', 'data': {'result': [{'value': [1.5, '1']}]}}
+        orjson_module = monitors.orjson if use_orjson else None
+        if use_orjson and orjson_module is None:
+            pytest.skip("orjson not installed")
+        
+        with patch('monitors.orjson', orjson_module), \
+             patch.object(self.monitors, 'query_metrics', return_value=data):
+            assert self.monitors.collect_metrics_to_file('mon1', 'up', 'up.json')
+        
+        assert json.loads((tmp_path / 'up.json').read_text()) == data
+        assert [p.name for p in tmp_path.iterdir()] == ['up.json']
+    
+    def test_bulk_endpoints_resolve_missing_nodes_together(self):
+        """Known nodes are reused and the rest are resolved in one batch."""
+        self.monitors._running_instances['mon1'].nodes = ['mel2001']
+        self.ssh_client.get_jobs_status.return_value = {
+            '101': {'job_id': '101', 'state': 'RUNNING', 'time': '0:05', 'nodes': 'mel2002'},
+        }
+        
+        endpoints = self.monitors.bulk_endpoints(['mon1', 'mon2'])
+        
+        self.ssh_client.get_jobs_status.assert_called_once_with(['101'])
+        assert endpoints == {'mon1': 'http://mel2001:9090', 'mon2': 'http://mel2002:9090'}
+
+
+class TestOrchestrator:
+    """Test recipe loading in the orchestrator."""
+    
+    def setup_method(self):
+        """Start each test with an empty YAML cache."""
+        base._yaml_cache.clear()
+    
+    def test_load_yaml_file_reuses_parse_until_file_changes(self, tmp_path):
+        """A recipe is parsed once per mtime/size and callers get private copies."""
+        recipe_path = tmp_path / "recipe.yaml"
+        recipe_path.write_text("service:\n  type: redis\n")
+        
+        with patch('base.yaml.load', wraps=base.yaml.load) as load:
+            first = orchestrator.load_yaml_file(str(recipe_path))
+            first['service']['type'] = 'mutated'
+            second = orchestrator.load_yaml_file(str(recipe_path))
+            assert load.call_count == 1
+            assert second == {'service': {'type': 'redis'}}
+            
+            recipe_path.write_text("service:\n  type: ollama\n")
+            os.utime(recipe_path, ns=(0, 10**9))
+            assert orchestrator.load_yaml_file(str(recipe_path)) == {'service': {'type': 'ollama'}}
+            assert load.call_count == 2
+        
+        assert list(base._yaml_cache) == [str(recipe_path)]
+    
+    def test_missing_recipe_is_reported_by_path(self, tmp_path):
+        """A missing recipe raises FileNotFoundError naming the file."""
+        orch = orchestrator.BenchmarkOrchestrator(config_path=str(tmp_path / 'missing.yaml'), connect=False)
+        
+        assert orch.config['slurm']['partition'] == 'gpu'
+        with pytest.raises(FileNotFoundError, match="Recipe file not found: .*nope.yaml"):
+            orch.load_recipe(str(tmp_path / 'nope.yaml'))
+    
+    def test_session_waits_for_service_host_without_fixed_sleeps(self):
+        """The client is started as soon as the servers module reports a host."""
+        orch = orchestrator.BenchmarkOrchestrator(config_path='missing.yaml', connect=False)
+        orch.servers = Mock()
+        orch.clients = Mock()
+        orch.servers.start_service.return_value = 'redis_abc'
+        orch.servers.wait_for_service_host.return_value = 'mel2001'
+        orch.clients.start_client.return_value = 'client_1'
+        
+        with patch('time.sleep') as sleep:
+            session_id = orch.start_benchmark_session({'service': {}, 'client': {}})
+        
+        sleep.assert_not_called()
+        orch.servers.wait_for_service_host.assert_called_once_with('redis_abc', timeout=30)
+        orch.clients.start_client.assert_called_once_with({'service': {}, 'client': {}}, 'redis_abc', 'mel2001')
+        assert orch._active_sessions[session_id].status == 'running'
+    
+    def test_tunnel_reuses_host_resolved_by_session(self):
+        """A service started by a session is tunnelled to without another SLURM lookup."""
+        orch = orchestrator.BenchmarkOrchestrator(config_path='missing.yaml', connect=False)
+        orch.ssh_client = Mock()
+        orch.servers = Mock()
+        orch.clients = Mock()
+        orch.servers.start_service.return_value = 'prometheus_abc'
+        orch.servers.wait_for_service_host.return_value = 'mel2001'
+        orch.start_benchmark_session({'service': {}, 'client': {}})
+        
+        assert orch.create_ssh_tunnel('prometheus_abc')
+        
+        orch.servers.get_service_host.assert_not_called()
+        orch.ssh_client.create_tunnel_simple.assert_called_once_with(
+            remote_host='mel2001', remote_port=9090, local_port=9090)
+    
+    def test_stopping_a_session_cancels_its_jobs_together(self):
+        """Clients and then services are cancelled with one scancel each."""
+        orch = orchestrator.BenchmarkOrchestrator(config_path='missing.yaml', connect=False)
+        orch.ssh_client = orch.clients.ssh_client = orch.servers.ssh_client = Mock()
+        orch.ssh_client.cancel_jobs.side_effect = lambda job_ids: list(job_ids)
+        for module, prefix, first_job in ((orch.clients, 'c', 100), (orch.servers, 's', 200)):
+            for offset in range(2):
+                module._running_instances[f'{prefix}{offset}'] = JobInfo(
+                    job_id=str(first_job + offset), service_id=f'{prefix}{offset}',
+                    status=ServiceStatus.RUNNING, submitted_at=0.0
+                )
+        session = SessionInfo(session_id='session_1', recipe={}, started_at=0.0,
+                              services=['s0', 's1'], clients=['c0', 'c1'])
+        orch._active_sessions['session_1'] = session
+        
+        assert orch.stop_benchmark_session('session_1')
+        
+        assert orch.ssh_client.cancel_jobs.call_args_list == [
+            ((['100', '101'],),), ((['200', '201'],),)]
+        orch.ssh_client.cancel_job.assert_not_called()
+        assert orch.clients._running_instances['c1'].status == ServiceStatus.CANCELLED
+        assert orch.servers._running_instances['s0'].status == ServiceStatus.CANCELLED
+        assert session.status == 'stopped'
+    
+    def test_session_ids_stay_unique_after_removal(self):
+        """A removed session does not free its ID for the next one."""
+        orch = orchestrator.BenchmarkOrchestrator(config_path='missing.yaml', connect=False)
+        orch.servers = Mock()
+        orch.servers.start_service.return_value = 'redis_abc'
+        
+        first = orch.start_benchmark_session({'service': {}})
+        second = orch.start_benchmark_session({'service': {}})
+        del orch._active_sessions[first]
+        third = orch.start_benchmark_session({'service': {}})
+        
+        assert (first, second, third) == ('session_1', 'session_2', 'session_3')
+    
+    def test_report_format_follows_file_suffix(self, tmp_path):
+        """A .json report is written as JSON and anything else as YAML."""
+        orch = orchestrator.BenchmarkOrchestrator(config_path='missing.yaml', connect=False)
+        orch._active_sessions['session_1'] = SessionInfo(
+            session_id='session_1', recipe={}, status='running', started_at=1.5)
+        
+        orch.generate_report('session_1', str(tmp_path / 'report.json'))
+        orch.generate_report('session_1', str(tmp_path / 'report.yaml'))
+        
+        expected = {'session_id': 'session_1', 'status': 'running', 'started_at': 1.5,
+                    'services': [], 'clients': [], 'summary': {}}
+        assert json.loads((tmp_path / 'report.json').read_text()) == expected
+        assert orchestrator.yaml.safe_load((tmp_path / 'report.yaml').read_text()) == expected
+    
+    def test_stop_all_services_counts_bulk_and_fallback_stops(self):
+        """Jobs cancelled together and services stopped one by one are both counted."""
+        orch = orchestrator.BenchmarkOrchestrator(config_path='missing.yaml', connect=False)
+        orch.ssh_client = Mock()
+        orch.servers = Mock()
+        orch.servers.list_all_services.return_value = {'all_services': [
+            {'service_id': 's1', 'job_id': '100'},
+            {'service_id': 's2', 'job_id': '101'},
+            {'service_id': 's3'},
+        ]}
+        orch.servers.cancel_jobs.return_value = ['100']
+        orch.servers.stop_service.return_value = True
+        
+        results = orch.stop_all_services()
+        
+        orch.servers.cancel_jobs.assert_called_once_with(['100', '101'])
+        orch.servers.stop_service.assert_called_once_with('s3')
+        assert results == {
+            'total_services': 3,
+            'stopped_services': 2,
+            'failed_services': 1,
+            'results': {'s1': 'stopped', 's2': 'failed', 's3': 'stopped'}
+        }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])